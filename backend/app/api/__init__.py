@@ -1,4 +1,4 @@
-from .routes import realtime
+from .routes import admin, realtime
 from .tools import router as tools_router
 
-__all__ = ["tools_router", "realtime"]
+__all__ = ["tools_router", "admin", "realtime"]
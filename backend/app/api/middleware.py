@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import hmac
+import logging
+import random
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.profiler import sampling_profiler
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-request"
+
+
+class ProfilingMiddleware:
+    """Profiles sampled or explicitly requested HTTP requests with the sampling profiler."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = sampling_profiler.begin(f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            try:
+                await sampling_profiler.finish(session)
+            except OSError:
+                logger.exception("Failed to write profile for %s", scope["path"])
+
+    def _should_profile(self, scope: Scope) -> bool:
+        if settings.profiler_token:
+            token = dict(scope["headers"]).get(PROFILE_HEADER)
+            if token is not None and hmac.compare_digest(token, settings.profiler_token.encode()):
+                return True
+        return settings.profiler_sample_rate > 0 and random.random() < settings.profiler_sample_rate
@@ -1,3 +1,3 @@
-from . import realtime
+from . import admin, realtime
 
-__all__ = ["realtime"]
+__all__ = ["admin", "realtime"]
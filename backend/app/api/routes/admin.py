@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hmac
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.core.config import settings
+from app.services.analytics_export import EXPORT_COLLECTIONS, analytics_export_service
+from app.services.profiler import sampling_profiler
+from app.services.question_import import question_import_service
+
+
+async def require_admin_token(authorization: str | None = Header(default=None)) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_TOKEN to enable it")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.post("/questions/import")
+async def import_questions(file: UploadFile = File(...), batch_size: int = 500) -> dict[str, Any]:
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    try:
+        report = await question_import_service.import_stream(
+            file.file,
+            filename=file.filename or "",
+            batch_size=batch_size,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        await file.close()
+    return asdict(report)
+
+
+@router.get("/exports/{collection}")
+async def export_collection(
+    collection: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    after: str | None = None,
+    archived_after: str | None = None,
+    batch_size: int = 1000,
+) -> StreamingResponse:
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown export collection: {collection}")
+    if batch_size < 1:
+        raise HTTPException(status_code=400, detail="batch_size must be positive")
+    return StreamingResponse(
+        analytics_export_service.iter_ndjson(
+            collection,
+            start=start,
+            end=end,
+            after_id=after,
+            archived_after=archived_after,
+            batch_size=batch_size,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/profiles")
+async def list_profiles() -> list[dict[str, Any]]:
+    return [asdict(profile) for profile in sampling_profiler.list_profiles()]
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str) -> FileResponse:
+    path = sampling_profiler.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {name}")
+    return FileResponse(path, media_type="text/plain", filename=name)
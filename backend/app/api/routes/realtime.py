@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import httpx
 import logging
+import math
+import time
 
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
+from app.services.admission import AdmissionRejectedError, admission_controller
+from app.services.circuit_breaker import realtime_breaker
 
 router = APIRouter(prefix="/realtime", tags=["realtime"])
 logger = logging.getLogger(__name__)
@@ -19,6 +23,18 @@ async def options_session_token() -> JSONResponse:
 
 @router.post("/session-token")
 async def create_realtime_session_token() -> dict[str, str]:
+    try:
+        async with admission_controller.admit(None, opening=True):
+            return await _request_session_token()
+    except AdmissionRejectedError as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=exc.detail,
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
+
+
+async def _request_session_token() -> dict[str, str]:
     api_key = settings.openai_api_key
     if not api_key:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY is not configured")
@@ -39,10 +55,14 @@ async def create_realtime_session_token() -> dict[str, str]:
         }
     }
 
+    if not realtime_breaker.allow():
+        raise HTTPException(status_code=503, detail="OpenAI Realtime API is temporarily unavailable")
+
+    started = time.monotonic()
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=realtime_breaker.timeout()) as client:
             response = await client.post(
-                "https://api.openai.com/v1/realtime/client_secrets",
+                f"{settings.openai_base_url.rstrip('/')}/realtime/client_secrets",
                 headers={
                     "Authorization": f"Bearer {api_key}",
                     "Content-Type": "application/json",
@@ -50,8 +70,17 @@ async def create_realtime_session_token() -> dict[str, str]:
                 json=payload,
             )
     except httpx.HTTPError as exc:
+        realtime_breaker.record_failure(time.monotonic() - started)
         logger.exception("Failed to contact OpenAI Realtime API")
         raise HTTPException(status_code=502, detail="Failed to contact OpenAI Realtime API") from exc
+    except BaseException:
+        realtime_breaker.release()
+        raise
+
+    if response.status_code >= 500:
+        realtime_breaker.record_failure(time.monotonic() - started)
+    else:
+        realtime_breaker.record_success(time.monotonic() - started)
 
     if response.status_code != 200:
         content_type = response.headers.get("content-type", "")
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import functools
+import inspect
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import ResponseValidationError
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ValidationError
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.__pydantic_serializer__.to_python(value, mode="json")
+    return jsonable_encoder(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, or with a model's compiled pydantic-core serializer."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(
+    endpoint: Callable[..., Awaitable[Any]],
+    response_model: type[BaseModel] | None = None,
+) -> Callable[..., Awaitable[Any]]:
+    @functools.wraps(endpoint)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        result = await endpoint(*args, **kwargs)
+        if isinstance(result, Response):
+            return result
+        if response_model is not None and not isinstance(result, response_model):
+            try:
+                result = response_model.model_validate(result)
+            except ValidationError as exc:
+                raise ResponseValidationError(exc.errors(include_url=False), body=result) from exc
+        if isinstance(result, BaseModel):
+            result = result.model_dump()
+        return FastJSONResponse(result)
+
+    wrapper.__signature__ = inspect.signature(endpoint, eval_str=True)  # type: ignore[attr-defined]
+    return wrapper
@@ -1,8 +1,20 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-
+import asyncio
+import logging
+import math
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask, BackgroundTasks
+
+from app.core.config import settings
 from app.models.tools import (
     FinalizeSessionResponse,
     GetNextQuestionResponse,
@@ -15,12 +27,138 @@ from app.models.tools import (
     SessionPayload,
     UpdateDifficultyResponse,
 )
-from app.services import memory_service, storage_service
+from app.api.serialization import FastJSONResponse, dumps, loads, trusted_response
+from app.services import storage_service
+from app.services.admission import AdmissionRejectedError, admission_controller
+from app.services.answer_uploads import UploadTooLargeError, answer_upload_service
 from app.services.difficulty import difficulty_service
+from app.services.idempotency import IdempotencyConflictError, idempotency_service, request_fingerprint
 from app.services.orchestrator import orchestrator_service
+from app.services.session_archive import session_archive_service
 from app.services.graders import formula_grader, objective_grader, rubric_grader
+from app.services.session_channels import session_channel_hub
+from app.services.speculative_grading import answer_fingerprint, speculative_grader
+from app.services.tracing import tracer
+from app.services.traffic_capture import traffic_capture
+
+logger = logging.getLogger(__name__)
+
+FORMULA_QUESTION_TYPES = {"formula", "excel_formula"}
+IDEMPOTENT_TOOLS = {"get_next_question", "record_outcome", "update_difficulty", "finalize_session", "log_interaction"}
+TRUSTED_RESPONSE_TOOLS = {
+    "get_next_question",
+    "grade_answer",
+    "grade_answer_upload",
+    "record_outcome",
+    "update_difficulty",
+    "finalize_session",
+    "log_interaction",
+}
+
+
+class ToolRoute(APIRoute):
+    """Admits each tool call, wraps it in a tracing span and replays Idempotency-Key retries of mutating tools."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        response_model = kwargs.get("response_model")
+        if endpoint.__name__ in TRUSTED_RESPONSE_TOOLS:
+            model = response_model if isinstance(response_model, type) and issubclass(response_model, BaseModel) else None
+            endpoint = trusted_response(endpoint, model)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+        tool = self.name
+
+        async def route_handler(request: Request) -> Response:
+            if request.method != "POST":
+                return await handler(request)
+            body: Any = None
+            if request.headers.get("content-type", "").startswith("application/json"):
+                try:
+                    body = loads(await request.body() or b"null")
+                except ValueError:
+                    return await handler(request)
+            session_id = body.get("session_id") if isinstance(body, dict) else None
+            started_at = time.time()
+            admission = AsyncExitStack()
+            try:
+                await admission.enter_async_context(
+                    admission_controller.admit(session_id if isinstance(session_id, str) else None)
+                )
+                try:
+                    response = await self._handle(tool, handler, request, body)
+                except BaseException:
+                    await admission.aclose()
+                    raise
+            except AdmissionRejectedError as exc:
+                response = _shed_response(exc)
+            else:
+                if isinstance(response, StreamingResponse):
+                    _hold_admission(response, admission)
+                else:
+                    await admission.aclose()
+            if traffic_capture.sampled(session_id):
+                traffic_capture.record(
+                    tool=tool,
+                    path=self.path.removeprefix(settings.api_v1_prefix),
+                    request=body,
+                    started_at=started_at,
+                    status=response.status_code,
+                    response=loads(response.body) if response.media_type == "application/json" else None,
+                    transport="http",
+                )
+            return response
+
+        return route_handler
+
+    async def _handle(
+        self,
+        tool: str,
+        handler: Callable[[Request], Awaitable[Response]],
+        request: Request,
+        body: Any,
+    ) -> Response:
+        if not isinstance(body, dict):
+            with tracer.span(f"tool.{tool}", transport="http"):
+                return await handler(request)
+        key = request.headers.get("Idempotency-Key") if tool in IDEMPOTENT_TOOLS else None
+        attributes = {name: body.get(name) for name in ("session_id", "question_id")}
+        with tracer.span(f"tool.{tool}", transport="http", **attributes) as span:
+            if not key:
+                return await handler(request)
+            try:
+                record, replayed = await idempotency_service.run(
+                    tool,
+                    key,
+                    request_fingerprint(body),
+                    lambda: _call_route(handler, request),
+                )
+            except IdempotencyConflictError as exc:
+                return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+            if span is not None:
+                span.set_attribute("idempotent_replay", replayed)
+            headers = {"Idempotent-Replayed": "true"} if replayed else None
+            return JSONResponse(status_code=record["status"], content=record["body"], headers=headers)
+
+
+def _shed_response(exc: AdmissionRejectedError) -> JSONResponse:
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+async def _call_route(handler: Callable[[Request], Awaitable[Response]], request: Request) -> dict[str, Any]:
+    try:
+        response = await handler(request)
+    except HTTPException as exc:
+        return {"status": exc.status_code, "body": {"detail": exc.detail}}
+    return {"status": response.status_code, "body": loads(response.body)}
 
-router = APIRouter(prefix="/tools", tags=["tools"])
+
+router = APIRouter(prefix="/tools", tags=["tools"], route_class=ToolRoute, default_response_class=FastJSONResponse)
 
 
 @router.options("/get_next_question")
@@ -31,67 +169,23 @@ async def options_get_next_question() -> JSONResponse:
 @router.post("/get_next_question", response_model=GetNextQuestionResponse)
 async def get_next_question(payload: SessionPayload) -> dict:
     context = await orchestrator_service.fetch_context(payload.session_id)
-    plan = context.get("question_plan", [])
-    plan_index = int(context.get("plan_index", 0))
-    asked_questions = set(context.get("asked_questions", []))
-
-    target_skill = "general"
-    target_difficulty = 2
-    completed = False
-
-    if plan and plan_index < len(plan):
-        entry = plan[plan_index]
-        target_skill = str(entry.get("skill", "general"))
-        target_difficulty = int(entry.get("difficulty", 2))
-    elif plan and plan_index >= len(plan):
-        completed = True
-
-    candidates = await storage_service.list_questions_by_skill(target_skill, target_difficulty)
-    question = next((q for q in candidates if q.get("_id") not in asked_questions), None)
-
-    if question is None and not completed:
-        fallback = await storage_service.get_any_question()
-        if fallback and fallback.get("_id") not in asked_questions:
-            question = fallback
-
-    question_payload = None
-    if question is not None:
-        question_payload = {
-            "id": str(question.get("_id")),
-            "skill": question.get("skill", "general"),
-            "difficulty": int(question.get("difficulty", 2)),
-            "type": question.get("type", "open"),
-            "prompt": question.get("prompt", ""),
-            "weight": float(question.get("weight", 1.0)),
-            "meta": question.get("meta", {}),
-        }
-        asked_list = context.get("asked_questions", [])
-        asked_list.append(question_payload["id"])
-        context["asked_questions"] = asked_list
-
-        if plan and plan_index < len(plan):
-            context["plan_index"] = plan_index + 1
-        else:
-            context["plan_index"] = plan_index
-    else:
-        completed = True
-        context["plan_index"] = max(plan_index, len(plan))
-
-    context["current_question"] = question_payload
-    await orchestrator_service.store_memory(payload.session_id, context)
 
-    remaining = None
-    if plan:
-        remaining = max(len(plan) - context.get("plan_index", 0), 0)
-        if context.get("plan_index", 0) >= len(plan):
-            completed = True
+    selection = await orchestrator_service.take_staged_selection(payload.session_id, context)
+    if selection is not None:
+        orchestrator_service.apply_selection(context, selection)
+        await orchestrator_service.store_memory(payload.session_id, context, sync_skill_states=False)
+    else:
+        selection = await orchestrator_service.select_next_question(context)
+        orchestrator_service.apply_selection(context, selection)
+        await orchestrator_service.store_memory(payload.session_id, context)
+    orchestrator_service.log_decision(payload.session_id, selection)
 
     return {
-        "question": question_payload,
-        "rating_summary": context.get("rating_summary", {}),
+        "question": selection.get("question"),
+        "rating_summary": {skill: float(rating) for skill, rating in context.get("rating_summary", {}).items()},
         "plan_index": context.get("plan_index", 0),
-        "remaining": remaining,
-        "completed": completed,
+        "remaining": selection.get("remaining"),
+        "completed": bool(selection.get("completed")),
     }
 
 
@@ -102,26 +196,184 @@ async def options_grade_answer() -> JSONResponse:
 
 @router.post("/grade_answer", response_model=GradeAnswerResponse)
 async def grade_answer(payload: GradeAnswerPayload) -> GradeAnswerResponse:
-    # TODO: Route to appropriate grader based on question type
+    result = await speculative_grader.take(payload.session_id, payload.question_id, payload.answer_payload)
+    if result is None:
+        question = await storage_service.get_question(payload.question_id)
+        result = await _grade(payload, question)
+    response = GradeAnswerResponse(**result)
+    await session_channel_hub.publish(
+        payload.session_id,
+        "grade_ready",
+        {"question_id": payload.question_id, **response.model_dump()},
+    )
+    return response
+
+
+@router.options("/grade_answer/upload")
+async def options_grade_answer_upload() -> JSONResponse:
+    return JSONResponse(status_code=200, content={})
+
+
+@router.post("/grade_answer/upload", response_model=GradeAnswerResponse)
+async def grade_answer_upload(request: Request) -> GradeAnswerResponse:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.answer_upload_max_bytes + 64 * 1024:
+        raise HTTPException(status_code=413, detail="Upload is too large")
+    try:
+        upload = await answer_upload_service.receive(request.stream(), request.headers.get("content-type", ""))
+        summary = await answer_upload_service.summarize(upload)
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    fields: dict[str, Any] = dict(upload.fields)
+    question = await storage_service.get_question(fields.get("question_id"))
+    if question is not None and question.get("type") in FORMULA_QUESTION_TYPES:
+        fields["cells"] = _workbook_cells(summary)
+    else:
+        formulas = [f"{entry['sheet']}!{entry['cell']} {entry['formula']}" for entry in summary["formulas"][:50]]
+        if formulas:
+            fields["text"] = "\n".join(filter(None, [fields.get("text", ""), "Workbook formulas: " + "; ".join(formulas)]))
+    try:
+        payload = GradeAnswerPayload(
+            session_id=fields.pop("session_id", ""),
+            question_id=fields.pop("question_id", ""),
+            answer_payload={
+                **fields,
+                "workbook_path": str(upload.path),
+                "workbook": {
+                    "filename": upload.filename,
+                    "sha256": upload.sha256,
+                    "size_bytes": upload.size_bytes,
+                    "duplicate": upload.duplicate,
+                },
+                "workbook_summary": summary,
+            },
+        )
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+    if not payload.session_id or not payload.question_id:
+        raise HTTPException(status_code=400, detail="session_id and question_id are required")
+    return await grade_answer(payload)
+
+
+def _workbook_cells(summary: dict[str, Any]) -> dict[str, str]:
+    sheet = summary["sheets"][0]["name"] if summary["sheets"] else None
+    return {entry["cell"]: entry["formula"] for entry in summary["formulas"] if entry["sheet"] == sheet}
+
+
+@router.options("/grade_answer/stream")
+async def options_grade_answer_stream() -> JSONResponse:
+    return JSONResponse(status_code=200, content={})
+
+
+@router.post("/grade_answer/stream")
+async def grade_answer_stream(payload: GradeAnswerPayload) -> StreamingResponse:
     question = await storage_service.get_question(payload.question_id)
+    return StreamingResponse(
+        _grade_events(payload, question),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _grade(payload: GradeAnswerPayload, question: dict[str, Any] | None) -> dict[str, Any]:
     question_type = question.get("type") if question is not None else "open"
 
     if question_type in {"mcq", "short_text", "shortcut"}:
-        result = await objective_grader.grade(payload.model_dump())
-    elif question_type in {"formula", "excel_formula"}:
-        result = await formula_grader.grade({
+        return await objective_grader.grade(payload.model_dump())
+    if question_type in FORMULA_QUESTION_TYPES:
+        return await formula_grader.grade({
+            "session_id": payload.session_id,
+            "question_id": payload.question_id,
+            "question_version": question.get("content_hash") if question else None,
             "question": question.get("meta") if question else {},
             "answer_payload": payload.answer_payload,
         })
+    return await rubric_grader.grade(_rubric_payload(payload, question))
+
+
+async def _grade_events(payload: GradeAnswerPayload, question: dict[str, Any] | None) -> AsyncIterator[str]:
+    speculative = await speculative_grader.take(payload.session_id, payload.question_id, payload.answer_payload)
+    if speculative is not None:
+        data = GradeAnswerResponse(**speculative).model_dump()
+        await session_channel_hub.publish(payload.session_id, "grade_ready", {"question_id": payload.question_id, **data})
+        yield _sse("grade", data)
+        return
+
+    question_type = question.get("type") if question is not None else "open"
+    if question_type in {"mcq", "short_text", "shortcut", "formula", "excel_formula"}:
+        result = await _grade(payload, question)
+        yield _sse("grade", GradeAnswerResponse(**result).model_dump())
+        return
+
+    async for event, data in rubric_grader.stream(_rubric_payload(payload, question)):
+        if event == "grade":
+            data = GradeAnswerResponse(**data).model_dump()
+            await session_channel_hub.publish(
+                payload.session_id,
+                "grade_ready",
+                {"question_id": payload.question_id, **data},
+            )
+        yield _sse(event, data)
+
+
+async def _grade_speculatively(payload: GradeAnswerPayload) -> dict[str, Any] | None:
+    question = await storage_service.get_question(payload.question_id)
+    if question is None:
+        return None
+    return await _grade(payload, question)
+
+
+async def _speculate_grade(session_id: str, event_data: dict[str, Any]) -> None:
+    answer_payload = event_data.get("answer_payload")
+    if not isinstance(answer_payload, dict):
+        text = next((event_data[key] for key in ("text", "answer", "utterance") if isinstance(event_data.get(key), str)), None)
+        answer_payload = {"text": text}
+    if not settings.speculative_grading_enabled or answer_fingerprint(answer_payload) is None:
+        return
+    question_id = event_data.get("question_id")
+    if not isinstance(question_id, str):
+        current_question = (await orchestrator_service.fetch_context(session_id)).get("current_question") or {}
+        question_id = current_question.get("id")
+    if not isinstance(question_id, str):
+        return
+    grade_payload = GradeAnswerPayload(session_id=session_id, question_id=question_id, answer_payload=answer_payload)
+    speculative_grader.speculate(session_id, question_id, answer_payload, lambda: _grade_speculatively(grade_payload))
+
+
+def _rubric_payload(payload: GradeAnswerPayload, question: dict[str, Any] | None) -> dict[str, Any]:
+    return {
+        "question": question or {},
+        "question_prompt": (question or {}).get("prompt", payload.answer_payload.get("question_prompt")),
+        "answer_payload": payload.answer_payload,
+    }
+
+
+def _hold_admission(response: StreamingResponse, admission: AsyncExitStack) -> None:
+    body_iterator = response.body_iterator
+
+    async def release_when_done() -> AsyncIterator[Any]:
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            await admission.aclose()
+
+    response.body_iterator = release_when_done()
+    release = BackgroundTask(admission.aclose)
+    if response.background is None:
+        response.background = release
     else:
-        result = await rubric_grader.grade(
-            {
-                "question": question or {},
-                "question_prompt": (question or {}).get("prompt", payload.answer_payload.get("question_prompt")),
-                "answer_payload": payload.answer_payload,
-            }
-        )
-    return GradeAnswerResponse(**result)
+        tasks = BackgroundTasks()
+        tasks.add_task(response.background)
+        tasks.add_task(release)
+        response.background = tasks
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
 
 
 @router.options("/record_outcome")
@@ -131,15 +383,15 @@ async def options_record_outcome() -> JSONResponse:
 
 @router.post("/record_outcome", response_model=RecordOutcomeResponse)
 async def record_outcome(payload: RecordOutcomePayload) -> RecordOutcomeResponse:
-    # TODO: Persist attempt data and analytics
     session_id = payload.session_id
     question_id = payload.question_id
     if not session_id:
         raise HTTPException(status_code=400, detail="Invalid session_id")
 
     meta = payload.meta or {}
+    skill = meta.get("skill") if isinstance(meta.get("skill"), str) else None
 
-    await storage_service.record_attempt(
+    attempt = storage_service.record_attempt(
         session_id=session_id,
         question_id=question_id,
         score=payload.score,
@@ -150,40 +402,27 @@ async def record_outcome(payload: RecordOutcomePayload) -> RecordOutcomeResponse
         feedback=meta.get("feedback"),
         hints_used=meta.get("hints_used", 0),
     )
-
-    skill = meta.get("skill")
-    if isinstance(skill, str):
-        await storage_service.update_skill_metrics(
-            session_id=session_id,
-            skill=skill,
-            score=payload.score,
-            difficulty=payload.difficulty,
-            hints_used=meta.get("hints_used", 0),
+    try:
+        _, context = await asyncio.gather(
+            attempt,
+            orchestrator_service.apply_outcome(
+                session_id,
+                skill=skill,
+                score=payload.score,
+                difficulty=payload.difficulty,
+                hints_used=meta.get("hints_used", 0),
+                reported_ms=payload.time_ms,
+            ),
         )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return await _after_outcome(session_id, context.get("rating_summary", {}))
 
-    updated_states = await storage_service.list_skill_states(session_id)
-    rating_summary: dict[str, float] = {}
-    if updated_states:
-        skill_states_payload = [
-            {
-                "skill": state.get("skill"),
-                "rating": state.get("rating", 50),
-                "target_difficulty": state.get("target_difficulty", 2),
-                "asked_count": state.get("asked_count", 0),
-                "correct_count": state.get("correct_count", 0),
-            }
-            for state in updated_states
-        ]
-        rating_summary = {
-            entry["skill"]: entry["rating"]
-            for entry in skill_states_payload
-            if entry.get("skill")
-        }
-        cached_context = await orchestrator_service.fetch_context(session_id)
-        cached_context["skill_states"] = skill_states_payload
-        cached_context["rating_summary"] = rating_summary
-        await orchestrator_service.store_memory(session_id, cached_context)
 
+async def _after_outcome(session_id: str, rating_summary: dict[str, float]) -> RecordOutcomeResponse:
+    orchestrator_service.schedule_next_question(session_id)
+    if rating_summary:
+        await session_channel_hub.publish(session_id, "rating_updated", {"rating_summary": rating_summary})
     return RecordOutcomeResponse(ok=True, rating_summary=rating_summary)
 
 
@@ -209,6 +448,8 @@ async def finalize_session(payload: SessionPayload) -> FinalizeSessionResponse:
     if not session_id:
         raise HTTPException(status_code=400, detail="Invalid session_id")
 
+    orchestrator_service.discard_staged(session_id)
+    await session_archive_service.ensure_hot(session_id)
     attempts = await storage_service.list_attempts(session_id)
     total_attempts = len(attempts)
     average_score = sum(float(item.get("score", 0.0)) for item in attempts) / total_attempts if attempts else 0.0
@@ -230,6 +471,7 @@ async def finalize_session(payload: SessionPayload) -> FinalizeSessionResponse:
         f"Strengths: {', '.join(strength_text)}.\n"
         f"Focus areas: {', '.join(growth_text)}."
     )
+    await session_archive_service.schedule(session_id)
     return FinalizeSessionResponse(report_url=f"https://reports.example.com/{payload.session_id}", summary=summary)
 
 
@@ -245,6 +487,8 @@ async def log_interaction(payload: LogInteractionPayload) -> LogInteractionRespo
         raise HTTPException(status_code=400, detail="Invalid session_id")
 
     event_data = payload.payload or {}
+    if payload.event_type == "answer_received":
+        await _speculate_grade(session_id, event_data)
     plan = str(event_data.get("plan", payload.event_type))
     action = str(event_data.get("action", event_data.get("utterance", payload.event_type)))
     outcome = str(event_data.get("outcome", event_data.get("result", "logged")))
@@ -264,7 +508,7 @@ async def log_interaction(payload: LogInteractionPayload) -> LogInteractionRespo
     )
 
     if payload.event_type in {"question_asked", "answer_received", "feedback_shared"}:
-        await memory_service.append_transcript_turn(
+        await orchestrator_service.record_turn(
             payload.session_id,
             {
                 "event_type": payload.event_type,
@@ -273,3 +517,147 @@ async def log_interaction(payload: LogInteractionPayload) -> LogInteractionRespo
             },
         )
     return LogInteractionResponse(ok=True)
+
+
+ToolHandler = Callable[[Any], Awaitable[Any]]
+
+TOOL_HANDLERS: dict[str, tuple[type[BaseModel], ToolHandler]] = {
+    "get_next_question": (SessionPayload, get_next_question),
+    "grade_answer": (GradeAnswerPayload, grade_answer),
+    "record_outcome": (RecordOutcomePayload, record_outcome),
+    "update_difficulty": (SessionPayload, update_difficulty),
+    "finalize_session": (SessionPayload, finalize_session),
+    "log_interaction": (LogInteractionPayload, log_interaction),
+}
+
+
+@router.websocket("/ws/{session_id}")
+async def tool_channel(websocket: WebSocket, session_id: str) -> None:
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_text(dumps(message).decode())
+
+    await orchestrator_service.pin_context(session_id)
+    session_channel_hub.register(session_id, send)
+    pending: set[asyncio.Task[None]] = set()
+    try:
+        while True:
+            try:
+                message = loads(await websocket.receive_text())
+            except ValueError:
+                await send({"id": None, "ok": False, "error": {"status": 400, "detail": "Message is not valid JSON"}})
+                continue
+            task = asyncio.create_task(_handle_channel_message(session_id, message, send))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session_channel_hub.unregister(session_id, send)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await orchestrator_service.unpin_context(session_id)
+
+
+_channel_locks: dict[str, asyncio.Lock] = {}
+_channel_lock_users: Counter[str] = Counter()
+
+
+@asynccontextmanager
+async def _serialized(session_id: str) -> AsyncIterator[None]:
+    lock = _channel_locks.setdefault(session_id, asyncio.Lock())
+    _channel_lock_users[session_id] += 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _channel_lock_users[session_id] -= 1
+        if _channel_lock_users[session_id] <= 0:
+            del _channel_lock_users[session_id]
+            del _channel_locks[session_id]
+
+
+async def _handle_channel_message(
+    session_id: str,
+    message: Any,
+    send: Callable[[dict[str, Any]], Awaitable[None]],
+) -> None:
+    request_id = message.get("id") if isinstance(message, dict) else None
+    tool = message.get("tool") if isinstance(message, dict) else None
+    entry = TOOL_HANDLERS.get(tool) if isinstance(tool, str) else None
+    if entry is None:
+        await send({"id": request_id, "ok": False, "error": {"status": 404, "detail": f"Unknown tool: {tool}"}})
+        return
+
+    payload_model, handler = entry
+    body = {**(message.get("payload") or {}), "session_id": session_id}
+    idempotency_key = message.get("idempotency_key")
+    started_at = time.time()
+    try:
+        payload = payload_model.model_validate(body)
+        async with _serialized(session_id), admission_controller.admit(session_id):
+            with tracer.span(f"tool.{tool}", transport="ws", session_id=session_id, question_id=body.get("question_id")):
+                record = await _run_channel_tool(tool, handler, payload, body, idempotency_key)
+    except ValidationError as exc:
+        await send({"id": request_id, "ok": False, "error": {"status": 422, "detail": exc.errors(include_url=False)}})
+        return
+    except (AdmissionRejectedError, IdempotencyConflictError) as exc:
+        _capture_channel_call(tool, body, started_at, {"status": exc.status_code, "body": {"detail": exc.detail}})
+        await send({"id": request_id, "ok": False, "error": {"status": exc.status_code, "detail": exc.detail}})
+        return
+    except Exception:
+        logger.exception("Tool channel call %s failed for session %s", tool, session_id)
+        await send({"id": request_id, "ok": False, "error": {"status": 500, "detail": "Internal Server Error"}})
+        return
+
+    _capture_channel_call(tool, body, started_at, record)
+    if record["status"] >= 400:
+        await send({"id": request_id, "ok": False, "error": {"status": record["status"], "detail": record["body"].get("detail")}})
+        return
+    await send({"id": request_id, "ok": True, "result": record["body"]})
+
+
+def _capture_channel_call(tool: str, body: dict[str, Any], started_at: float, record: dict[str, Any]) -> None:
+    if traffic_capture.sampled(body["session_id"]):
+        traffic_capture.record(
+            tool=tool,
+            path=f"{router.prefix}/{tool}",
+            request=body,
+            started_at=started_at,
+            status=record["status"],
+            response=record["body"],
+            transport="ws",
+        )
+
+
+async def _run_channel_tool(
+    tool: str,
+    handler: ToolHandler,
+    payload: BaseModel,
+    body: dict[str, Any],
+    idempotency_key: Any,
+) -> dict[str, Any]:
+    if isinstance(idempotency_key, str) and idempotency_key and tool in IDEMPOTENT_TOOLS:
+        record, _ = await idempotency_service.run(
+            tool,
+            idempotency_key,
+            request_fingerprint(body),
+            lambda: _call_tool(handler, payload),
+        )
+        return record
+    return await _call_tool(handler, payload)
+
+
+async def _call_tool(handler: ToolHandler, payload: BaseModel) -> dict[str, Any]:
+    try:
+        result = await handler(payload)
+    except HTTPException as exc:
+        return {"status": exc.status_code, "body": {"detail": exc.detail}}
+    if isinstance(result, BaseModel):
+        result = result.model_dump(mode="json")
+    return {"status": 200, "body": result}
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Coroutine
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.serialization import trusted_response
+from app.models.tools import GetNextQuestionResponse, GradeAnswerResponse
+
+GRADE_RESULT = {
+    "score": 78.0,
+    "objective": {
+        "strengths": ["Uses absolute references correctly", "Explains the lookup fallback"],
+        "improvements": ["Mention XLOOKUP as an alternative", "Handle blank rows"],
+    },
+    "notes": "Solid answer with a correct formula and a clear explanation of edge cases.",
+    "auto_feedback": "Strengths: Uses absolute references correctly\nFocus areas: Mention XLOOKUP as an alternative",
+}
+
+NEXT_QUESTION = {
+    "question": {
+        "id": "q_formulas_2",
+        "skill": "formulas",
+        "difficulty": 2,
+        "type": "formula",
+        "prompt": "Write a formula that returns the price for the product code in A2 from the Prices table.",
+        "weight": 1.0,
+        "meta": {"expected": "=XLOOKUP(A2,Prices[Code],Prices[Price])", "hints": ["Use a lookup function"]},
+    },
+    "rating_summary": {"excel_basics": 62.5, "formulas": 55.0, "analysis": 50.0, "professionalism": 50.0},
+    "plan_index": 3,
+    "remaining": 4,
+    "completed": False,
+}
+
+
+def _measure(label: str, iterations: int, render: Callable[[], bytes]) -> float:
+    render()
+    started = time.process_time()
+    for _ in range(iterations):
+        render()
+    per_call_us = (time.process_time() - started) / iterations * 1_000_000
+    print(json.dumps({"case": label, "cpu_us_per_request": round(per_call_us, 2)}))
+    return per_call_us
+
+
+def _run_inline(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("response rendering unexpectedly suspended")
+
+
+def _standard(model: type[Any], build: Callable[[], Any]) -> Callable[[], bytes]:
+    field = create_response_field(name=f"Response_{model.__name__}", type_=model)
+
+    def render() -> bytes:
+        content = _run_inline(serialize_response(field=field, response_content=build()))
+        return JSONResponse(content).body
+
+    return render
+
+
+def _fast(model: type[Any], build: Callable[[], Any]) -> Callable[[], bytes]:
+    async def endpoint() -> Any:
+        return build()
+
+    route = trusted_response(endpoint, model)
+
+    def render() -> bytes:
+        return _run_inline(route()).body
+
+    return render
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare per-request CPU of the standard and fast response paths.")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    cases = {
+        "grade_answer": (GradeAnswerResponse, lambda: GradeAnswerResponse(**GRADE_RESULT)),
+        "get_next_question": (GetNextQuestionResponse, lambda: dict(NEXT_QUESTION)),
+    }
+    for name, (model, build) in cases.items():
+        standard = _standard(model, build)
+        fast = _fast(model, build)
+        if json.loads(standard()) != json.loads(fast()):
+            raise SystemExit(f"{name}: fast path output differs from the standard path")
+        baseline = _measure(f"{name}:standard", args.iterations, standard)
+        optimized = _measure(f"{name}:fast", args.iterations, fast)
+        print(json.dumps({"case": name, "cpu_us_saved": round(baseline - optimized, 2), "speedup": round(baseline / optimized, 2)}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
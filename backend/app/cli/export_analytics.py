@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+
+from app.db import close_mongo_connection, connect_to_mongo
+from app.services.analytics_export import EXPORT_COLLECTIONS, analytics_export_service
+from app.services.storage import storage_service
+
+
+async def _run(args: argparse.Namespace) -> int:
+    database = await connect_to_mongo()
+    if database is None:
+        print("MongoDB is not reachable; nothing to export.", file=sys.stderr)
+        return 1
+    storage_service.configure(database)
+    try:
+        for collection in args.collections:
+            checkpoint = await analytics_export_service.export_to_directory(
+                collection,
+                args.output,
+                file_format=args.format,
+                start=args.start,
+                end=args.end,
+                resume=not args.restart,
+                batch_size=args.batch_size,
+            )
+            print(json.dumps(asdict(checkpoint)))
+    finally:
+        storage_service.configure(None)
+        await close_mongo_connection()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export analytics collections as NDJSON or Parquet.")
+    parser.add_argument("collections", nargs="+", choices=EXPORT_COLLECTIONS)
+    parser.add_argument("--output", type=Path, default=Path("exports"))
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint and export from scratch.")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
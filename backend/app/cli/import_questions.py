@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict
+from pathlib import Path
+
+from app.db import close_mongo_connection, connect_to_mongo
+from app.services.question_import import question_import_service
+from app.services.storage import storage_service
+
+
+async def _run(path: Path, batch_size: int) -> int:
+    database = await connect_to_mongo()
+    if database is None:
+        print("MongoDB is not reachable; refusing to import into process memory.", file=sys.stderr)
+        return 1
+    storage_service.configure(database)
+    try:
+        report = await question_import_service.import_path(path, batch_size=batch_size)
+    finally:
+        storage_service.configure(None)
+        await close_mongo_connection()
+    print(json.dumps(asdict(report), indent=2))
+    return 0 if report.failed == 0 else 2
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import questions from an .xlsx or .csv file into the question bank.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args.path, args.batch_size))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import settings
+from app.db import close_mongo_connection, connect_to_mongo
+from app.services.regrade import REGRADERS, RegradeCheckpoint, cohort_regrader
+from app.services.storage import storage_service
+
+
+async def _run(args: argparse.Namespace) -> int:
+    database = await connect_to_mongo()
+    if database is None:
+        print("MongoDB is not reachable; nothing to regrade.", file=sys.stderr)
+        return 1
+    storage_service.configure(database)
+    try:
+        checkpoint = None if args.restart else await cohort_regrader.load(args.run_id)
+        if checkpoint is not None and checkpoint.status == "completed":
+            print(json.dumps(checkpoint.summary()))
+            return 0
+        if checkpoint is None:
+            session_ids = list(args.session or [])
+            if args.sessions_file is not None:
+                session_ids += [line.strip() for line in args.sessions_file.read_text().splitlines() if line.strip()]
+            checkpoint = RegradeCheckpoint(
+                run_id=args.run_id,
+                grader=args.grader,
+                model=args.model,
+                start=args.start.isoformat() if args.start else None,
+                end=args.end.isoformat() if args.end else None,
+                session_ids=session_ids or None,
+                question_ids=args.question,
+                skills=args.skill,
+            )
+        if checkpoint.model:
+            settings.default_model = checkpoint.model
+        print(f"Regrade run {checkpoint.run_id} ({checkpoint.grader})", file=sys.stderr)
+        checkpoint = await cohort_regrader.run(
+            checkpoint,
+            concurrency=args.concurrency,
+            workers=args.workers,
+            batch_size=args.batch_size,
+        )
+        print(json.dumps(checkpoint.summary()))
+    finally:
+        storage_service.configure(None)
+        await close_mongo_connection()
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-grade historical attempts for a cohort and store score deltas.")
+    parser.add_argument("--run-id", default=f"{datetime.utcnow():%Y%m%d%H%M%S}", help="Resume this run if it has a checkpoint.")
+    parser.add_argument("--grader", choices=REGRADERS, default="rubric")
+    parser.add_argument("--model", default=None, help="Model for rubric grading; defaults to DEFAULT_MODEL.")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--session", action="append", help="Restrict the cohort to this session; repeatable.")
+    parser.add_argument("--sessions-file", type=Path, default=None, help="File with one session id per line.")
+    parser.add_argument("--question", action="append", help="Restrict the cohort to this question; repeatable.")
+    parser.add_argument("--skill", action="append", help="Restrict the cohort to questions of this skill; repeatable.")
+    parser.add_argument("--concurrency", type=int, default=None, help="Attempts in flight for rubric grading.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for local grading.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint for this run id.")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+import httpx
+import orjson
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.db import close_mongo_connection, connect_to_mongo
+from app.services.graders.dispatcher import BATCH_JSON_SCHEMA
+from app.services.storage import storage_service
+from app.services.traffic_capture import CapturedCall, read_capture, traffic_capture, write_capture
+
+VOLATILE_FIELDS = {"report_url", "elapsed_us", "expires_at", "created_at", "updated_at"}
+DIFF_SAMPLE_LIMIT = 20
+
+
+@dataclass
+class ReplayOutcome:
+    tool: str
+    status: int | None
+    latency_ms: float
+    lag_ms: float
+    captured_latency_ms: float | None = None
+    status_mismatch: bool = False
+    diffs: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+def build_model_stub(latency_ms: float = 0.0) -> FastAPI:
+    stub = FastAPI(title="Model stub")
+
+    @stub.post("/responses")
+    async def responses(request: Request) -> Any:
+        body = await request.json()
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        text = "".join(
+            str(chunk.get("text", "")) for item in body.get("input", []) for chunk in item.get("content", [])
+        )
+        schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+        if schema is None:
+            return {"output": [{"content": [{"type": "output_text", "text": f"Summary: {_stub_grade(text)['summary']}"}]}]}
+        if schema == BATCH_JSON_SCHEMA["name"]:
+            sections = text.split("\n\n---\n\n")
+            parsed: dict[str, Any] = {
+                "grades": [{"index": index, **_stub_grade(section)} for index, section in enumerate(sections)]
+            }
+        else:
+            parsed = _stub_grade(text)
+        completed = {"output": [{"content": [{"type": "output_json_schema", "json": parsed}]}]}
+        if not body.get("stream"):
+            return completed
+        return StreamingResponse(_stub_stream(parsed, completed), media_type="text/event-stream")
+
+    @stub.post("/realtime/client_secrets")
+    async def client_secrets() -> dict[str, Any]:
+        return {"value": "stub-secret", "session": {"id": "stub-realtime"}, "expires_at": int(time.time()) + 600}
+
+    return stub
+
+
+def _stub_grade(text: str) -> dict[str, Any]:
+    digest = hashlib.blake2b(text.encode(), digest_size=8).digest()
+    return {
+        "score": float(40 + int.from_bytes(digest, "big") % 61),
+        "strengths": ["Addresses the question directly"],
+        "improvements": ["Explain edge cases"],
+        "summary": f"Deterministic stub grade {digest.hex()[:8]}",
+    }
+
+
+async def _stub_stream(parsed: dict[str, Any], completed: dict[str, Any]) -> AsyncIterator[bytes]:
+    text = json.dumps(parsed)
+    for offset in range(0, len(text), 32):
+        event = {"type": "response.output_text.delta", "delta": text[offset:offset + 32]}
+        yield b"data: " + orjson.dumps(event) + b"\n\n"
+    yield b"data: " + orjson.dumps({"type": "response.completed", "response": completed}) + b"\n\n"
+    yield b"data: [DONE]\n\n"
+
+
+def diff_bodies(expected: Any, actual: Any, ignore: set[str], path: str = "$") -> list[str]:
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs: list[str] = []
+        for key in sorted(expected.keys() | actual.keys()):
+            if key in ignore:
+                continue
+            if key not in actual:
+                diffs.append(f"{path}.{key}: missing")
+            elif key not in expected:
+                diffs.append(f"{path}.{key}: unexpected")
+            else:
+                diffs.extend(diff_bodies(expected[key], actual[key], ignore, f"{path}.{key}"))
+        return diffs
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{path}: length {len(expected)} != {len(actual)}"]
+        return [
+            diff
+            for index, (left, right) in enumerate(zip(expected, actual))
+            for diff in diff_bodies(left, right, ignore, f"{path}[{index}]")
+        ]
+    numeric = (int, float)
+    if isinstance(expected, numeric) and isinstance(actual, numeric) and not isinstance(expected, bool):
+        if abs(expected - actual) <= 1e-6 * max(1.0, abs(expected)):
+            return []
+    elif expected == actual and isinstance(expected, bool) == isinstance(actual, bool):
+        return []
+    return [f"{path}: {expected!r} != {actual!r}"]
+
+
+def _remap(value: Any, original: str, replacement: str) -> Any:
+    if isinstance(value, str):
+        return value.replace(original, replacement) if original in value else value
+    if isinstance(value, dict):
+        return {key: _remap(item, original, replacement) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_remap(item, original, replacement) for item in value]
+    return value
+
+
+async def _replay_session(
+    client: httpx.AsyncClient,
+    calls: list[CapturedCall],
+    replay_id: str,
+    start_at: float,
+    speed: float,
+    ignore: set[str],
+    outcomes: list[ReplayOutcome],
+) -> None:
+    loop = asyncio.get_running_loop()
+    original = calls[0].session_id
+    first = calls[0].started_at
+    for call in calls:
+        scheduled = start_at + (call.started_at - first) / speed
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lag_ms = max(loop.time() - scheduled, 0.0) * 1000
+        request = _remap(call.request, original, replay_id)
+        url = f"{settings.api_v1_prefix}{call.path}"
+        started = time.perf_counter()
+        outcome = ReplayOutcome(tool=call.tool, status=None, latency_ms=0.0, lag_ms=lag_ms, captured_latency_ms=call.latency_ms)
+        try:
+            if call.path.endswith("/stream"):
+                async with client.stream("POST", url, json=request) as response:
+                    async for _ in response.aiter_raw():
+                        pass
+                body = None
+            else:
+                response = await client.post(url, json=request)
+                body = response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+        except httpx.HTTPError as exc:
+            outcome.latency_ms = (time.perf_counter() - started) * 1000
+            outcome.error = repr(exc)
+            outcomes.append(outcome)
+            continue
+        outcome.latency_ms = (time.perf_counter() - started) * 1000
+        outcome.status = response.status_code
+        if call.status is not None:
+            outcome.status_mismatch = call.status != response.status_code
+            if call.response is not None and body is not None:
+                outcome.diffs = diff_bodies(_remap(call.response, original, replay_id), body, ignore)
+        outcomes.append(outcome)
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> float:
+        return round(ordered[min(int(fraction * len(ordered)), len(ordered) - 1)], 3)
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 3)}
+
+
+def build_report(outcomes: list[ReplayOutcome], sessions: int, elapsed: float) -> dict[str, Any]:
+    by_tool: dict[str, list[ReplayOutcome]] = defaultdict(list)
+    for outcome in outcomes:
+        by_tool[outcome.tool].append(outcome)
+    samples = [
+        f"{outcome.tool} {diff}" for outcome in outcomes for diff in outcome.diffs
+    ][:DIFF_SAMPLE_LIMIT]
+    return {
+        "sessions": sessions,
+        "calls": len(outcomes),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(outcomes) / elapsed, 2) if elapsed else 0.0,
+        "schedule_lag_ms": _percentiles([outcome.lag_ms for outcome in outcomes]),
+        "tools": {
+            tool: {
+                "count": len(items),
+                "errors": sum(1 for item in items if item.error or (item.status or 0) >= 500),
+                "shed": sum(1 for item in items if item.status == 503),
+                "status_mismatches": sum(1 for item in items if item.status_mismatch),
+                "body_mismatches": sum(1 for item in items if item.diffs),
+                "latency_ms": _percentiles([item.latency_ms for item in items]),
+                "captured_latency_ms": _percentiles(
+                    [item.captured_latency_ms for item in items if item.captured_latency_ms is not None]
+                ),
+            }
+            for tool, items in sorted(by_tool.items())
+        },
+        "diff_samples": samples,
+    }
+
+
+async def replay(
+    sessions: dict[str, list[CapturedCall]],
+    *,
+    base_url: str,
+    speed: float = 1.0,
+    multiplier: int = 1,
+    stagger_seconds: float = 0.0,
+    connections: int = 200,
+    ignore: set[str] | None = None,
+    run_id: str | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[str, Any]:
+    run_id = run_id or f"replay-{int(time.time())}"
+    ignore = VOLATILE_FIELDS | (ignore or set())
+    ordered = sorted(sessions.values(), key=lambda calls: calls[0].started_at)
+    origin = ordered[0][0].started_at if ordered else 0.0
+    outcomes: list[ReplayOutcome] = []
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0, transport=transport) as client:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = [
+            _replay_session(
+                client,
+                calls,
+                f"{run_id}-{clone}-{calls[0].session_id}",
+                start + (calls[0].started_at - origin) / speed + clone * stagger_seconds,
+                speed,
+                ignore,
+                outcomes,
+            )
+            for calls in ordered
+            for clone in range(multiplier)
+        ]
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+    return build_report(outcomes, len(tasks), elapsed)
+
+
+async def _derive(args: argparse.Namespace) -> int:
+    database = await connect_to_mongo()
+    if database is None:
+        print("MongoDB is not reachable; nothing to derive.", file=sys.stderr)
+        return 1
+    storage_service.configure(database)
+    try:
+        sessions = await traffic_capture.derive_from_storage(start=args.start, end=args.end)
+    finally:
+        storage_service.configure(None)
+        await close_mongo_connection()
+    written = write_capture(args.output, (call for calls in sessions.values() for call in calls))
+    print(json.dumps({"sessions": len(sessions), "calls": written, "output": str(args.output)}))
+    return 0
+
+
+def _replay(args: argparse.Namespace) -> int:
+    sessions = read_capture(args.captures)
+    if args.max_sessions:
+        sessions = dict(sorted(sessions.items(), key=lambda item: item[1][0].started_at)[: args.max_sessions])
+    if not sessions:
+        print("Capture contains no sessions.", file=sys.stderr)
+        return 1
+    report = asyncio.run(
+        replay(
+            sessions,
+            base_url=args.base_url,
+            speed=args.speed,
+            multiplier=args.multiplier,
+            stagger_seconds=args.stagger,
+            connections=args.connections,
+            ignore=set(args.ignore),
+        )
+    )
+    rendered = json.dumps(report, indent=2)
+    if args.report:
+        args.report.write_text(rendered + "\n", encoding="utf-8")
+    print(rendered)
+    return 0
+
+
+def _stub(args: argparse.Namespace) -> int:
+    import uvicorn
+
+    uvicorn.run(build_model_stub(args.latency_ms), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Capture-driven load testing: derive captures, stub the model and replay traffic.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    derive = commands.add_parser("derive", help="Build a capture file from stored attempts and agent events.")
+    derive.add_argument("--output", type=Path, default=Path("captures") / "derived.jsonl")
+    derive.add_argument("--start", type=datetime.fromisoformat, default=None)
+    derive.add_argument("--end", type=datetime.fromisoformat, default=None)
+
+    run = commands.add_parser("replay", help="Re-issue captured sessions against a running instance.")
+    run.add_argument("captures", nargs="+", type=Path)
+    run.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run.add_argument("--speed", type=float, default=1.0, help="Time compression factor; 10 replays ten times faster.")
+    run.add_argument("--multiplier", type=int, default=1, help="Replay each captured session this many times.")
+    run.add_argument("--stagger", type=float, default=0.0, help="Seconds between the start of cloned sessions.")
+    run.add_argument("--connections", type=int, default=200)
+    run.add_argument("--max-sessions", type=int, default=0)
+    run.add_argument("--ignore", action="append", default=[], help="Response field to skip when diffing.")
+    run.add_argument("--report", type=Path, default=None)
+
+    stub = commands.add_parser("stub", help="Serve deterministic model responses; point OPENAI_BASE_URL at it.")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8900)
+    stub.add_argument("--latency-ms", type=float, default=0.0)
+
+    args = parser.parse_args(argv)
+    if args.command == "derive":
+        return asyncio.run(_derive(args))
+    if args.command == "replay":
+        return _replay(args)
+    return _stub(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
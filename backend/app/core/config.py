@@ -15,13 +15,105 @@ class Settings(BaseSettings):
     project_name: str = "Agentic Interview Platform"
     mongo_dsn: str = "mongodb://localhost:27017"
     mongo_db_name: str = "interview"
+    mongo_server_selection_timeout_ms: int = 500
+    session_aggregate_layout: bool = False
     redis_url: str = ""
     s3_bucket: str = "interview-agent-artifacts"
+    s3_endpoint_url: str = ""
+    archive_backend: str = "local"
+    archive_local_dir: str = str(BACKEND_DIR / "var" / "archive")
+    archive_after_finalize_seconds: float = 900.0
+    archive_sweep_interval_seconds: float = 300.0
+    archive_sweep_batch_size: int = 50
     openai_api_key: str = ""
+    openai_base_url: str = "https://api.openai.com/v1"
     realtime_model: str = "gpt-4o-realtime-preview"
     default_model: str = "gpt-4o-mini"
     default_verbosity: str = "medium"
     default_reasoning_effort: str = "medium"
+    grading_requests_per_minute: float = 500
+    grading_tokens_per_minute: float = 200_000
+    grading_max_queue: int = 200
+    grading_max_concurrency: int = 8
+    grading_batch_size: int = 4
+    grading_batch_threshold: int = 8
+    grading_max_retries: int = 3
+    grading_backoff_max_seconds: float = 8.0
+    grading_timeout_seconds: float = 20.0
+    local_grader_prefilter: bool = True
+    realtime_token_timeout_seconds: float = 10.0
+    breaker_window_seconds: float = 60.0
+    breaker_min_requests: int = 10
+    breaker_error_threshold: float = 0.5
+    breaker_cooldown_seconds: float = 15.0
+    breaker_half_open_probes: int = 2
+    breaker_timeout_multiplier: float = 1.5
+    breaker_min_timeout_seconds: float = 2.0
+    admission_max_concurrency: int = 64
+    admission_max_per_session: int = 4
+    admission_max_queue: int = 256
+    admission_queue_timeout_seconds: float = 5.0
+    admission_degrade_ratio: float = 0.8
+    admission_session_ttl_seconds: float = 3600.0
+    admission_session_memory: int = 10_000
+    plan_max_questions: int = 8
+    plan_max_per_skill: int = 3
+    plan_time_budget_ms: int = 30 * 60 * 1000
+    plan_max_question_ms: int = 10 * 60 * 1000
+    plan_opening_skill: str = "excel_basics"
+    plan_closing_skill: str = "professionalism"
+    plan_index_refresh_seconds: float = 300.0
+    question_stats_refresh_seconds: float = 60.0
+    question_stats_min_attempts: int = 20
+    question_stats_tolerance: float = 0.2
+    question_stats_lag_seconds: float = 60.0
+    transcript_window_turns: int = 12
+    transcript_compact_batch: int = 12
+    transcript_summary_highlights: int = 16
+    transcript_highlight_chars: int = 160
+    transcript_llm_summary: bool = False
+    transcript_abstract_chars: int = 1200
+    reconnect_base_delay_seconds: float = 0.5
+    reconnect_max_delay_seconds: float = 30.0
+    health_check_interval_seconds: float = 5.0
+    degraded_write_buffer_size: int = 10_000
+    idempotency_ttl_seconds: float = 600.0
+    idempotency_wait_seconds: float = 30.0
+    answer_upload_dir: str = str(BACKEND_DIR / "var" / "answers")
+    answer_upload_max_bytes: int = 25 * 1024 * 1024
+    answer_upload_spool_bytes: int = 1024 * 1024
+    answer_upload_max_age_seconds: float = 30 * 24 * 3600
+    answer_upload_dir_max_bytes: int = 10 * 1024 * 1024 * 1024
+    answer_summary_cache_size: int = 256
+    tracing_exporter: str = "none"
+    tracing_file_path: str = str(BACKEND_DIR / "var" / "traces" / "spans.jsonl")
+    tracing_flush_seconds: float = 1.0
+    tracing_buffer_size: int = 10_000
+    profiler_sample_rate: float = 0.0
+    profiler_token: str = ""
+    admin_token: str = ""
+    profiler_interval_ms: float = 5.0
+    profiler_output_dir: str = str(BACKEND_DIR / "var" / "profiles")
+    profiler_max_files: int = 200
+    profiler_max_age_seconds: float = 7 * 24 * 3600
+    formula_grader_max_sessions: int = 500
+    speculative_grading_enabled: bool = True
+    speculative_grading_ttl_seconds: float = 120.0
+    speculative_grading_max_entries: int = 1000
+    traffic_capture_rate: float = 0.0
+    traffic_capture_dir: str = str(BACKEND_DIR / "var" / "captures")
+    traffic_capture_flush_seconds: float = 1.0
+    traffic_capture_buffer_size: int = 10_000
+    traffic_capture_max_age_seconds: float = 7 * 24 * 3600
+    traffic_capture_max_bytes: int = 1024 * 1024 * 1024
+    regrade_requests_per_minute: float = 100
+    regrade_tokens_per_minute: float = 50_000
+    regrade_concurrency: int = 16
+    regrade_lease_seconds: float = 300.0
+    staged_selection_ttl_seconds: float = 600.0
+    staged_selection_max_sessions: int = 10_000
+    memory_store_budget_bytes: int = 256 * 1024 * 1024
+    memory_store_spill_dir: str = str(BACKEND_DIR / "var" / "spill")
     hunter_api_key: str = ""
     cors_allow_origins: str = ""
     cors_allow_origin_regex: str = ""
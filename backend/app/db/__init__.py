@@ -1,3 +1,3 @@
-from .mongo import close_mongo_connection, connect_to_mongo, get_database
+from .mongo import close_mongo_connection, connect_to_mongo, get_database, mongo_status, start_mongo_supervisor
 
-__all__ = ["connect_to_mongo", "close_mongo_connection", "get_database"]
+__all__ = ["connect_to_mongo", "close_mongo_connection", "get_database", "mongo_status", "start_mongo_supervisor"]
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from app.core.config import settings
+from app.db.supervisor import ConnectionSupervisor
 
 
 _client: AsyncIOMotorClient | None = None
 _database: AsyncIOMotorDatabase | None = None
+_supervisor: ConnectionSupervisor | None = None
 
 
 async def connect_to_mongo() -> Optional[AsyncIOMotorDatabase]:
@@ -18,18 +20,62 @@ async def connect_to_mongo() -> Optional[AsyncIOMotorDatabase]:
         _database = None
         return None
     try:
-        _client = AsyncIOMotorClient(settings.mongo_dsn, serverSelectionTimeoutMS=500)
-        await _client.admin.command("ping")
+        await _open()
     except Exception:
+        if _client is not None:
+            _client.close()
         _client = None
         _database = None
         return None
-    _database = _client[settings.mongo_db_name]
     return _database
 
 
+def start_mongo_supervisor(
+    *,
+    on_up: Callable[[AsyncIOMotorDatabase], Awaitable[None]],
+    on_down: Callable[[], Awaitable[None]],
+    on_healthy: Callable[[], Awaitable[None]] | None = None,
+) -> ConnectionSupervisor:
+    global _supervisor
+
+    async def handle_up() -> None:
+        if _database is not None:
+            await on_up(_database)
+
+    async def handle_down() -> None:
+        global _database
+        _database = None
+        await on_down()
+
+    _supervisor = ConnectionSupervisor(
+        "mongo",
+        connect=_open,
+        check=_ping,
+        on_up=handle_up,
+        on_down=handle_down,
+        on_healthy=on_healthy,
+        base_delay=settings.reconnect_base_delay_seconds,
+        max_delay=settings.reconnect_max_delay_seconds,
+        check_interval=settings.health_check_interval_seconds,
+    )
+    if settings.mongo_dsn:
+        _supervisor.start()
+    else:
+        _supervisor.disable()
+    return _supervisor
+
+
+def mongo_status() -> dict[str, object]:
+    if _supervisor is None:
+        return {"state": "connected" if _database is not None else "disabled"}
+    return _supervisor.status()
+
+
 async def close_mongo_connection() -> None:
-    global _client, _database
+    global _client, _database, _supervisor
+    if _supervisor is not None:
+        await _supervisor.stop()
+    _supervisor = None
     if _client is not None:
         _client.close()
     _client = None
@@ -40,3 +86,20 @@ def get_database() -> AsyncIOMotorDatabase:
     if _database is None:
         raise RuntimeError("Mongo database is not initialized. Call connect_to_mongo first.")
     return _database
+
+
+async def _open() -> None:
+    global _client, _database
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            settings.mongo_dsn,
+            serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+        )
+    await _client.admin.command("ping")
+    _database = _client[settings.mongo_db_name]
+
+
+async def _ping() -> None:
+    if _client is None:
+        raise RuntimeError("Mongo client is not initialized")
+    await _client.admin.command("ping")
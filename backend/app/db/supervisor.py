@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+DISABLED = "disabled"
+CONNECTING = "connecting"
+CONNECTED = "connected"
+DEGRADED = "degraded"
+
+
+class ConnectionSupervisor:
+    """Keeps a backing store connected, reconnecting with exponential backoff after failures."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        connect: Callable[[], Awaitable[None]],
+        check: Callable[[], Awaitable[None]],
+        on_up: Callable[[], Awaitable[None]] | None = None,
+        on_down: Callable[[], Awaitable[None]] | None = None,
+        on_healthy: Callable[[], Awaitable[None]] | None = None,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        check_interval: float = 5.0,
+    ) -> None:
+        self.name = name
+        self._connect = connect
+        self._check = check
+        self._on_up = on_up
+        self._on_down = on_down
+        self._on_healthy = on_healthy
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._check_interval = check_interval
+        self.state = CONNECTING
+        self.last_error: str | None = None
+        self.reconnects = 0
+        self._failures = 0
+        self._ever_connected = False
+        self._task: asyncio.Task[None] | None = None
+        self._wake = asyncio.Event()
+
+    @property
+    def is_connected(self) -> bool:
+        return self.state == CONNECTED
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def disable(self) -> None:
+        self.state = DISABLED
+
+    def report_failure(self, exc: BaseException) -> None:
+        if self.state not in (CONNECTED, CONNECTING):
+            return
+        self.last_error = repr(exc)
+        self.state = DEGRADED
+        self._wake.set()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "last_error": self.last_error,
+            "reconnects": self.reconnects,
+            "consecutive_failures": self._failures,
+        }
+
+    async def _run(self) -> None:
+        degraded_notified = False
+        while True:
+            if self.state != CONNECTED:
+                if not degraded_notified and self._on_down is not None:
+                    await self._notify(self._on_down)
+                degraded_notified = True
+                try:
+                    await self._connect()
+                except Exception as exc:
+                    self._failures += 1
+                    self.last_error = repr(exc)
+                    self.state = DEGRADED
+                    delay = min(self._max_delay, self._base_delay * 2 ** min(self._failures - 1, 16))
+                    delay *= random.uniform(0.5, 1.0)
+                    logger.warning("%s unavailable (%s); retrying in %.1fs", self.name, exc, delay)
+                    await self._sleep(delay)
+                    continue
+                if self._ever_connected:
+                    self.reconnects += 1
+                    logger.info("%s connection restored", self.name)
+                self._ever_connected = True
+                self._failures = 0
+                self.state = CONNECTED
+                degraded_notified = False
+                if self._on_up is not None:
+                    await self._notify(self._on_up)
+
+            await self._sleep(self._check_interval)
+            if self.state != CONNECTED:
+                continue
+            try:
+                await self._check()
+            except Exception as exc:
+                self.last_error = repr(exc)
+                self.state = DEGRADED
+                logger.warning("%s health check failed: %s", self.name, exc)
+                continue
+            if self._on_healthy is not None:
+                await self._notify(self._on_healthy)
+
+    async def _sleep(self, delay: float) -> None:
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _notify(self, callback: Callable[[], Awaitable[None]]) -> None:
+        try:
+            await callback()
+        except Exception:
+            logger.exception("%s state callback failed", self.name)
@@ -1,16 +1,32 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import realtime, tools
+from app.api import admin, realtime, tools
+from app.api.middleware import ProfilingMiddleware
 from app.core.config import settings
-from app.db import close_mongo_connection, connect_to_mongo
+from app.db import close_mongo_connection, mongo_status, start_mongo_supervisor
+from app.services.admission import admission_controller
+from app.services.circuit_breaker import circuit_breakers
+from app.services.graders import grading_dispatcher
+from app.services.memory import memory_service
+from app.services.orchestrator import orchestrator_service
+from app.services.plan_engine import plan_engine
+from app.services.question_stats import question_stats_service
+from app.services.session_archive import session_archive_service
+from app.services.speculative_grading import speculative_grader
 from app.services.storage import storage_service
+from app.services.tracing import tracer
+from app.services.traffic_capture import traffic_capture
+from app.services.transcript_compaction import transcript_compactor
 
 app = FastAPI(title=settings.project_name)
 app.include_router(tools.router, prefix=settings.api_v1_prefix)
 app.include_router(realtime.router, prefix=settings.api_v1_prefix)
+app.include_router(admin.router, prefix=settings.api_v1_prefix)
 
 default_origins = {
     "http://localhost:5173",
@@ -35,11 +51,38 @@ app.add_middleware(
     allow_headers=["*"],
     allow_origin_regex=origin_regex,
 )
+app.add_middleware(ProfilingMiddleware)
 
 
 @app.get("/health", tags=["health"])
-async def health_check() -> dict[str, str]:
-    return {"status": "ok"}
+async def health_check() -> dict[str, Any]:
+    breakers = {name: breaker.state for name, breaker in circuit_breakers.items()}
+    dependencies = {
+        "mongo": {**mongo_status(), "pending_writes": storage_service.pending_write_count()},
+        "redis": memory_service.status(),
+    }
+    healthy = all(state == "closed" for state in breakers.values()) and all(
+        dependency["state"] in {"connected", "disabled"} for dependency in dependencies.values()
+    )
+    return {
+        "status": "ok" if healthy else "degraded",
+        "circuit_breakers": breakers,
+        "dependencies": dependencies,
+    }
+
+
+@app.get("/metrics", tags=["health"])
+async def metrics() -> dict[str, dict]:
+    return {
+        "admission": admission_controller.snapshot(),
+        "grading": grading_dispatcher.snapshot(),
+        "circuit_breakers": {name: breaker.snapshot() for name, breaker in circuit_breakers.items()},
+        "memory_store": storage_service.memory_snapshot(),
+        "speculative_grading": speculative_grader.snapshot(),
+        "orchestrator": orchestrator_service.snapshot(),
+        "transcript_compaction": transcript_compactor.snapshot(),
+        "traffic_capture": traffic_capture.snapshot(),
+    }
 
 
 @app.get("/")
@@ -47,13 +90,41 @@ async def root() -> dict[str, str]:
     return {"status": "running"}
 
 
+async def _on_mongo_up(database) -> None:
+    storage_service.configure(database)
+    await storage_service.replay_pending_writes()
+
+
+async def _on_mongo_healthy() -> None:
+    # Writes the first replay could not flush are retried on every successful health check.
+    await storage_service.replay_pending_writes()
+
+
+async def _on_mongo_down() -> None:
+    storage_service.configure(None, degraded=True)
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
-    database = await connect_to_mongo()
-    storage_service.configure(database)
+    storage_service.configure(None, degraded=bool(settings.mongo_dsn))
+    start_mongo_supervisor(on_up=_on_mongo_up, on_down=_on_mongo_down, on_healthy=_on_mongo_healthy)
+    tracer.start()
+    traffic_capture.start()
+    memory_service.start()
+    question_stats_service.start()
+    plan_engine.start()
+    session_archive_service.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    storage_service.configure(None)
+    await session_archive_service.stop()
+    await plan_engine.stop()
+    await question_stats_service.stop()
+    await memory_service.close()
     await close_mongo_connection()
+    storage_service.configure(None)
+    storage_service.close_memory_store()
+    await tracer.stop()
+    await traffic_capture.stop()
+    await grading_dispatcher.close()
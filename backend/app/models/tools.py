@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class SessionPayload(BaseModel):
@@ -50,6 +50,12 @@ class RecordOutcomePayload(BaseModel):
     difficulty: int
     meta: dict[str, Any] = Field(default_factory=dict)
 
+    @field_validator("score")
+    @classmethod
+    def _score_fraction(cls, value: float) -> float:
+        # Graders report 0-100; attempts and ratings store a 0-1 fraction, so convert once here.
+        return min(max(value / 100 if value > 1 else value, 0.0), 1.0)
+
 
 class RecordOutcomeResponse(BaseModel):
     ok: bool
@@ -1,11 +1,31 @@
+from .admission import admission_controller
+from .analytics_export import analytics_export_service
+from .circuit_breaker import circuit_breakers
 from .difficulty import difficulty_service
 from .memory import memory_service
 from .orchestrator import orchestrator_service
+from .plan_engine import plan_engine
+from .question_stats import question_stats_service
+from .question_import import question_import_service
+from .regrade import cohort_regrader
+from .session_archive import session_archive_service
+from .speculative_grading import speculative_grader
 from .storage import storage_service
+from .traffic_capture import traffic_capture
 
 __all__ = [
+    "admission_controller",
+    "analytics_export_service",
+    "circuit_breakers",
+    "cohort_regrader",
     "difficulty_service",
     "memory_service",
     "orchestrator_service",
+    "plan_engine",
+    "question_import_service",
+    "question_stats_service",
+    "session_archive_service",
+    "speculative_grader",
     "storage_service",
+    "traffic_capture",
 ]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator
+
+from app.core.config import settings
+
+PRIORITY_ACTIVE = 0
+PRIORITY_NEW = 1
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request is shed instead of being admitted."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(f"Server is busy ({reason}); retry shortly")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = 503
+        self.detail = str(self)
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    sequence: int
+    session_id: str | None = field(compare=False)
+    future: asyncio.Future[None] = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class AdmissionController:
+    """Bounds concurrent tool work globally and per session, queueing in-progress interviews ahead of new ones."""
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int | None = None,
+        max_per_session: int | None = None,
+        max_queue: int | None = None,
+        queue_timeout_seconds: float | None = None,
+    ) -> None:
+        self._max_concurrency = max_concurrency or settings.admission_max_concurrency
+        self._max_per_session = max_per_session or settings.admission_max_per_session
+        self._max_queue = settings.admission_max_queue if max_queue is None else max_queue
+        self._queue_timeout = queue_timeout_seconds or settings.admission_queue_timeout_seconds
+        self._in_flight = 0
+        self._per_session: Counter[str] = Counter()
+        self._waiters: list[_Waiter] = []
+        self._sessions: OrderedDict[str, float] = OrderedDict()
+        self._sequence = itertools.count()
+        self._wait_ms: deque[float] = deque(maxlen=1000)
+        self._counters = {
+            "admitted": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "shed_evicted": 0,
+            "degraded": 0,
+        }
+
+    @asynccontextmanager
+    async def admit(self, session_id: str | None, *, opening: bool = False) -> AsyncIterator[None]:
+        await self._acquire(session_id, PRIORITY_NEW if opening or self._is_new(session_id) else PRIORITY_ACTIVE)
+        try:
+            yield
+        finally:
+            self._release(session_id)
+
+    def overloaded(self) -> bool:
+        return bool(self._waiters) or self._in_flight >= self._max_concurrency * settings.admission_degrade_ratio
+
+    def record_degraded(self) -> None:
+        self._counters["degraded"] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        waits = sorted(self._wait_ms)
+        return {
+            **self._counters,
+            "shed": sum(value for key, value in self._counters.items() if key.startswith("shed_")),
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "active_sessions": len(self._per_session),
+            "queue_wait_ms": {
+                "count": len(waits),
+                "p50": waits[len(waits) // 2] if waits else 0.0,
+                "p95": waits[min(int(len(waits) * 0.95), len(waits) - 1)] if waits else 0.0,
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
+
+    async def _acquire(self, session_id: str | None, priority: int) -> None:
+        self._touch(session_id)
+        if self._has_capacity(session_id):
+            self._grant(session_id)
+            return
+        if len(self._waiters) >= self._max_queue and not self._evict_for(priority):
+            self._counters["shed_queue_full"] += 1
+            raise AdmissionRejectedError("queue_full", self._queue_timeout)
+
+        waiter = _Waiter(
+            priority=priority,
+            sequence=next(self._sequence),
+            session_id=session_id,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+        self._waiters.sort()
+        self._counters["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self._queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.exception():
+                self._release(session_id)
+            self._discard(waiter)
+            self._counters["shed_deadline"] += 1
+            raise AdmissionRejectedError("deadline", self._queue_timeout) from None
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and not waiter.future.exception():
+                self._release(session_id)
+            self._discard(waiter)
+            raise
+        finally:
+            self._wait_ms.append((time.monotonic() - waiter.enqueued_at) * 1000)
+        waiter.future.result()
+
+    def _release(self, session_id: str | None) -> None:
+        self._in_flight -= 1
+        if session_id is not None:
+            self._per_session[session_id] -= 1
+            if self._per_session[session_id] <= 0:
+                del self._per_session[session_id]
+        self._wake()
+
+    def _wake(self) -> None:
+        for waiter in list(self._waiters):
+            if self._in_flight >= self._max_concurrency:
+                return
+            if waiter.future.done():
+                self._discard(waiter)
+                continue
+            if not self._has_capacity(waiter.session_id):
+                continue
+            self._discard(waiter)
+            self._grant(waiter.session_id)
+            waiter.future.set_result(None)
+
+    def _evict_for(self, priority: int) -> bool:
+        if priority != PRIORITY_ACTIVE:
+            return False
+        victim = next((waiter for waiter in reversed(self._waiters) if waiter.priority > priority), None)
+        if victim is None:
+            return False
+        self._discard(victim)
+        self._counters["shed_evicted"] += 1
+        if not victim.future.done():
+            victim.future.set_exception(AdmissionRejectedError("evicted", self._queue_timeout))
+        return True
+
+    def _has_capacity(self, session_id: str | None) -> bool:
+        if self._in_flight >= self._max_concurrency:
+            return False
+        return session_id is None or self._per_session[session_id] < self._max_per_session
+
+    def _grant(self, session_id: str | None) -> None:
+        self._in_flight += 1
+        if session_id is not None:
+            self._per_session[session_id] += 1
+        self._counters["admitted"] += 1
+
+    def _discard(self, waiter: _Waiter) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _is_new(self, session_id: str | None) -> bool:
+        if session_id is None:
+            return False
+        seen_at = self._sessions.get(session_id)
+        return seen_at is None or time.monotonic() - seen_at > settings.admission_session_ttl_seconds
+
+    def _touch(self, session_id: str | None) -> None:
+        if session_id is None:
+            return
+        self._sessions[session_id] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > settings.admission_session_memory:
+            self._sessions.popitem(last=False)
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from bson import ObjectId
+
+from app.services.session_archive import session_archive_service
+from app.services.storage import EXPORT_TIME_FIELDS, storage_service
+
+EXPORT_COLLECTIONS = tuple(EXPORT_TIME_FIELDS)
+PARQUET_ROWS_PER_PART = 100_000
+PARQUET_FIELDS: dict[str, tuple[tuple[str, str], ...]] = {
+    "attempts": (
+        ("_id", "string"),
+        ("session_id", "string"),
+        ("question_id", "string"),
+        ("score", "float64"),
+        ("objective", "string"),
+        ("time_ms", "int64"),
+        ("difficulty", "int64"),
+        ("answer_payload", "string"),
+        ("feedback", "string"),
+        ("hints_used", "int64"),
+        ("created_at", "timestamp"),
+    ),
+    "agent_events": (
+        ("_id", "string"),
+        ("session_id", "string"),
+        ("step_id", "string"),
+        ("plan", "string"),
+        ("action", "string"),
+        ("outcome", "string"),
+        ("metrics", "string"),
+        ("flagged", "bool"),
+        ("created_at", "timestamp"),
+    ),
+    "session_skill_state": (
+        ("_id", "string"),
+        ("session_id", "string"),
+        ("skill", "string"),
+        ("rating", "float64"),
+        ("target_difficulty", "int64"),
+        ("asked_count", "int64"),
+        ("correct_count", "int64"),
+        ("created_at", "timestamp"),
+        ("updated_at", "timestamp"),
+    ),
+}
+
+
+@dataclass
+class ExportCheckpoint:
+    collection: str
+    after_id: str | None = None
+    rows: int = 0
+    parts: int = 0
+    start: str | None = None
+    end: str | None = None
+    live_complete: bool = False
+    archived_after: str | None = None
+
+
+class AnalyticsExportService:
+    """Streams analytics collections out of Mongo as NDJSON or Parquet with resumable checkpoints."""
+
+    async def iter_ndjson(
+        self,
+        collection: str,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        after_id: str | None = None,
+        archived_after: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[bytes]:
+        self._validate(collection)
+        if archived_after is None:
+            async for batch in storage_service.iter_export_batches(
+                collection, start=start, end=end, after_id=after_id, batch_size=batch_size
+            ):
+                yield b"".join(_ndjson_line(document) for document in batch)
+        async for _, documents in session_archive_service.iter_archived_documents(
+            collection, start=start, end=end, after_session_id=archived_after
+        ):
+            if documents:
+                yield b"".join(_ndjson_line(document) for document in documents)
+
+    async def export_to_directory(
+        self,
+        collection: str,
+        output_dir: Path,
+        *,
+        file_format: str = "ndjson",
+        start: datetime | None = None,
+        end: datetime | None = None,
+        resume: bool = True,
+        batch_size: int = 5000,
+        rows_per_part: int = PARQUET_ROWS_PER_PART,
+    ) -> ExportCheckpoint:
+        self._validate(collection)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint_path = output_dir / f"{collection}.checkpoint.json"
+        checkpoint = self._load_checkpoint(checkpoint_path) if resume else None
+        if checkpoint is None:
+            checkpoint = ExportCheckpoint(
+                collection=collection,
+                start=start.isoformat() if start else None,
+                end=end.isoformat() if end else None,
+            )
+        else:
+            start = datetime.fromisoformat(checkpoint.start) if checkpoint.start else None
+            end = datetime.fromisoformat(checkpoint.end) if checkpoint.end else None
+
+        writer = _ParquetPartWriter(output_dir, collection, checkpoint.parts) if file_format == "parquet" else None
+        ndjson_path = output_dir / f"{collection}.ndjson"
+        if file_format == "ndjson" and checkpoint.rows == 0 and ndjson_path.exists():
+            ndjson_path.unlink()
+
+        def write(documents: list[dict[str, Any]]) -> None:
+            if writer is not None:
+                writer.write_row_group([_normalize(document) for document in documents])
+                if writer.rows >= rows_per_part:
+                    writer.close()
+            else:
+                with ndjson_path.open("ab") as handle:
+                    handle.writelines(_ndjson_line(document) for document in documents)
+            checkpoint.rows += len(documents)
+
+        def save() -> None:
+            if writer is None:
+                self._save_checkpoint(checkpoint_path, checkpoint)
+            elif not writer.is_open:
+                checkpoint.parts = writer.part_number
+                self._save_checkpoint(checkpoint_path, checkpoint)
+
+        try:
+            if not checkpoint.live_complete:
+                async for batch in storage_service.iter_export_batches(
+                    collection, start=start, end=end, after_id=checkpoint.after_id, batch_size=batch_size
+                ):
+                    write(batch)
+                    checkpoint.after_id = str(batch[-1].get("_id"))
+                    save()
+                checkpoint.live_complete = True
+                save()
+            async for session_id, documents in session_archive_service.iter_archived_documents(
+                collection, start=start, end=end, after_session_id=checkpoint.archived_after
+            ):
+                if documents:
+                    write(documents)
+                checkpoint.archived_after = session_id
+                save()
+        finally:
+            if writer is not None:
+                writer.close()
+                save()
+        return checkpoint
+
+    def _validate(self, collection: str) -> None:
+        if collection not in EXPORT_COLLECTIONS:
+            raise ValueError(f"Unknown export collection: {collection}")
+
+    def _load_checkpoint(self, path: Path) -> ExportCheckpoint | None:
+        if not path.exists():
+            return None
+        try:
+            return ExportCheckpoint(**json.loads(path.read_text()))
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+    def _save_checkpoint(self, path: Path, checkpoint: ExportCheckpoint) -> None:
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(asdict(checkpoint)))
+        temporary.replace(path)
+
+
+class _ParquetPartWriter:
+    def __init__(self, output_dir: Path, collection: str, part_number: int) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet export requires pyarrow to be installed") from exc
+        self._pa = pa
+        self._pq = pq
+        self._output_dir = output_dir
+        self._collection = collection
+        self.part_number = part_number
+        self.rows = 0
+        self._writer: Any = None
+        types = {
+            "string": pa.string(),
+            "float64": pa.float64(),
+            "int64": pa.int64(),
+            "bool": pa.bool_(),
+            "timestamp": pa.timestamp("ms"),
+        }
+        self._fields = PARQUET_FIELDS[collection]
+        self._schema = pa.schema(
+            [(name, types[kind]) for name, kind in self._fields] + [("extra", pa.string())]
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    def write_row_group(self, rows: list[dict[str, Any]]) -> None:
+        if self._writer is None:
+            self.part_number += 1
+            self.rows = 0
+            path = self._output_dir / f"{self._collection}-part-{self.part_number:05d}.parquet"
+            self._writer = self._pq.ParquetWriter(str(path), self._schema)
+        table = self._pa.Table.from_pylist([self._conform(row) for row in rows], schema=self._schema)
+        self._writer.write_table(table)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _conform(self, row: dict[str, Any]) -> dict[str, Any]:
+        conformed = {name: _coerce(row.get(name), kind) for name, kind in self._fields}
+        extra = {key: value for key, value in row.items() if key not in conformed}
+        conformed["extra"] = json.dumps(extra, default=_json_default) if extra else None
+        return conformed
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        normalized = {key: _normalize(item) for key, item in value.items()}
+        for key in ("objective", "answer_payload", "metrics"):
+            if key in normalized and normalized[key] is not None and not isinstance(normalized[key], str):
+                normalized[key] = json.dumps(normalized[key], default=str)
+        return normalized
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    if value is None:
+        return None
+    try:
+        if kind == "string":
+            return value if isinstance(value, str) else json.dumps(value, default=_json_default)
+        if kind == "float64":
+            return float(value)
+        if kind == "int64":
+            return int(value)
+        if kind == "bool":
+            return bool(value)
+    except (TypeError, ValueError):
+        return None
+    return value if isinstance(value, datetime) else None
+
+
+def _ndjson_line(document: dict[str, Any]) -> bytes:
+    return (json.dumps(document, default=_json_default, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+analytics_export_service = AnalyticsExportService()
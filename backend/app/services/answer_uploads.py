@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+
+WORKBOOK_SUFFIXES = {".xlsx", ".xlsm"}
+MAX_SUMMARY_FORMULAS = 500
+RETENTION_SWEEP_SECONDS = 3600.0
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded answer exceeds the configured size limit."""
+
+
+@dataclass
+class UploadedAnswer:
+    filename: str
+    sha256: str
+    size_bytes: int
+    path: Path
+    duplicate: bool
+    fields: dict[str, str] = field(default_factory=dict)
+
+
+class _MultipartSpooler:
+    def __init__(self, boundary: bytes, max_bytes: int) -> None:
+        self.fields: dict[str, str] = {}
+        self.filename: str | None = None
+        self.file = tempfile.SpooledTemporaryFile(max_size=settings.answer_upload_spool_bytes)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._max_bytes = max_bytes
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._name = ""
+        self._is_file = False
+        self._value = bytearray()
+        self.parser = MultipartParser(
+            boundary,
+            callbacks={
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+        self._value = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        self._is_file = filename is not None
+        if self._is_file:
+            if self.filename is not None:
+                raise ValueError("Only one file may be uploaded per answer")
+            self.filename = Path(filename.decode("utf-8", "replace")).name
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if not self._is_file:
+            self._value += chunk
+            if len(self._value) > 64 * 1024:
+                raise UploadTooLargeError("Form field is too large")
+            return
+        self.size += len(chunk)
+        if self.size > self._max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self._max_bytes} bytes")
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def _on_part_end(self) -> None:
+        if not self._is_file and self._name:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+
+class AnswerUploadService:
+    """Streams file-based answers to content-addressed storage and caches their parsed workbook summaries."""
+
+    def __init__(self) -> None:
+        self._summaries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._next_sweep = 0.0
+
+    async def receive(self, chunks: AsyncIterator[bytes], content_type: str) -> UploadedAnswer:
+        media_type, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Expected a multipart/form-data upload")
+
+        spooler = _MultipartSpooler(boundary, settings.answer_upload_max_bytes)
+        try:
+            async for chunk in chunks:
+                spooler.parser.write(chunk)
+            spooler.parser.finalize()
+            if spooler.filename is None or not spooler.size:
+                raise ValueError("No file was uploaded")
+            suffix = Path(spooler.filename).suffix.lower()
+            if suffix not in WORKBOOK_SUFFIXES:
+                raise ValueError(f"Unsupported workbook type: {suffix or 'none'}")
+
+            sha256 = spooler.digest.hexdigest()
+            path = Path(settings.answer_upload_dir) / sha256[:2] / f"{sha256}{suffix}"
+            duplicate = path.exists()
+            if duplicate:
+                path.touch()
+            else:
+                await asyncio.to_thread(_persist, spooler.file, path)
+        finally:
+            spooler.file.close()
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + RETENTION_SWEEP_SECONDS
+            await asyncio.to_thread(_enforce_retention, Path(settings.answer_upload_dir))
+
+        return UploadedAnswer(
+            filename=spooler.filename,
+            sha256=sha256,
+            size_bytes=spooler.size,
+            path=path,
+            duplicate=duplicate,
+            fields=spooler.fields,
+        )
+
+    async def summarize(self, upload: UploadedAnswer) -> dict[str, Any]:
+        cached = self._summaries.get(upload.sha256)
+        if cached is not None:
+            self._summaries.move_to_end(upload.sha256)
+            return cached
+        summary = await asyncio.to_thread(_summarize_workbook, upload.path)
+        self._summaries[upload.sha256] = summary
+        while len(self._summaries) > settings.answer_summary_cache_size:
+            self._summaries.popitem(last=False)
+        return summary
+
+
+def _persist(spool: Any, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(path.suffix + ".part")
+    spool.seek(0)
+    with temporary.open("wb") as handle:
+        shutil.copyfileobj(spool, handle, length=1024 * 1024)
+    temporary.replace(path)
+
+
+def _enforce_retention(directory: Path) -> None:
+    cutoff = time.time() - settings.answer_upload_max_age_seconds
+    kept: list[tuple[float, Path, int]] = []
+    for path in directory.glob("*/*"):
+        stat = path.stat()
+        if stat.st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+        elif path.suffix.lower() in WORKBOOK_SUFFIXES:
+            kept.append((stat.st_mtime, path, stat.st_size))
+    kept.sort()
+    total = sum(size for _, _, size in kept)
+    while len(kept) > 1 and total > settings.answer_upload_dir_max_bytes:
+        _, path, size = kept.pop(0)
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def _summarize_workbook(path: Path) -> dict[str, Any]:
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(path, read_only=True, data_only=False)
+    except Exception as exc:
+        raise ValueError(f"Could not read workbook: {exc}") from exc
+    sheets = []
+    formulas: list[dict[str, str]] = []
+    try:
+        for sheet in workbook.worksheets:
+            filled = 0
+            for row in sheet.iter_rows():
+                for cell in row:
+                    value = cell.value
+                    if value is None:
+                        continue
+                    filled += 1
+                    if isinstance(value, str) and value.startswith("=") and len(formulas) < MAX_SUMMARY_FORMULAS:
+                        formulas.append({"sheet": sheet.title, "cell": cell.coordinate, "formula": value})
+            try:
+                dimensions = sheet.calculate_dimension()
+            except ValueError:
+                dimensions = None
+            sheets.append({"name": sheet.title, "dimensions": dimensions, "filled_cells": filled})
+    finally:
+        workbook.close()
+    return {"sheets": sheets, "formulas": formulas}
+
+
+answer_upload_service = AnswerUploadService()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+
+class BlobNotFoundError(KeyError):
+    """Raised when an archived blob is missing from the store."""
+
+
+class LocalBlobStore:
+    """Stores blobs as files under a root directory."""
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write, self._path(key), data)
+
+    async def get(self, key: str) -> bytes:
+        path = self._path(key)
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError as exc:
+            raise BlobNotFoundError(key) from exc
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self._root / key).resolve()
+        if self._root.resolve() not in path.parents:
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix(path.suffix + ".tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+
+
+class S3BlobStore:
+    """Stores blobs in an S3-compatible bucket via boto3."""
+
+    def __init__(self, bucket: str, *, endpoint_url: str | None = None) -> None:
+        import boto3
+
+        self._bucket = bucket
+        self._client: Any = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._client.put_object, Bucket=self._bucket, Key=key, Body=data)
+
+    async def get(self, key: str) -> bytes:
+        try:
+            response = await asyncio.to_thread(self._client.get_object, Bucket=self._bucket, Key=key)
+        except self._client.exceptions.NoSuchKey as exc:
+            raise BlobNotFoundError(key) from exc
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._client.delete_object, Bucket=self._bucket, Key=key)
+
+
+BlobStore = LocalBlobStore | S3BlobStore
+
+
+def build_blob_store() -> BlobStore:
+    if settings.archive_backend == "s3":
+        return S3BlobStore(settings.s3_bucket, endpoint_url=settings.s3_endpoint_url)
+    return LocalBlobStore(Path(settings.archive_local_dir))
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+RESPONSE = "response"
+STREAM = "stream"
+
+
+class CircuitBreaker:
+    """Tracks a rolling error rate and latency profile for one outbound dependency."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_timeout: float,
+        min_timeout: float | None = None,
+        window_seconds: float | None = None,
+        min_requests: int | None = None,
+        error_threshold: float | None = None,
+        cooldown_seconds: float | None = None,
+        half_open_probes: int | None = None,
+        timeout_multiplier: float | None = None,
+    ) -> None:
+        self.name = name
+        self._max_timeout = max_timeout
+        self._min_timeout = min_timeout or settings.breaker_min_timeout_seconds
+        self._window_seconds = window_seconds or settings.breaker_window_seconds
+        self._min_requests = min_requests or settings.breaker_min_requests
+        self._error_threshold = error_threshold or settings.breaker_error_threshold
+        self._cooldown_seconds = cooldown_seconds or settings.breaker_cooldown_seconds
+        self._half_open_probes = half_open_probes or settings.breaker_half_open_probes
+        self._timeout_multiplier = timeout_multiplier or settings.breaker_timeout_multiplier
+        self._samples: deque[tuple[float, bool, float, str]] = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes: deque[float] = deque()
+        self._probe_successes = 0
+        self._short_circuited = 0
+        self._transitions = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._cooldown_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            self._short_circuited += 1
+            return False
+        if self._state != HALF_OPEN:
+            self._transition(HALF_OPEN)
+        now = time.monotonic()
+        while self._probes and now - self._probes[0] >= self._max_timeout:
+            self._probes.popleft()
+        if len(self._probes) >= self._half_open_probes:
+            self._short_circuited += 1
+            return False
+        self._probes.append(now)
+        return True
+
+    def release(self) -> None:
+        if self._probes:
+            self._probes.popleft()
+
+    def record_success(self, latency: float, *, kind: str = RESPONSE) -> None:
+        self._record(True, latency, kind)
+        if self._state == HALF_OPEN:
+            self.release()
+            self._probe_successes += 1
+            if self._probe_successes >= self._half_open_probes:
+                self._transition(CLOSED)
+
+    def record_failure(self, latency: float, *, kind: str = RESPONSE) -> None:
+        self._record(False, latency, kind)
+        if self._state == HALF_OPEN:
+            self.release()
+            self._transition(OPEN)
+            return
+        if self._state == CLOSED:
+            total = len(self._samples)
+            failures = sum(1 for _, ok, _, _ in self._samples if not ok)
+            if total >= self._min_requests and failures / total >= self._error_threshold:
+                self._transition(OPEN)
+
+    def timeout(self, kind: str = RESPONSE) -> float:
+        latencies = self._latencies(kind)
+        if len(latencies) < self._min_requests:
+            return self._max_timeout
+        adaptive = _percentile(latencies, 0.99) * self._timeout_multiplier
+        return min(max(adaptive, self._min_timeout), self._max_timeout)
+
+    def snapshot(self) -> dict[str, Any]:
+        self._prune()
+        latencies = self._latencies(RESPONSE)
+        stream_latencies = self._latencies(STREAM)
+        total = len(self._samples)
+        failures = sum(1 for _, ok, _, _ in self._samples if not ok)
+        return {
+            "state": self.state,
+            "requests": total,
+            "error_rate": failures / total if total else 0.0,
+            "latency_ms": {
+                "p50": _percentile(latencies, 0.50) * 1000,
+                "p95": _percentile(latencies, 0.95) * 1000,
+                "p99": _percentile(latencies, 0.99) * 1000,
+            },
+            "stream_headers_latency_ms": {
+                "p50": _percentile(stream_latencies, 0.50) * 1000,
+                "p95": _percentile(stream_latencies, 0.95) * 1000,
+                "p99": _percentile(stream_latencies, 0.99) * 1000,
+            },
+            "timeout_seconds": self.timeout(),
+            "stream_timeout_seconds": self.timeout(STREAM),
+            "probes_in_flight": len(self._probes),
+            "short_circuited": self._short_circuited,
+            "transitions": self._transitions,
+        }
+
+    def _record(self, ok: bool, latency: float, kind: str) -> None:
+        self._samples.append((time.monotonic(), ok, latency, kind))
+        self._prune()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self._window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def _latencies(self, kind: str) -> list[float]:
+        self._prune()
+        return sorted(latency for _, ok, latency, sample_kind in self._samples if ok and sample_kind == kind)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning("Circuit breaker %s moving from %s to %s", self.name, self._state, state)
+        self._state = state
+        self._transitions += 1
+        self._probes.clear()
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._samples.clear()
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+responses_breaker = CircuitBreaker("openai_responses", max_timeout=settings.grading_timeout_seconds)
+realtime_breaker = CircuitBreaker("openai_realtime", max_timeout=settings.realtime_token_timeout_seconds)
+
+circuit_breakers: dict[str, CircuitBreaker] = {
+    responses_breaker.name: responses_breaker,
+    realtime_breaker.name: realtime_breaker,
+}
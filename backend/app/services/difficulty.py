@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+from app.services.session_archive import session_archive_service
 from app.services.storage import storage_service
 
 
@@ -15,6 +16,7 @@ class DifficultyService:
     """Computes adaptive difficulty based on recent performance."""
 
     async def update_difficulty(self, session_id: str) -> DifficultyResult:
+        await session_archive_service.ensure_hot(session_id)
         attempts = await storage_service.list_recent_attempts(session_id, limit=3)
         if not attempts:
             return DifficultyResult(new_level=2, rationale="No attempts yet; maintaining baseline difficulty")
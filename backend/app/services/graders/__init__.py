@@ -1,11 +1,18 @@
+from .dispatcher import GradingDispatcher, TokenBucket, grading_dispatcher
+from .local import LocalGrader, local_grader
 from .objective import ObjectiveGrader, objective_grader
 from .formula import FormulaGrader, formula_grader
 from .rubric import RubricGrader, rubric_grader
 
 __all__ = [
+    "GradingDispatcher",
+    "TokenBucket",
+    "grading_dispatcher",
+    "LocalGrader",
     "ObjectiveGrader",
     "FormulaGrader",
     "RubricGrader",
+    "local_grader",
     "objective_grader",
     "formula_grader",
     "rubric_grader",
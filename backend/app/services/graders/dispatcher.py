@@ -0,0 +1,537 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator
+
+import httpx
+
+from app.core.config import settings
+from app.services.circuit_breaker import RESPONSE, STREAM, CircuitBreaker, responses_breaker
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are an expert Microsoft Excel interviewer. Score the candidate succinctly. "
+    "Return JSON matching the schema with: score (0-100), strengths (array of bullet strings), improvements (array), and summary."
+)
+
+BATCH_SYSTEM_PROMPT = (
+    "You are an expert Microsoft Excel interviewer. Score each numbered candidate answer independently and succinctly. "
+    "Return JSON matching the schema with one entry per answer in grades, each carrying its index, "
+    "score (0-100), strengths (array of bullet strings), improvements (array), and summary."
+)
+
+GRADE_PROPERTIES = {
+    "score": {"type": "number", "minimum": 0, "maximum": 100},
+    "strengths": {"type": "array", "items": {"type": "string"}},
+    "improvements": {"type": "array", "items": {"type": "string"}},
+    "summary": {"type": "string"},
+}
+
+JSON_SCHEMA = {
+    "name": "excel_interview_grade",
+    "schema": {
+        "type": "object",
+        "properties": GRADE_PROPERTIES,
+        "required": ["score"],
+        "additionalProperties": False,
+    },
+}
+
+BATCH_JSON_SCHEMA = {
+    "name": "excel_interview_grade_batch",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "grades": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"index": {"type": "integer", "minimum": 0}, **GRADE_PROPERTIES},
+                    "required": ["index", "score"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["grades"],
+        "additionalProperties": False,
+    },
+}
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def build_grade_body(question_prompt: str, answer_text: str) -> dict[str, Any]:
+    return {
+        "model": settings.default_model or "gpt-4o-mini",
+        "input": [
+            {
+                "role": "system",
+                "content": [{"type": "text", "text": SYSTEM_PROMPT}],
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": (
+                            "Question:\n" + question_prompt + "\n\n" +
+                            "Candidate answer:\n" + answer_text
+                        ),
+                    }
+                ],
+            },
+        ],
+        "response_format": {"type": "json_schema", "json_schema": JSON_SCHEMA},
+    }
+
+
+def build_batch_body(items: list[tuple[str, str]]) -> dict[str, Any]:
+    sections = [
+        f"Answer {index}\nQuestion:\n{question_prompt}\n\nCandidate answer:\n{answer_text}"
+        for index, (question_prompt, answer_text) in enumerate(items)
+    ]
+    return {
+        "model": settings.default_model or "gpt-4o-mini",
+        "input": [
+            {
+                "role": "system",
+                "content": [{"type": "text", "text": BATCH_SYSTEM_PROMPT}],
+            },
+            {
+                "role": "user",
+                "content": [{"type": "text", "text": "\n\n---\n\n".join(sections)}],
+            },
+        ],
+        "response_format": {"type": "json_schema", "json_schema": BATCH_JSON_SCHEMA},
+    }
+
+
+def extract_json(data: dict[str, Any]) -> dict[str, Any] | None:
+    for item in data.get("output", []):
+        for chunk in item.get("content", []):
+            if chunk.get("type") == "output_json_schema":
+                return chunk.get("json")
+    return None
+
+
+def extract_text(data: dict[str, Any]) -> str | None:
+    parts = [
+        str(chunk.get("text", ""))
+        for item in data.get("output", [])
+        for chunk in item.get("content", [])
+        if chunk.get("type") == "output_text"
+    ]
+    return "".join(parts).strip() or None
+
+
+def estimate_tokens(*texts: str) -> int:
+    return sum(len(text) for text in texts) // 4 + 400
+
+
+class TokenBucket:
+    """Refilling limiter for requests-per-minute and tokens-per-minute budgets."""
+
+    def __init__(self, *, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self._request_capacity = max(float(requests_per_minute), 1.0)
+        self._token_capacity = max(float(tokens_per_minute), 1.0)
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int) -> float:
+        tokens = min(max(tokens, 1), int(self._token_capacity))
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return waited
+                request_wait = max(1 - self._requests, 0) * 60.0 / self._request_capacity
+                token_wait = max(tokens - self._tokens, 0) * 60.0 / self._token_capacity
+                delay = max(request_wait, token_wait, 0.001)
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._requests = min(self._request_capacity, self._requests + elapsed * self._request_capacity / 60.0)
+        self._tokens = min(self._token_capacity, self._tokens + elapsed * self._token_capacity / 60.0)
+
+
+@dataclass(order=True)
+class _GradingJob:
+    priority: int
+    sequence: int
+    question_prompt: str = field(compare=False)
+    answer_text: str = field(compare=False)
+    future: asyncio.Future[dict[str, Any] | None] = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class GradingDispatcher:
+    """Queues rubric grading requests behind a rate limiter, retrying and micro-batching them."""
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_queue: int | None = None,
+        max_concurrency: int | None = None,
+        batch_size: int | None = None,
+        batch_threshold: int | None = None,
+        max_retries: int | None = None,
+        base_url: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self._requests_per_minute = requests_per_minute or settings.grading_requests_per_minute
+        self._tokens_per_minute = tokens_per_minute or settings.grading_tokens_per_minute
+        self._max_queue = max_queue or settings.grading_max_queue
+        self._max_concurrency = max_concurrency or settings.grading_max_concurrency
+        self._batch_size = batch_size or settings.grading_batch_size
+        self._batch_threshold = batch_threshold or settings.grading_batch_threshold
+        self._max_retries = settings.grading_max_retries if max_retries is None else max_retries
+        self._base_url = (base_url or settings.openai_base_url).rstrip("/")
+        self._transport = transport
+        self._breaker = breaker or responses_breaker
+        self._sequence = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.PriorityQueue[_GradingJob] | None = None
+        self._limiter: TokenBucket | None = None
+        self._client: httpx.AsyncClient | None = None
+        self._workers: list[asyncio.Task[None]] = []
+        self._wait_ms: deque[float] = deque(maxlen=1000)
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "fallbacks": 0,
+            "rejected": 0,
+            "requests": 0,
+            "batches": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "streams": 0,
+            "short_circuited": 0,
+            "summaries": 0,
+        }
+
+    @traced("grader.dispatch")
+    async def grade(self, question_prompt: str, answer_text: str, *, priority: int = 1) -> dict[str, Any] | None:
+        queue = self._ensure_started()
+        self._counters["submitted"] += 1
+        if self._breaker.is_open():
+            self._counters["short_circuited"] += 1
+            self._counters["fallbacks"] += 1
+            return None
+        future: asyncio.Future[dict[str, Any] | None] = asyncio.get_running_loop().create_future()
+        job = _GradingJob(
+            priority=priority,
+            sequence=next(self._sequence),
+            question_prompt=question_prompt,
+            answer_text=answer_text,
+            future=future,
+        )
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._counters["rejected"] += 1
+            self._counters["fallbacks"] += 1
+            return None
+        result = await future
+        if result is None:
+            self._counters["fallbacks"] += 1
+        else:
+            self._counters["completed"] += 1
+        return result
+
+    async def stream(self, question_prompt: str, answer_text: str) -> AsyncIterator[tuple[str, Any]]:
+        self._ensure_started()
+        assert self._client is not None and self._limiter is not None
+        self._counters["submitted"] += 1
+        self._counters["streams"] += 1
+        parsed: dict[str, Any] | None = None
+        if not self._breaker.allow():
+            self._counters["short_circuited"] += 1
+            self._counters["fallbacks"] += 1
+            yield "completed", parsed
+            return
+        text_parts: list[str] = []
+        headers_latency: float | None = None
+        recorded = False
+        try:
+            await self._limiter.acquire(estimate_tokens(question_prompt, answer_text))
+            self._counters["requests"] += 1
+            body = {**build_grade_body(question_prompt, answer_text), "stream": True}
+            started = time.monotonic()
+            async with self._client.stream(
+                "POST",
+                "/responses",
+                headers=self._headers(),
+                json=body,
+                timeout=self._breaker.timeout(STREAM),
+            ) as response:
+                headers_latency = time.monotonic() - started
+                if response.status_code >= 400:
+                    _record_outcome(self._breaker, response.status_code, headers_latency, kind=STREAM)
+                    recorded = True
+                    if response.status_code == 429:
+                        self._counters["rate_limited"] += 1
+                    logger.error("Streaming grading request failed with status %s", response.status_code)
+                else:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        raw = line[5:].strip()
+                        if not raw or raw == "[DONE]":
+                            continue
+                        try:
+                            event = json.loads(raw)
+                        except json.JSONDecodeError:
+                            continue
+                        event_type = event.get("type")
+                        if event_type == "response.output_text.delta":
+                            delta = str(event.get("delta", ""))
+                            text_parts.append(delta)
+                            yield "delta", delta
+                        elif event_type == "response.completed":
+                            parsed = extract_json(event.get("response", {}) or {})
+                    self._breaker.record_success(headers_latency, kind=STREAM)
+                    recorded = True
+        except httpx.HTTPError as exc:
+            if not recorded and (isinstance(exc, httpx.TimeoutException) or headers_latency is None or not text_parts):
+                self._breaker.record_failure(time.monotonic() - started, kind=STREAM)
+            elif not recorded:
+                self._breaker.record_success(headers_latency, kind=STREAM)
+            recorded = True
+            logger.warning("Streaming grading request failed: %s", exc)
+        finally:
+            # A cancelled or abandoned stream never reports an outcome; hand back its half-open probe slot.
+            if not recorded:
+                self._breaker.release()
+        if parsed is None and text_parts:
+            try:
+                parsed = json.loads("".join(text_parts))
+            except json.JSONDecodeError:
+                parsed = None
+        if not isinstance(parsed, dict):
+            parsed = None
+            self._counters["fallbacks"] += 1
+        else:
+            self._counters["completed"] += 1
+        yield "completed", parsed
+
+    async def summarize(self, instructions: str, text: str) -> str | None:
+        self._ensure_started()
+        self._counters["summaries"] += 1
+        body = {
+            "model": settings.default_model or "gpt-4o-mini",
+            "input": [
+                {"role": "system", "content": [{"type": "text", "text": instructions}]},
+                {"role": "user", "content": [{"type": "text", "text": text}]},
+            ],
+        }
+        data = await self._send(body, estimate_tokens(instructions, text))
+        return extract_text(data) if data is not None else None
+
+    def snapshot(self) -> dict[str, Any]:
+        waits = sorted(self._wait_ms)
+        submitted = self._counters["submitted"]
+        return {
+            **self._counters,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "fallback_rate": self._counters["fallbacks"] / submitted if submitted else 0.0,
+            "queue_wait_ms": {
+                "count": len(waits),
+                "mean": sum(waits) / len(waits) if waits else 0.0,
+                "p50": _percentile(waits, 0.50),
+                "p95": _percentile(waits, 0.95),
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if not job.future.done():
+                    job.future.set_result(None)
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._queue = None
+        self._loop = None
+
+    def _ensure_started(self) -> asyncio.PriorityQueue[_GradingJob]:
+        loop = asyncio.get_running_loop()
+        if self._queue is not None and self._loop is loop:
+            return self._queue
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue(maxsize=self._max_queue)
+        self._limiter = TokenBucket(
+            requests_per_minute=self._requests_per_minute,
+            tokens_per_minute=self._tokens_per_minute,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=self._base_url,
+            timeout=settings.grading_timeout_seconds,
+            transport=self._transport,
+        )
+        self._workers = [loop.create_task(self._worker()) for _ in range(self._max_concurrency)]
+        return self._queue
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            job = await queue.get()
+            jobs = [job]
+            if queue.qsize() + 1 >= self._batch_threshold:
+                while len(jobs) < self._batch_size and not queue.empty():
+                    jobs.append(queue.get_nowait())
+            now = time.monotonic()
+            for item in jobs:
+                self._wait_ms.append((now - item.enqueued_at) * 1000)
+            try:
+                results = await self._dispatch(jobs)
+            except asyncio.CancelledError:
+                for item in jobs:
+                    if not item.future.done():
+                        item.future.set_result(None)
+                raise
+            except Exception:
+                logger.exception("Grading dispatch failed")
+                results = [None] * len(jobs)
+            for item, result in zip(jobs, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+
+    async def _dispatch(self, jobs: list[_GradingJob]) -> list[dict[str, Any] | None]:
+        if len(jobs) == 1:
+            job = jobs[0]
+            body = build_grade_body(job.question_prompt, job.answer_text)
+        else:
+            self._counters["batches"] += 1
+            body = build_batch_body([(job.question_prompt, job.answer_text) for job in jobs])
+        tokens = estimate_tokens(*(job.question_prompt + job.answer_text for job in jobs))
+
+        data = await self._send(body, tokens)
+        if data is None:
+            return [None] * len(jobs)
+        parsed = extract_json(data)
+        if not parsed:
+            return [None] * len(jobs)
+        if len(jobs) == 1:
+            return [parsed]
+
+        by_index: dict[int, dict[str, Any]] = {}
+        for grade in parsed.get("grades", []) or []:
+            if isinstance(grade, dict) and isinstance(grade.get("index"), int):
+                by_index[grade["index"]] = grade
+        return [by_index.get(index) for index in range(len(jobs))]
+
+    async def _send(self, body: dict[str, Any], tokens: int) -> dict[str, Any] | None:
+        assert self._client is not None and self._limiter is not None
+        headers = self._headers()
+        for attempt in range(self._max_retries + 1):
+            if not self._breaker.allow():
+                self._counters["short_circuited"] += 1
+                return None
+            retry_after: float | None = None
+            try:
+                await self._limiter.acquire(tokens)
+                self._counters["requests"] += 1
+                started = time.monotonic()
+                response = await self._client.post(
+                    "/responses",
+                    headers=headers,
+                    json=body,
+                    timeout=self._breaker.timeout(),
+                )
+            except httpx.HTTPError as exc:
+                self._breaker.record_failure(time.monotonic() - started)
+                logger.warning("Grading request failed: %s", exc)
+            except BaseException:
+                self._breaker.release()
+                raise
+            else:
+                _record_outcome(self._breaker, response.status_code, time.monotonic() - started)
+                if response.status_code < 400:
+                    return response.json()
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    logger.error("Grading request rejected with status %s", response.status_code)
+                    return None
+                if response.status_code == 429:
+                    self._counters["rate_limited"] += 1
+                retry_after = _retry_after_seconds(response.headers)
+            if attempt >= self._max_retries:
+                break
+            self._counters["retries"] += 1
+            backoff = random.uniform(0, min(settings.grading_backoff_max_seconds, 0.5 * 2**attempt))
+            await asyncio.sleep(max(backoff, retry_after or 0.0))
+        return None
+
+    def _headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {settings.openai_api_key}",
+            "Content-Type": "application/json",
+        }
+
+
+def _record_outcome(breaker: CircuitBreaker, status_code: int, latency: float, *, kind: str = RESPONSE) -> None:
+    if status_code >= 500 or status_code == 408:
+        breaker.record_failure(latency, kind=kind)
+    else:
+        breaker.record_success(latency, kind=kind)
+
+
+def _retry_after_seconds(headers: httpx.Headers) -> float | None:
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+grading_dispatcher = GradingDispatcher()
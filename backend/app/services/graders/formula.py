@@ -1,19 +1,167 @@
 from __future__ import annotations
 
+import asyncio
+import math
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Any
 
+from app.core.config import settings
+from app.services.graders.workbook import ExcelError, FormulaSyntaxError, WorkbookState, normalize_cell, used_area
+from app.services.idempotency import request_fingerprint
+from app.services.tracing import traced
+
+WHITESPACE_OUTSIDE_STRINGS = re.compile(r"\s+(?=(?:[^\"]*\"[^\"]*\")*[^\"]*$)")
+
+
+@dataclass
+class _PreparedQuestion:
+    workbook: dict[str, Any]
+    answer_cells: list[str]
+    expected: dict[str, Any]
+    bounds: tuple[int, int]
+
+
+@dataclass
+class _SessionWorkbook:
+    version: str
+    state: WorkbookState | None = None
+    answered: set[str] = field(default_factory=set)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
 
 class FormulaGrader:
     """Executes candidate formulas against hidden workbooks and computes partial credit."""
 
+    def __init__(self) -> None:
+        self._sessions: OrderedDict[tuple[str, str], _SessionWorkbook] = OrderedDict()
+        self._questions: OrderedDict[str, _PreparedQuestion] = OrderedDict()
+
+    @traced("grader.formula")
     async def grade(self, payload: dict[str, Any]) -> dict[str, Any]:
-        # TODO: Implement formula execution and equivalence checks
-        _ = payload
+        meta = payload.get("question") or {}
+        if not isinstance(meta.get("workbook"), dict):
+            answer_cell = normalize_cell((meta.get("answer_cells") or [meta.get("answer_cell", "A1")])[0])
+            submitted = _submitted_cells(payload.get("answer_payload") or {}, [answer_cell])
+            return _grade_formula_text(meta, submitted, answer_cell)
+
+        question_id = str(payload.get("question_id", ""))
+        version = f"{question_id}:{payload.get('question_version') or request_fingerprint(meta)}"
+        question = await self._prepare(version, meta)
+        submitted = _submitted_cells(payload.get("answer_payload") or {}, question.answer_cells)
+        session = self._session_workbook((str(payload.get("session_id", "")), question_id), version)
+        async with session.lock:
+            if session.state is None:
+                session.state = await asyncio.to_thread(WorkbookState, question.workbook, bounds=question.bounds)
+            updates = {cell: question.workbook.get(cell) for cell in session.answered - submitted.keys()}
+            updates.update(submitted)
+            session.answered = set(submitted)
+            await asyncio.to_thread(session.state.update, updates)
+            state = session.state
+            checks = [
+                _check(cell, question.expected.get(cell), state.value(cell), submitted.get(cell))
+                for cell in question.answer_cells
+            ]
+        passed = sum(1 for check in checks if check["passed"])
         return {
-            "score": 0.0,
-            "objective": {"checks": []},
-            "notes": "Formula grading not yet implemented",
+            "score": round(100.0 * passed / len(checks), 2) if checks else 0.0,
+            "objective": {"checks": checks, "recalculated": state.last_recalculated, "cells": len(state)},
+            "notes": f"{passed} of {len(checks)} answer cells match the expected results.",
         }
 
+    async def _prepare(self, version: str, meta: dict[str, Any]) -> _PreparedQuestion:
+        question = self._questions.get(version)
+        if question is None:
+            question = await asyncio.to_thread(_prepare_question, meta)
+            self._questions[version] = question
+            while len(self._questions) > settings.formula_grader_max_sessions:
+                self._questions.popitem(last=False)
+        self._questions.move_to_end(version)
+        return question
+
+    def _session_workbook(self, key: tuple[str, str], version: str) -> _SessionWorkbook:
+        session = self._sessions.get(key)
+        if session is None or session.version != version:
+            session = _SessionWorkbook(version=version)
+            self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > settings.formula_grader_max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+
+def _prepare_question(meta: dict[str, Any]) -> _PreparedQuestion:
+    workbook = {normalize_cell(cell): value for cell, value in meta["workbook"].items()}
+    answer_cells = [normalize_cell(cell) for cell in meta.get("answer_cells") or [meta.get("answer_cell", "A1")]]
+    bounds = used_area([*workbook, *answer_cells])
+    return _PreparedQuestion(workbook, answer_cells, _expected_values(meta, workbook, answer_cells, bounds), bounds)
+
+
+def _expected_values(
+    meta: dict[str, Any], workbook: dict[str, Any], answer_cells: list[str], bounds: tuple[int, int]
+) -> dict[str, Any]:
+    if isinstance(meta.get("expected_values"), dict):
+        return {normalize_cell(cell): value for cell, value in meta["expected_values"].items()}
+    reference = meta.get("reference")
+    if not isinstance(reference, dict):
+        reference = {answer_cells[0]: meta["expected"]} if isinstance(meta.get("expected"), str) else {}
+    state = WorkbookState({**workbook, **{normalize_cell(cell): formula for cell, formula in reference.items()}}, bounds=bounds)
+    return {cell: state.value(cell) for cell in answer_cells}
+
+
+def _submitted_cells(answer_payload: dict[str, Any], answer_cells: list[str]) -> dict[str, Any]:
+    cells = answer_payload.get("cells")
+    if isinstance(cells, dict):
+        try:
+            submitted = {normalize_cell(cell): value for cell, value in cells.items()}
+        except FormulaSyntaxError:
+            return {}
+        return {cell: value for cell, value in submitted.items() if cell in answer_cells}
+    formula = answer_payload.get("formula") or answer_payload.get("text")
+    if isinstance(formula, str) and formula.strip():
+        formula = formula.strip()
+        return {answer_cells[0]: formula if formula.startswith("=") else f"={formula}"}
+    return {}
+
+
+def _check(cell: str, expected: Any, actual: Any, submitted: Any) -> dict[str, Any]:
+    error = actual if isinstance(actual, ExcelError) else None
+    return {
+        "cell": cell,
+        "submitted": submitted,
+        "expected": expected,
+        "actual": None if error else actual,
+        "error": error,
+        "passed": _is_formula(submitted) and error is None and _matches(expected, actual),
+    }
+
+
+def _is_formula(submitted: Any) -> bool:
+    return isinstance(submitted, str) and submitted.strip().startswith("=")
+
+
+def _matches(expected: Any, actual: Any) -> bool:
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)) and not isinstance(expected, bool):
+        return math.isclose(float(expected), float(actual), rel_tol=1e-9, abs_tol=1e-9)
+    if isinstance(expected, str) and isinstance(actual, str):
+        return expected.strip().lower() == actual.strip().lower()
+    return expected == actual
+
+
+def _normalize_formula(formula: str) -> str:
+    return WHITESPACE_OUTSIDE_STRINGS.sub("", formula.strip().lstrip("=")).upper()
+
+
+def _grade_formula_text(meta: dict[str, Any], submitted: dict[str, Any], answer_cell: str) -> dict[str, Any]:
+    expected = meta.get("expected")
+    candidate = submitted.get(answer_cell)
+    passed = isinstance(expected, str) and isinstance(candidate, str) and _normalize_formula(expected) == _normalize_formula(candidate)
+    return {
+        "score": 100.0 if passed else 0.0,
+        "objective": {"checks": [{"cell": answer_cell, "submitted": candidate, "expected": expected, "passed": passed}]},
+        "notes": "Formula matches the reference." if passed else "Formula does not match the reference.",
+    }
+
 
 formula_grader = FormulaGrader()
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import re
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.services.tracing import traced
+
+EXCEL_VOCABULARY: tuple[str, ...] = (
+    "excel", "workbook", "worksheet", "formula", "function", "cell", "range", "named range", "table",
+    "vlookup", "hlookup", "xlookup", "index", "match", "xmatch", "lookup", "sumif", "sumifs", "countif",
+    "countifs", "averageif", "averageifs", "iferror", "ifs", "sumproduct", "filter", "sort", "unique",
+    "lambda", "textjoin", "concat", "concatenate", "trim", "substitute", "datevalue", "eomonth",
+    "networkdays", "offset", "indirect",
+    "pivot", "pivot table", "pivot chart", "slicer", "power query", "power pivot", "data model", "dax",
+    "conditional formatting", "data validation", "dropdown", "chart", "dashboard", "macro", "vba",
+    "remove duplicates", "text to columns", "flash fill", "freeze panes", "absolute reference",
+    "relative reference", "array formula", "dynamic array", "spill", "what-if", "goal seek", "solver",
+    "scenario", "forecast", "trendline", "histogram", "merge", "append", "unpivot", "keyboard shortcut",
+)
+
+STOPWORDS = frozenset(
+    "a an the and or but of to in on for with by at from as is are was were be been being it its this that "
+    "these those i we you he she they them my our your their me us so then than there here what which who "
+    "how why when where do does did have has had can could would should will just also very really about "
+    "into over out up down more most some any all each".split()
+)
+
+CALIBRATION_RAW = np.array([0.0, 0.08, 0.2, 0.35, 0.5, 0.7, 1.0], dtype=np.float32)
+CALIBRATION_SCORE = np.array([5.0, 20.0, 40.0, 58.0, 72.0, 86.0, 97.0], dtype=np.float32)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:-[a-z0-9_]+)*")
+
+
+@dataclass
+class LocalGrade:
+    score: float
+    similarity: float
+    coverage: float
+    word_count: int
+    matched_terms: list[str] = field(default_factory=list)
+    missing_terms: list[str] = field(default_factory=list)
+    off_topic: bool = False
+
+
+class LocalGrader:
+    """Scores free-text answers offline against reference answers with hashed n-gram similarity."""
+
+    def __init__(self, *, dimensions: int = 4096, vocabulary_boost: float = 3.0, cache_size: int = 512) -> None:
+        self._dimensions = dimensions
+        self._cache_size = cache_size
+        normalized = {" ".join(self._tokenize(term)): term for term in EXCEL_VOCABULARY}
+        self._weights = np.ones(dimensions, dtype=np.float32)
+        for feature in normalized:
+            self._weights[self._hash(feature)] = vocabulary_boost
+        self._phrases = {feature: term for feature, term in normalized.items() if " " in feature}
+        self._single_terms = frozenset(feature for feature in normalized if " " not in feature)
+        self._references: OrderedDict[str, tuple[np.ndarray, frozenset[str]]] = OrderedDict()
+
+    @traced("grader.local")
+    async def grade(self, payload: dict[str, Any]) -> dict[str, Any]:
+        question = payload.get("question", {}) or {}
+        answer_payload = payload.get("answer_payload", {}) or {}
+        question_prompt = payload.get("question_prompt") or question.get("prompt") or ""
+        answer_text = answer_payload.get("text") or payload.get("answer") or ""
+        return self.format_result(self.assess(question, question_prompt, answer_text))
+
+    def assess(self, question: dict[str, Any], question_prompt: str, answer_text: str) -> LocalGrade:
+        tokens = self._tokenize(answer_text)
+        if not tokens:
+            return LocalGrade(score=0.0, similarity=0.0, coverage=0.0, word_count=0, off_topic=True)
+
+        matrix, reference_terms = self._reference_matrix(question, question_prompt)
+        answer_vector = self._vectorize(tokens)
+        similarity = float(np.max(matrix @ answer_vector)) if matrix.shape[0] else 0.0
+
+        answer_terms = self._excel_terms(tokens)
+        if reference_terms:
+            matched = sorted(answer_terms & reference_terms)
+            missing = sorted(reference_terms - answer_terms)
+            coverage = len(matched) / len(reference_terms)
+        else:
+            matched = sorted(answer_terms)
+            missing = []
+            coverage = min(len(answer_terms) / 3, 1.0)
+
+        term_density = min(len(answer_terms) / 4, 1.0)
+        length_factor = min(len(tokens) / 12, 1.0)
+        raw = (0.55 * similarity + 0.3 * coverage + 0.15 * term_density) * (0.5 + 0.5 * length_factor)
+        score = float(np.interp(raw, CALIBRATION_RAW, CALIBRATION_SCORE))
+        off_topic = similarity < 0.05 and not answer_terms
+        return LocalGrade(
+            score=round(score, 1),
+            similarity=round(similarity, 4),
+            coverage=round(coverage, 4),
+            word_count=len(tokens),
+            matched_terms=matched,
+            missing_terms=missing,
+            off_topic=off_topic,
+        )
+
+    def format_result(self, grade: LocalGrade) -> dict[str, Any]:
+        strengths = [f"Referenced {', '.join(grade.matched_terms[:5])}"] if grade.matched_terms else []
+        improvements = [f"Consider covering {', '.join(grade.missing_terms[:5])}"] if grade.missing_terms else []
+        if grade.word_count == 0:
+            feedback = "We did not receive an answer—try walking through the Excel steps you would take."
+        elif grade.off_topic:
+            feedback = "This answer did not address the question—focus on the specific Excel features it asks about."
+        elif improvements:
+            feedback = "Thanks for the answer—" + improvements[0][0].lower() + improvements[0][1:] + " next time."
+        else:
+            feedback = "Thanks for the answer—consider adding more concrete Excel specifics next time."
+        return {
+            "score": grade.score,
+            "objective": {
+                "strengths": strengths,
+                "improvements": improvements,
+                "similarity": grade.similarity,
+                "coverage": grade.coverage,
+            },
+            "notes": "Local similarity score",
+            "auto_feedback": feedback,
+            "confidence": round(0.3 + 0.3 * grade.similarity, 2),
+        }
+
+    def _reference_matrix(self, question: dict[str, Any], question_prompt: str) -> tuple[np.ndarray, frozenset[str]]:
+        references = [str(text) for text in question.get("reference_answers", []) or [] if text]
+        key = str(question.get("_id") or question.get("id") or question_prompt)
+        cached = self._references.get(key)
+        if cached is not None:
+            self._references.move_to_end(key)
+            return cached
+
+        documents = references or [question_prompt]
+        token_lists = [self._tokenize(text) for text in documents]
+        vectors = [self._vectorize(tokens) for tokens in token_lists if tokens]
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, self._dimensions), dtype=np.float32)
+        reference_terms: frozenset[str] = frozenset()
+        for tokens in token_lists:
+            reference_terms |= self._excel_terms(tokens)
+        reference_terms -= {"excel"}
+
+        self._references[key] = (matrix, reference_terms)
+        if len(self._references) > self._cache_size:
+            self._references.popitem(last=False)
+        return matrix, reference_terms
+
+    def _tokenize(self, text: str) -> list[str]:
+        return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+    def _vectorize(self, tokens: list[str]) -> np.ndarray:
+        features = tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+        indices = np.fromiter((self._hash(feature) for feature in features), dtype=np.int64, count=len(features))
+        counts = np.bincount(indices, minlength=self._dimensions).astype(np.float32)
+        vector = np.log1p(counts) * self._weights
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _excel_terms(self, tokens: list[str]) -> frozenset[str]:
+        found = {token for token in tokens if token in self._single_terms}
+        joined = " " + " ".join(tokens) + " "
+        found.update(term for feature, term in self._phrases.items() if f" {feature} " in joined)
+        return frozenset(found)
+
+    def _hash(self, feature: str) -> int:
+        return zlib.crc32(feature.encode("utf-8")) % self._dimensions
+
+
+local_grader = LocalGrader()
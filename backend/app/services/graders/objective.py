@@ -2,10 +2,13 @@ from __future__ import annotations
 
 from typing import Any
 
+from app.services.tracing import traced
+
 
 class ObjectiveGrader:
     """Validates MCQ and short-answer responses against objective criteria."""
 
+    @traced("grader.objective")
     async def grade(self, payload: dict[str, Any]) -> dict[str, Any]:
         # TODO: Implement objective grading logic
         _ = payload
@@ -1,107 +1,144 @@
 from __future__ import annotations
 
-from typing import Any
-
-import httpx
+import json
+import re
+from typing import Any, AsyncIterator
 
 from app.core.config import settings
-
-SYSTEM_PROMPT = (
-    "You are an expert Microsoft Excel interviewer. Score the candidate succinctly. "
-    "Return JSON matching the schema with: score (0-100), strengths (array of bullet strings), improvements (array), and summary."
-)
-
-JSON_SCHEMA = {
-    "name": "excel_interview_grade",
-    "schema": {
-        "type": "object",
-        "properties": {
-            "score": {"type": "number", "minimum": 0, "maximum": 100},
-            "strengths": {"type": "array", "items": {"type": "string"}},
-            "improvements": {"type": "array", "items": {"type": "string"}},
-            "summary": {"type": "string"},
-        },
-        "required": ["score"],
-        "additionalProperties": False,
-    },
-}
+from app.services.admission import admission_controller
+from app.services.graders.dispatcher import GradingDispatcher, grading_dispatcher
+from app.services.graders.local import LocalGrade, local_grader
+from app.services.tracing import traced
+
+_SUMMARY_PATTERN = re.compile(r'"summary"\s*:\s*"((?:[^"\\]|\\.)*)')
+_STRENGTHS_PATTERN = re.compile(r'"strengths"\s*:\s*\[')
+_STRING_PATTERN = re.compile(r'\s*,?\s*"((?:[^"\\]|\\.)*)"')
+
+
+class PartialGradeParser:
+    """Surfaces summary and strengths text from a grade JSON document while it is still streaming."""
+
+    def __init__(self) -> None:
+        self.buffer = ""
+        self._summary_sent = 0
+        self._strengths_sent = 0
+
+    def feed(self, delta: str) -> list[tuple[str, dict[str, Any]]]:
+        self.buffer += delta
+        events: list[tuple[str, dict[str, Any]]] = []
+
+        summary_match = _SUMMARY_PATTERN.search(self.buffer)
+        if summary_match is not None:
+            summary = _decode_partial_string(summary_match.group(1))
+            if len(summary) > self._summary_sent:
+                events.append(("summary", {"delta": summary[self._summary_sent:]}))
+                self._summary_sent = len(summary)
+
+        strengths_match = _STRENGTHS_PATTERN.search(self.buffer)
+        if strengths_match is not None:
+            strengths: list[str] = []
+            position = strengths_match.end()
+            while (item := _STRING_PATTERN.match(self.buffer, position)) is not None:
+                strengths.append(_decode_partial_string(item.group(1)))
+                position = item.end()
+            for text in strengths[self._strengths_sent:]:
+                events.append(("strength", {"text": text}))
+            self._strengths_sent = max(self._strengths_sent, len(strengths))
+        return events
+
+
+def _decode_partial_string(raw: str) -> str:
+    for trim in range(0, 6):
+        candidate = raw[: len(raw) - trim] if trim else raw
+        try:
+            return json.loads(f'"{candidate}"')
+        except json.JSONDecodeError:
+            continue
+    return ""
 
 
 class RubricGrader:
     """Invokes an LLM rubric scorer with structured criteria."""
 
+    def __init__(self, dispatcher: GradingDispatcher | None = None) -> None:
+        self._dispatcher = dispatcher or grading_dispatcher
+
+    @traced("grader.rubric")
     async def grade(self, payload: dict[str, Any]) -> dict[str, Any]:
+        local, result = await self._grade(payload)
+        return result if result is not None else local_grader.format_result(local)
+
+    async def grade_with_model(self, payload: dict[str, Any]) -> dict[str, Any] | None:
+        _, result = await self._grade(payload)
+        return result
+
+    async def _grade(self, payload: dict[str, Any]) -> tuple[LocalGrade, dict[str, Any] | None]:
         question = payload.get("question", {})
         answer_payload = payload.get("answer_payload", {})
         question_prompt = payload.get("question_prompt") or question.get("prompt") or ""
         answer_text = answer_payload.get("text") or payload.get("answer") or ""
 
-        if not answer_text.strip() or not settings.openai_api_key:
-            return self._fallback()
-
-        body = {
-            "model": settings.default_model or "gpt-4o-mini",
-            "input": [
-                {
-                    "role": "system",
-                    "content": [{"type": "text", "text": SYSTEM_PROMPT}],
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "Question:\n" + question_prompt + "\n\n" +
-                                "Candidate answer:\n" + answer_text
-                            ),
-                        }
-                    ],
-                },
-            ],
-            "response_format": {"type": "json_schema", "json_schema": JSON_SCHEMA},
-        }
-
-        headers = {
-            "Authorization": f"Bearer {settings.openai_api_key}",
-            "Content-Type": "application/json",
-        }
+        local = local_grader.assess(question, question_prompt, answer_text)
+        if settings.local_grader_prefilter and local.off_topic:
+            return local, local_grader.format_result(local)
+        if not settings.openai_api_key:
+            return local, None
+        if admission_controller.overloaded():
+            admission_controller.record_degraded()
+            return local, None
+
+        parsed = await self._dispatcher.grade(
+            question_prompt,
+            answer_text,
+            priority=int(payload.get("priority", 1)),
+        )
+        return local, self._build_result(parsed)
+
+    async def stream(self, payload: dict[str, Any]) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        question = payload.get("question", {})
+        answer_payload = payload.get("answer_payload", {})
+        question_prompt = payload.get("question_prompt") or question.get("prompt") or ""
+        answer_text = answer_payload.get("text") or payload.get("answer") or ""
 
+        local = local_grader.assess(question, question_prompt, answer_text)
+        if not settings.openai_api_key or (settings.local_grader_prefilter and local.off_topic):
+            yield "grade", local_grader.format_result(local)
+            return
+        if admission_controller.overloaded():
+            admission_controller.record_degraded()
+            yield "grade", local_grader.format_result(local)
+            return
+
+        parser = PartialGradeParser()
+        parsed: dict[str, Any] | None = None
+        async for kind, value in self._dispatcher.stream(question_prompt, answer_text):
+            if kind == "delta":
+                for event in parser.feed(value):
+                    yield event
+            elif kind == "completed":
+                parsed = value
+
+        result = self._build_result(parsed)
+        yield "grade", result if result is not None else local_grader.format_result(local)
+
+    def _build_result(self, parsed: dict[str, Any] | None) -> dict[str, Any] | None:
+        if not parsed:
+            return None
         try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                response = await client.post(
-                    "https://api.openai.com/v1/responses",
-                    headers=headers,
-                    json=body,
-                )
-            response.raise_for_status()
-            data = response.json()
-            parsed = self._extract_json(data)
-            if not parsed:
-                return self._fallback()
-            score = float(parsed.get("score", 0.0))
-            strengths = parsed.get("strengths", []) or []
-            improvements = parsed.get("improvements", []) or []
-            summary = parsed.get("summary", "")
-            auto_feedback = self._format_feedback(strengths, improvements)
-            return {
-                "score": score,
-                "objective": {
-                    "strengths": strengths,
-                    "improvements": improvements,
-                },
-                "notes": summary,
-                "auto_feedback": auto_feedback,
-            }
-        except Exception:
-            return self._fallback(answer_text)
-
-    def _extract_json(self, data: dict[str, Any]) -> dict[str, Any] | None:
-        for item in data.get("output", []):
-            for chunk in item.get("content", []):
-                if chunk.get("type") == "output_json_schema":
-                    return chunk.get("json")
-        return None
+            score = min(max(float(parsed.get("score", 0.0)), 0.0), 100.0)
+        except (TypeError, ValueError):
+            return None
+        strengths = parsed.get("strengths", []) or []
+        improvements = parsed.get("improvements", []) or []
+        return {
+            "score": score,
+            "objective": {
+                "strengths": strengths,
+                "improvements": improvements,
+            },
+            "notes": parsed.get("summary", ""),
+            "auto_feedback": self._format_feedback(strengths, improvements),
+        }
 
     def _format_feedback(self, strengths: list[str], improvements: list[str]) -> str:
         parts = []
@@ -111,21 +148,5 @@ class RubricGrader:
             parts.append("Focus areas: " + "; ".join(improvements))
         return "\n".join(parts) if parts else "Great work—thanks for the answer."
 
-    def _fallback(self, answer: str | None = None) -> dict[str, Any]:
-        base_score = 55.0
-        if answer:
-            text = answer.lower()
-            if "excel" in text:
-                base_score += 15
-            if any(keyword in text for keyword in ["pivot", "vlookup", "xlookup", "index", "match"]):
-                base_score += 10
-            base_score = min(base_score, 90.0)
-        return {
-            "score": base_score,
-            "objective": {"strengths": [], "improvements": []},
-            "notes": "Heuristic fallback score",
-            "auto_feedback": "Thanks for the answer—consider adding more concrete Excel specifics next time.",
-        }
-
 
 rubric_grader = RubricGrader()
@@ -0,0 +1,665 @@
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+CELL_PATTERN = re.compile(r"\$?([A-Za-z]{1,3})\$?([1-9][0-9]{0,6})")
+TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<string>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<range>\$?[A-Za-z]{1,3}\$?[1-9][0-9]{0,6}:\$?[A-Za-z]{1,3}\$?[1-9][0-9]{0,6})"
+    r"|(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<name>[A-Za-z_][A-Za-z0-9_.]*\$?[0-9]*)"
+    r"|(?P<cell>\$[A-Za-z]{1,3}\$?[1-9][0-9]{0,6})"
+    r"|(?P<op><>|<=|>=|[-+*/^&=<>%(),!])"
+    r")"
+)
+COMPARISONS = {"=", "<>", "<", ">", "<=", ">="}
+BINARY_PRECEDENCE = {**{op: 1 for op in COMPARISONS}, "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+AGGREGATES = {"SUM", "AVERAGE", "MIN", "MAX", "COUNT", "COUNTA", "PRODUCT"}
+ROW_BLOCK = 256
+MAX_FORMULA_LENGTH = 8192
+MAX_NESTING = 64
+
+RangeKey = tuple[int, int, int, int]
+Node = tuple[Any, ...]
+
+
+class ExcelError(str):
+    """An Excel error value such as #DIV/0! that propagates through dependent formulas."""
+
+
+DIV0 = ExcelError("#DIV/0!")
+VALUE = ExcelError("#VALUE!")
+NAME = ExcelError("#NAME?")
+REF = ExcelError("#REF!")
+CIRCULAR = ExcelError("#CIRC!")
+
+
+class FormulaSyntaxError(ValueError):
+    """Raised when a formula cannot be parsed."""
+
+
+def column_index(letters: str) -> int:
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def column_letters(index: int) -> str:
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def parse_cell(reference: str) -> tuple[int, int]:
+    match = CELL_PATTERN.fullmatch(reference.strip())
+    if match is None:
+        raise FormulaSyntaxError(f"Invalid cell reference: {reference}")
+    return column_index(match.group(1)), int(match.group(2))
+
+
+def normalize_cell(reference: str) -> str:
+    column, row = parse_cell(reference)
+    return f"{column_letters(column)}{row}"
+
+
+def parse_range(reference: str) -> RangeKey:
+    start, end = reference.split(":")
+    (c1, r1), (c2, r2) = parse_cell(start), parse_cell(end)
+    return min(c1, c2), min(r1, r2), max(c1, c2), max(r1, r2)
+
+
+def range_cells(key: RangeKey) -> Iterator[str]:
+    c1, r1, c2, r2 = key
+    for row in range(r1, r2 + 1):
+        for column in range(c1, c2 + 1):
+            yield f"{column_letters(column)}{row}"
+
+
+class _Parser:
+    def __init__(self, formula: str) -> None:
+        if len(formula) > MAX_FORMULA_LENGTH:
+            raise FormulaSyntaxError(f"Formula longer than {MAX_FORMULA_LENGTH} characters")
+        self._tokens = self._tokenize(formula)
+        self._position = 0
+        self._depth = 0
+
+    def parse(self) -> Node:
+        node = self._expression(0)
+        if self._peek() is not None:
+            raise FormulaSyntaxError(f"Unexpected token {self._peek()[1]!r}")
+        return node
+
+    def _tokenize(self, formula: str) -> list[tuple[str, str]]:
+        tokens: list[tuple[str, str]] = []
+        position = 0
+        formula = formula.rstrip()
+        while position < len(formula):
+            match = TOKEN_PATTERN.match(formula, position)
+            if match is None or match.end() == position:
+                raise FormulaSyntaxError(f"Unexpected character at {position}: {formula[position]!r}")
+            kind = match.lastgroup or ""
+            tokens.append((kind, match.group(kind)))
+            position = match.end()
+        return tokens
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self._tokens[self._position] if self._position < len(self._tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise FormulaSyntaxError("Unexpected end of formula")
+        self._position += 1
+        return token
+
+    def _expect(self, value: str) -> None:
+        kind, text = self._next()
+        if kind != "op" or text != value:
+            raise FormulaSyntaxError(f"Expected {value!r}, found {text!r}")
+
+    def _expression(self, min_precedence: int) -> Node:
+        node = self._unary()
+        while True:
+            token = self._peek()
+            if token is None or token[0] != "op" or token[1] not in BINARY_PRECEDENCE:
+                return node
+            precedence = BINARY_PRECEDENCE[token[1]]
+            if precedence < min_precedence:
+                return node
+            self._next()
+            node = ("bin", token[1], node, self._expression(precedence + 1))
+
+    def _unary(self) -> Node:
+        token = self._peek()
+        if token is not None and token[0] == "op" and token[1] in {"-", "+"}:
+            self._next()
+            operand = self._nested(self._unary)
+            return ("neg", operand) if token[1] == "-" else operand
+        return self._postfix(self._primary())
+
+    def _nested(self, parse: Callable[[], Node]) -> Node:
+        self._depth += 1
+        if self._depth > MAX_NESTING:
+            raise FormulaSyntaxError(f"Formula nested deeper than {MAX_NESTING} levels")
+        try:
+            return parse()
+        finally:
+            self._depth -= 1
+
+    def _postfix(self, node: Node) -> Node:
+        while (token := self._peek()) is not None and token == ("op", "%"):
+            self._next()
+            node = ("bin", "/", node, ("num", 100.0))
+        return node
+
+    def _primary(self) -> Node:
+        kind, text = self._next()
+        if kind == "number":
+            return ("num", float(text))
+        if kind == "string":
+            return ("str", text[1:-1].replace('""', '"'))
+        if kind == "range":
+            return ("range", parse_range(text))
+        if kind == "cell":
+            return ("ref", normalize_cell(text))
+        if kind == "op" and text == "(":
+            node = self._nested(lambda: self._expression(0))
+            self._expect(")")
+            return node
+        if kind == "name":
+            following = self._peek()
+            if following == ("op", "("):
+                self._next()
+                return ("call", text.upper(), self._nested(self._arguments))
+            if following == ("op", "!"):
+                raise FormulaSyntaxError("Sheet-qualified references are not supported")
+            if text.upper() in {"TRUE", "FALSE"}:
+                return ("bool", text.upper() == "TRUE")
+            if CELL_PATTERN.fullmatch(text):
+                return ("ref", normalize_cell(text))
+            return ("name", text.upper())
+        raise FormulaSyntaxError(f"Unexpected token {text!r}")
+
+    def _arguments(self) -> list[Node]:
+        arguments: list[Node] = []
+        if self._peek() == ("op", ")"):
+            self._next()
+            return arguments
+        while True:
+            arguments.append(self._expression(0))
+            kind, text = self._next()
+            if (kind, text) == ("op", ")"):
+                return arguments
+            if (kind, text) != ("op", ","):
+                raise FormulaSyntaxError(f"Expected ',' or ')', found {text!r}")
+
+
+def used_area(cells: Iterable[str]) -> tuple[int, int]:
+    max_column = max_row = 1
+    for cell in cells:
+        column, row = parse_cell(cell)
+        max_column, max_row = max(max_column, column), max(max_row, row)
+    return max_column, max_row
+
+
+def parse_formula(formula: str) -> Node:
+    return _Parser(formula.lstrip()[1:] if formula.lstrip().startswith("=") else formula).parse()
+
+
+def references(node: Node) -> tuple[set[str], set[RangeKey]]:
+    cells: set[str] = set()
+    ranges: set[RangeKey] = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        kind = current[0]
+        if kind == "ref":
+            cells.add(current[1])
+        elif kind == "range":
+            ranges.add(current[1])
+        elif kind == "neg":
+            stack.append(current[1])
+        elif kind == "bin":
+            stack.extend(current[2:])
+        elif kind == "call":
+            stack.extend(current[2])
+    return cells, ranges
+
+
+@dataclass
+class _Cell:
+    raw: Any
+    formula: Node | None
+    cells: frozenset[str]
+    ranges: frozenset[RangeKey]
+
+
+class WorkbookState:
+    """Holds one sheet's cell values and dependency graph and recalculates only the cells downstream of an edit."""
+
+    def __init__(self, cells: dict[str, Any] | None = None, *, bounds: tuple[int, int] | None = None) -> None:
+        self._bounds = bounds
+        self._cells: dict[str, _Cell] = {}
+        self._values: dict[str, Any] = {}
+        self._dependents: dict[str, set[str]] = {}
+        self._range_dependents: dict[RangeKey, set[str]] = {}
+        self._ranges_by_block: dict[tuple[int, int], set[RangeKey]] = {}
+        self._range_cache: dict[RangeKey, dict[str, Any]] = {}
+        self._pending: set[str] = set()
+        self.last_recalculated = 0
+        if cells:
+            self.update(cells)
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def raw(self, cell: str) -> Any:
+        entry = self._cells.get(normalize_cell(cell))
+        return entry.raw if entry is not None else None
+
+    def value(self, cell: str) -> Any:
+        return self._values.get(normalize_cell(cell))
+
+    def update(self, cells: dict[str, Any]) -> set[str]:
+        changed: set[str] = set()
+        orphaned: set[RangeKey] = set()
+        for reference, raw in cells.items():
+            cell = normalize_cell(reference)
+            current = self._cells.get(cell)
+            if current is not None and current.raw == raw and type(current.raw) is type(raw):
+                continue
+            if current is None and raw is None:
+                continue
+            orphaned.update(self._unlink(cell))
+            self._link(cell, raw)
+            changed.add(cell)
+        for key in orphaned:
+            if not self._range_dependents.get(key):
+                self._drop_range(key)
+        if changed:
+            self._recalculate(changed)
+        else:
+            self.last_recalculated = 0
+        return changed
+
+    def _link(self, cell: str, raw: Any) -> None:
+        formula: Node | None = None
+        cells: set[str] = set()
+        ranges: set[RangeKey] = set()
+        if isinstance(raw, str) and raw.startswith("="):
+            try:
+                formula = parse_formula(raw)
+            except FormulaSyntaxError:
+                formula = ("error", NAME)
+            except RecursionError:
+                formula = ("error", VALUE)
+            else:
+                cells, ranges = references(formula)
+                if any(not self._within_bounds(key) for key in ranges):
+                    formula, cells, ranges = ("error", REF), set(), set()
+        if raw is None:
+            self._cells.pop(cell, None)
+        else:
+            self._cells[cell] = _Cell(raw=raw, formula=formula, cells=frozenset(cells), ranges=frozenset(ranges))
+        for precedent in cells:
+            self._dependents.setdefault(precedent, set()).add(cell)
+        for key in ranges:
+            if key not in self._range_dependents:
+                self._range_dependents[key] = set()
+                for block in _blocks(key):
+                    self._ranges_by_block.setdefault(block, set()).add(key)
+            self._range_dependents[key].add(cell)
+
+    def _within_bounds(self, key: RangeKey) -> bool:
+        return self._bounds is None or (key[2] <= self._bounds[0] and key[3] <= self._bounds[1])
+
+    def _unlink(self, cell: str) -> set[RangeKey]:
+        entry = self._cells.get(cell)
+        if entry is None:
+            return set()
+        for precedent in entry.cells:
+            dependents = self._dependents.get(precedent)
+            if dependents is not None:
+                dependents.discard(cell)
+                if not dependents:
+                    del self._dependents[precedent]
+        for key in entry.ranges:
+            self._range_dependents[key].discard(cell)
+        return set(entry.ranges)
+
+    def _drop_range(self, key: RangeKey) -> None:
+        del self._range_dependents[key]
+        self._range_cache.pop(key, None)
+        for block in _blocks(key):
+            self._ranges_by_block[block].discard(key)
+
+    def _containing_ranges(self, cell: str) -> Iterator[RangeKey]:
+        column, row = parse_cell(cell)
+        for key in self._ranges_by_block.get((column, row // ROW_BLOCK), ()):
+            if key[1] <= row <= key[3]:
+                yield key
+
+    def _downstream(self, cell: str) -> Iterator[str]:
+        yield from self._dependents.get(cell, ())
+        for key in self._containing_ranges(cell):
+            yield from self._range_dependents[key]
+
+    def _recalculate(self, changed: set[str]) -> None:
+        order: list[str] = []
+        visited: set[str] = set()
+        for root in changed:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack: list[tuple[str, Iterator[str]]] = [(root, self._downstream(root))]
+            while stack:
+                cell, children = stack[-1]
+                child = next(children, None)
+                if child is None:
+                    stack.pop()
+                    order.append(cell)
+                elif child not in visited:
+                    visited.add(child)
+                    stack.append((child, self._downstream(child)))
+        order.reverse()
+
+        self._pending = set(visited)
+        try:
+            for cell in order:
+                entry = self._cells.get(cell)
+                if entry is None:
+                    value = None
+                elif entry.formula is None:
+                    value = entry.raw
+                else:
+                    value = self._evaluate(entry.formula)
+                previous = self._values.pop(cell, None)
+                if value is not None:
+                    self._values[cell] = value
+                self._pending.discard(cell)
+                if value != previous or type(value) is not type(previous):
+                    self._patch_ranges(cell, value)
+        finally:
+            self._pending = set()
+        self.last_recalculated = len(order)
+
+    def _patch_ranges(self, cell: str, value: Any) -> None:
+        column, row = parse_cell(cell)
+        for key in self._containing_ranges(cell):
+            cached = self._range_cache.get(key)
+            if not cached:
+                continue
+            values = cached.get("values")
+            if values is None:
+                del self._range_cache[key]
+                continue
+            values[(row - key[1]) * (key[2] - key[0] + 1) + column - key[0]] = value
+            self._range_cache[key] = {"values": values}
+
+    def _read(self, cell: str) -> Any:
+        if cell in self._pending:
+            return CIRCULAR
+        return self._values.get(cell)
+
+    def _range_values(self, key: RangeKey) -> list[Any]:
+        cached = self._range_cache.setdefault(key, {})
+        values = cached.get("values")
+        if values is None:
+            values = [self._read(cell) for cell in range_cells(key)]
+            if not any(value is CIRCULAR for value in values):
+                cached["values"] = values
+        return values
+
+    def _evaluate(self, node: Node) -> Any:
+        try:
+            return self._eval(node)
+        except ZeroDivisionError:
+            return DIV0
+        except (TypeError, ValueError, OverflowError, RecursionError):
+            return VALUE
+
+    def _eval(self, node: Node) -> Any:
+        kind = node[0]
+        if kind in {"num", "str", "bool"}:
+            return node[1]
+        if kind == "error":
+            return node[1]
+        if kind == "ref":
+            value = self._read(node[1])
+            return 0.0 if value is None else value
+        if kind == "range":
+            return VALUE
+        if kind == "name":
+            return NAME
+        if kind == "neg":
+            operand = self._eval(node[1])
+            return operand if isinstance(operand, ExcelError) else -_number(operand)
+        if kind == "bin":
+            return self._binary(node[1], self._eval(node[2]), self._eval(node[3]))
+        return self._call(node[1], node[2])
+
+    def _binary(self, op: str, left: Any, right: Any) -> Any:
+        for operand in (left, right):
+            if isinstance(operand, ExcelError):
+                return operand
+        if op == "&":
+            return _text(left) + _text(right)
+        if op in COMPARISONS:
+            return _compare(op, left, right)
+        a, b = _number(left), _number(right)
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        if op == "/":
+            return a / b
+        return a**b
+
+    def _call(self, name: str, arguments: list[Node]) -> Any:
+        if name == "IF":
+            if not 2 <= len(arguments) <= 3:
+                return VALUE
+            condition = self._eval(arguments[0])
+            if isinstance(condition, ExcelError):
+                return condition
+            if _truthy(condition):
+                return self._eval(arguments[1])
+            return self._eval(arguments[2]) if len(arguments) == 3 else False
+        if name == "IFERROR":
+            if len(arguments) != 2:
+                return VALUE
+            value = self._evaluate(arguments[0])
+            return self._eval(arguments[1]) if isinstance(value, ExcelError) else value
+        if name in AGGREGATES and len(arguments) == 1 and arguments[0][0] == "range":
+            key = arguments[0][1]
+            cached = self._range_cache.setdefault(key, {})
+            if name not in cached:
+                result = _aggregate(name, self._range_values(key))
+                if "values" not in cached:
+                    return result
+                cached[name] = result
+            return cached[name]
+        function = FUNCTIONS.get(name)
+        if function is None:
+            return NAME
+        values = [self._range_values(argument[1]) if argument[0] == "range" else self._eval(argument) for argument in arguments]
+        return function(values)
+
+
+def _blocks(key: RangeKey) -> Iterator[tuple[int, int]]:
+    for column in range(key[0], key[2] + 1):
+        for block in range(key[1] // ROW_BLOCK, key[3] // ROW_BLOCK + 1):
+            yield column, block
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, bool):
+        return float(value)
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return float(value.strip())
+    raise TypeError(value)
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _truthy(value: Any) -> bool:
+    if isinstance(value, str):
+        upper = value.upper()
+        if upper in {"TRUE", "FALSE"}:
+            return upper == "TRUE"
+        raise ValueError(value)
+    return bool(_number(value))
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if isinstance(left, str) or isinstance(right, str):
+        a: Any = _text(left).lower()
+        b: Any = _text(right).lower()
+    else:
+        a, b = _number(left), _number(right)
+    return {
+        "=": a == b,
+        "<>": a != b,
+        "<": a < b,
+        ">": a > b,
+        "<=": a <= b,
+        ">=": a >= b,
+    }[op]
+
+
+def _flatten(values: Iterable[Any]) -> Iterator[Any]:
+    for value in values:
+        if isinstance(value, list):
+            yield from value
+        else:
+            yield value
+
+
+def _numbers(values: Iterable[Any]) -> list[float] | ExcelError:
+    numbers: list[float] = []
+    for value in _flatten(values):
+        if isinstance(value, ExcelError):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            numbers.append(float(value))
+    return numbers
+
+
+def _aggregate(name: str, values: list[Any]) -> Any:
+    if name == "COUNTA":
+        return float(sum(1 for value in _flatten(values) if value not in (None, "")))
+    numbers = _numbers(values)
+    if isinstance(numbers, ExcelError):
+        return numbers
+    if name == "SUM":
+        return math.fsum(numbers)
+    if name == "COUNT":
+        return float(len(numbers))
+    if name == "PRODUCT":
+        return math.prod(numbers) if numbers else 0.0
+    if name == "AVERAGE":
+        return math.fsum(numbers) / len(numbers) if numbers else DIV0
+    if name == "MIN":
+        return min(numbers) if numbers else 0.0
+    return max(numbers) if numbers else 0.0
+
+
+def _criterion(criteria: Any) -> Callable[[Any], bool]:
+    if isinstance(criteria, str):
+        match = re.match(r"(<>|<=|>=|=|<|>)?(.*)", criteria)
+        assert match is not None
+        op, operand = match.group(1) or "=", match.group(2)
+        try:
+            target: Any = float(operand)
+        except ValueError:
+            target = operand
+    else:
+        op, target = "=", criteria
+    return lambda value: value is not None and not isinstance(value, ExcelError) and _safe_compare(op, value, target)
+
+
+def _safe_compare(op: str, value: Any, target: Any) -> bool:
+    if isinstance(target, float) and isinstance(value, str):
+        return op == "<>"
+    try:
+        return _compare(op, value, target)
+    except (TypeError, ValueError):
+        return False
+
+
+def _conditional(values: list[Any], summing: bool) -> Any:
+    if len(values) not in (2, 3) or not isinstance(values[0], list):
+        return VALUE
+    matches = _criterion(values[1])
+    targets = values[2] if len(values) == 3 else values[0]
+    if not isinstance(targets, list) or len(targets) != len(values[0]):
+        return VALUE
+    selected = [target for candidate, target in zip(values[0], targets) if matches(candidate)]
+    if not summing:
+        return float(len(selected))
+    numbers = _numbers(selected)
+    return numbers if isinstance(numbers, ExcelError) else math.fsum(numbers)
+
+
+def _scalar(function: Callable[..., Any], arity: int) -> Callable[[list[Any]], Any]:
+    def apply(values: list[Any]) -> Any:
+        if len(values) != arity and not (arity == 2 and len(values) == 1):
+            return VALUE
+        for value in values:
+            if isinstance(value, ExcelError):
+                return value
+            if isinstance(value, list):
+                return VALUE
+        return function(*values)
+
+    return apply
+
+
+def _round(value: Any, digits: Any = 0.0) -> float:
+    factor = 10 ** int(_number(digits))
+    scaled = abs(_number(value)) * factor
+    return math.copysign(math.floor(scaled + 0.5) / factor, _number(value))
+
+
+def _logical(combine: Callable[[Iterable[bool]], bool]) -> Callable[[list[Any]], Any]:
+    def apply(values: list[Any]) -> Any:
+        flattened = [value for value in _flatten(values) if value is not None]
+        for value in flattened:
+            if isinstance(value, ExcelError):
+                return value
+        return combine(_truthy(value) for value in flattened)
+
+    return apply
+
+
+FUNCTIONS: dict[str, Callable[[list[Any]], Any]] = {
+    **{name: (lambda values, name=name: _aggregate(name, values)) for name in AGGREGATES},
+    "SUMIF": lambda values: _conditional(values, summing=True),
+    "COUNTIF": lambda values: _conditional(values, summing=False),
+    "AND": _logical(all),
+    "OR": _logical(any),
+    "NOT": _scalar(lambda value: not _truthy(value), 1),
+    "ABS": _scalar(lambda value: abs(_number(value)), 1),
+    "ROUND": _scalar(_round, 2),
+}
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.services.memory import memory_service
+
+PENDING = "pending"
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when an idempotency key is reused for a different request or is still in flight."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IdempotencyService:
+    """Stores the first outcome of a mutating call per key and replays it for retries."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self._local: dict[str, tuple[float, dict[str, Any]]] = {}
+        self.replayed = 0
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> tuple[dict[str, Any], bool]:
+        cache_key = f"idempotency:{scope}:{key}"
+        inflight = self._inflight.get(cache_key)
+        while inflight is not None:
+            try:
+                record = await asyncio.shield(inflight)
+            except Exception:
+                inflight = self._inflight.get(cache_key)
+                continue
+            return self._replay(record, fingerprint), True
+
+        record = await self._load(cache_key)
+        if record is None and not await self._claim(cache_key, fingerprint):
+            record = await self._load(cache_key)
+        if record is not None:
+            if record.get("state") == PENDING:
+                record = await self._wait_for(cache_key)
+            return self._replay(record, fingerprint), True
+
+        future: asyncio.Future[dict[str, Any]] = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            record = {**await compute(), "fingerprint": fingerprint}
+            if int(record.get("status", 200)) < 500:
+                await self._store(cache_key, record)
+            else:
+                await self._release(cache_key)
+        except BaseException:
+            await self._release(cache_key)
+            future.set_exception(RuntimeError("Original idempotent request failed"))
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+        future.set_result(record)
+        return record, False
+
+    def _replay(self, record: dict[str, Any], fingerprint: str) -> dict[str, Any]:
+        if record.get("fingerprint") != fingerprint:
+            raise IdempotencyConflictError(422, "Idempotency-Key was already used with a different request")
+        self.replayed += 1
+        return record
+
+    async def _wait_for(self, cache_key: str) -> dict[str, Any]:
+        deadline = time.monotonic() + settings.idempotency_wait_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            record = await self._load(cache_key)
+            if record is None:
+                break
+            if record.get("state") != PENDING:
+                return record
+        raise IdempotencyConflictError(409, "A request with this Idempotency-Key is still in progress")
+
+    async def _load(self, cache_key: str) -> dict[str, Any] | None:
+        if memory_service.is_available:
+            try:
+                record = await memory_service.get_cached(cache_key)
+            except RedisError:
+                record = None
+            if record is not None:
+                return record
+        entry = self._local.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            del self._local[cache_key]
+            return None
+        return record
+
+    async def _claim(self, cache_key: str, fingerprint: str) -> bool:
+        marker = {"state": PENDING, "fingerprint": fingerprint}
+        if memory_service.is_available:
+            try:
+                return await memory_service.set_cached(
+                    cache_key,
+                    marker,
+                    ttl_seconds=settings.idempotency_wait_seconds * 2,
+                    only_if_absent=True,
+                )
+            except RedisError:
+                pass
+        if await self._load(cache_key) is not None:
+            return False
+        self._local[cache_key] = (time.monotonic() + settings.idempotency_wait_seconds * 2, marker)
+        return True
+
+    async def _store(self, cache_key: str, record: dict[str, Any]) -> None:
+        if memory_service.is_available:
+            try:
+                await memory_service.set_cached(cache_key, record, ttl_seconds=settings.idempotency_ttl_seconds)
+                return
+            except RedisError:
+                pass
+        self._prune()
+        self._local[cache_key] = (time.monotonic() + settings.idempotency_ttl_seconds, record)
+
+    async def _release(self, cache_key: str) -> None:
+        self._local.pop(cache_key, None)
+        if memory_service.is_available:
+            try:
+                await memory_service.delete_cached(cache_key)
+            except RedisError:
+                pass
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for cache_key in [cache_key for cache_key, (expires_at, _) in self._local.items() if expires_at < now]:
+            del self._local[cache_key]
+
+
+def request_fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+idempotency_service = IdempotencyService()
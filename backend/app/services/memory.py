@@ -1,28 +1,68 @@
 from __future__ import annotations
 
 import json
+import logging
+from collections import defaultdict
 from typing import Any
 
 import redis.asyncio as redis
-from redis.exceptions import RedisError
+from redis.exceptions import RedisError, WatchError
 
 from app.core.config import settings
+from app.db.supervisor import ConnectionSupervisor
+from app.services.tracing import traced_methods
 
+logger = logging.getLogger(__name__)
 
+TRANSCRIPT_VIEW_KEYS = ("recent_transcript", "transcript_summary")
+COMPACTION_COMMIT_ATTEMPTS = 5
+
+
+@traced_methods("memory")
 class MemoryService:
     """Handles session-context persistence in Redis."""
 
-    def __init__(self) -> None:
-        self._client = None if not settings.redis_url else redis.from_url(settings.redis_url, decode_responses=True)
+    def __init__(self, client: redis.Redis | None = None) -> None:
+        if client is None and settings.redis_url:
+            client = redis.from_url(settings.redis_url, decode_responses=True)
+        self._client = client
+        self._supervisor = ConnectionSupervisor(
+            "redis",
+            connect=self._ping,
+            check=self._ping,
+            on_up=self._replay_pending,
+            on_healthy=self._replay_pending,
+            base_delay=settings.reconnect_base_delay_seconds,
+            max_delay=settings.reconnect_max_delay_seconds,
+            check_interval=settings.health_check_interval_seconds,
+        )
+        if self._client is None:
+            self._supervisor.disable()
+        self._pending_contexts: dict[str, dict[str, Any]] = {}
+        self._pending_turns: dict[str, list[dict[str, Any]]] = defaultdict(list)
+
+    def start(self) -> None:
+        if self._client is not None:
+            self._supervisor.start()
+
+    async def close(self) -> None:
+        await self._supervisor.stop()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            **self._supervisor.status(),
+            "pending_contexts": len(self._pending_contexts),
+            "pending_turns": sum(len(turns) for turns in self._pending_turns.values()),
+        }
 
     async def get_session_context(self, session_id: str) -> dict[str, Any] | None:
-        if self._client is None:
-            return None
+        if not self._available():
+            return self._pending_contexts.get(session_id)
         try:
             raw = await self._client.get(self._session_context_key(session_id))
-        except RedisError:
-            self._client = None
-            return None
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            return self._pending_contexts.get(session_id)
         if raw is None:
             return None
         try:
@@ -30,30 +70,145 @@ class MemoryService:
         except json.JSONDecodeError:
             return None
 
+    async def get_session_view(
+        self,
+        session_id: str,
+        transcript_limit: int,
+    ) -> tuple[dict[str, Any] | None, list[dict[str, Any]], dict[str, Any] | None]:
+        if not self._available():
+            return self._pending_contexts.get(session_id), self._pending_turns.get(session_id, [])[-transcript_limit:], None
+        try:
+            async with self._client.pipeline(transaction=False) as pipeline:
+                pipeline.get(self._session_context_key(session_id))
+                pipeline.lrange(self._transcript_key(session_id), -transcript_limit, -1)
+                pipeline.get(self._transcript_summary_key(session_id))
+                raw_context, raw_turns, raw_summary = await pipeline.execute()
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            return self._pending_contexts.get(session_id), self._pending_turns.get(session_id, [])[-transcript_limit:], None
+        return _decode(raw_context), _decode_all(raw_turns), _decode(raw_summary)
+
     async def set_session_context(self, session_id: str, context: dict[str, Any]) -> None:
         if self._client is None:
             return
+        encoded = json.dumps({key: value for key, value in context.items() if key not in TRANSCRIPT_VIEW_KEYS})
+        if not self._available():
+            self._pending_contexts[session_id] = json.loads(encoded)
+            return
         try:
-            await self._client.set(self._session_context_key(session_id), json.dumps(context))
-        except RedisError:
-            self._client = None
+            await self._client.set(self._session_context_key(session_id), encoded)
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            self._pending_contexts[session_id] = json.loads(encoded)
 
-    async def append_transcript_turn(self, session_id: str, turn: dict[str, Any]) -> None:
+    async def set_session_context_if_current(self, session_id: str, context: dict[str, Any]) -> bool:
         if self._client is None:
-            return
+            return True
+        version = int(context.get("context_version", 0))
+        encoded = json.dumps({key: value for key, value in context.items() if key not in TRANSCRIPT_VIEW_KEYS})
+        if not self._available():
+            pending = self._pending_contexts.get(session_id)
+            if pending is not None and int(pending.get("context_version", 0)) > version:
+                return False
+            self._pending_contexts[session_id] = json.loads(encoded)
+            return True
         try:
-            await self._client.rpush(self._transcript_key(session_id), json.dumps(turn))
-        except RedisError:
-            self._client = None
+            return await self._write_context_if_current(session_id, encoded, version)
+        except WatchError:
+            return False
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            self._pending_contexts[session_id] = json.loads(encoded)
+        return True
 
-    async def get_recent_transcript(self, session_id: str, limit: int = 10) -> list[dict[str, Any]]:
+    async def append_transcript_turn(self, session_id: str, turn: dict[str, Any]) -> int | None:
         if self._client is None:
+            return None
+        if not self._available():
+            self._buffer_turn(session_id, turn)
+            return None
+        try:
+            return await self._client.rpush(self._transcript_key(session_id), json.dumps(turn))
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            self._buffer_turn(session_id, turn)
+            return None
+
+    async def transcript_length(self, session_id: str) -> int:
+        if not self._available():
+            return len(self._pending_turns.get(session_id, []))
+        try:
+            return await self._client.llen(self._transcript_key(session_id))
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            return len(self._pending_turns.get(session_id, []))
+
+    async def read_transcript_head(self, session_id: str, count: int) -> list[dict[str, Any]]:
+        if not self._available():
             return []
         try:
-            raw_entries = await self._client.lrange(self._transcript_key(session_id), -limit, -1)
-        except RedisError:
-            self._client = None
+            raw_entries = await self._client.lrange(self._transcript_key(session_id), 0, count - 1)
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
             return []
+        return _decode_all(raw_entries)
+
+    async def commit_compaction(
+        self,
+        session_id: str,
+        count: int,
+        summary: dict[str, Any],
+        *,
+        compacted: int,
+    ) -> bool:
+        if not self._available():
+            return False
+        transcript_key = self._transcript_key(session_id)
+        summary_key = self._transcript_summary_key(session_id)
+        try:
+            for _ in range(COMPACTION_COMMIT_ATTEMPTS):
+                async with self._client.pipeline(transaction=True) as pipeline:
+                    try:
+                        await pipeline.watch(transcript_key, summary_key)
+                        current = _decode(await pipeline.get(summary_key))
+                        if int((current or {}).get("turns_compacted", 0)) != compacted:
+                            return False
+                        pipeline.multi()
+                        pipeline.ltrim(transcript_key, count, -1)
+                        pipeline.set(summary_key, json.dumps(summary))
+                        await pipeline.execute()
+                        return True
+                    except WatchError:
+                        continue
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+        return False
+
+    async def get_transcript_summary(self, session_id: str) -> dict[str, Any] | None:
+        if not self._available():
+            return None
+        try:
+            return _decode(await self._client.get(self._transcript_summary_key(session_id)))
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            return None
+
+    async def set_transcript_summary(self, session_id: str, summary: dict[str, Any]) -> None:
+        if not self._available():
+            return
+        try:
+            await self._client.set(self._transcript_summary_key(session_id), json.dumps(summary))
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+
+    async def get_recent_transcript(self, session_id: str, limit: int = 10) -> list[dict[str, Any]]:
+        if not self._available():
+            return self._pending_turns.get(session_id, [])[-limit:]
+        try:
+            raw_entries = await self._client.lrange(self._transcript_key(session_id), -limit, -1)
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            return self._pending_turns.get(session_id, [])[-limit:]
         result: list[dict[str, Any]] = []
         for raw in raw_entries:
             try:
@@ -62,11 +217,174 @@ class MemoryService:
                 continue
         return result
 
+    @property
+    def is_available(self) -> bool:
+        return self._available()
+
+    @property
+    def is_disabled(self) -> bool:
+        return self._client is None
+
+    # Cache and archive helpers re-raise RedisError: callers fall back locally or must not archive a partial session.
+
+    async def get_cached(self, key: str) -> Any | None:
+        try:
+            raw = await self._client.get(key)
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            raise
+        return None if raw is None else json.loads(raw)
+
+    async def set_cached(self, key: str, value: Any, *, ttl_seconds: float, only_if_absent: bool = False) -> bool:
+        try:
+            result = await self._client.set(key, json.dumps(value), px=int(ttl_seconds * 1000), nx=only_if_absent)
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            raise
+        return bool(result)
+
+    async def delete_cached(self, key: str) -> None:
+        try:
+            await self._client.delete(key)
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            raise
+
+    async def export_session(self, session_id: str) -> dict[str, Any]:
+        context = await self.get_session_context(session_id)
+        if not self._available():
+            return {"context": context, "transcript": list(self._pending_turns.get(session_id, []))}
+        try:
+            async with self._client.pipeline(transaction=False) as pipeline:
+                pipeline.lrange(self._transcript_key(session_id), 0, -1)
+                pipeline.get(self._transcript_summary_key(session_id))
+                raw_entries, raw_summary = await pipeline.execute()
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            raise
+        return {"context": context, "transcript": _decode_all(raw_entries), "transcript_summary": _decode(raw_summary)}
+
+    async def delete_session(self, session_id: str) -> None:
+        self._pending_contexts.pop(session_id, None)
+        self._pending_turns.pop(session_id, None)
+        if not self._available():
+            return
+        try:
+            await self._client.delete(
+                self._session_context_key(session_id),
+                self._transcript_key(session_id),
+                self._transcript_summary_key(session_id),
+            )
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            raise
+
+    async def restore_session(self, session_id: str, snapshot: dict[str, Any]) -> None:
+        if self._client is None:
+            return
+        context = snapshot.get("context")
+        transcript = snapshot.get("transcript") or []
+        if not self._available():
+            if context is not None:
+                self._pending_contexts[session_id] = context
+            for turn in transcript:
+                self._buffer_turn(session_id, turn)
+            return
+        try:
+            async with self._client.pipeline(transaction=True) as pipeline:
+                pipeline.delete(self._transcript_key(session_id))
+                if context is not None:
+                    pipeline.set(self._session_context_key(session_id), json.dumps(context))
+                if transcript:
+                    pipeline.rpush(self._transcript_key(session_id), *(json.dumps(turn) for turn in transcript))
+                if snapshot.get("transcript_summary") is not None:
+                    pipeline.set(self._transcript_summary_key(session_id), json.dumps(snapshot["transcript_summary"]))
+                await pipeline.execute()
+        except RedisError as exc:
+            self._supervisor.report_failure(exc)
+            raise
+
+    def _available(self) -> bool:
+        return self._client is not None and self._supervisor.state in {"connected", "connecting"}
+
+    def _buffer_turn(self, session_id: str, turn: dict[str, Any]) -> None:
+        turns = self._pending_turns[session_id]
+        turns.append(turn)
+        if len(turns) > settings.degraded_write_buffer_size:
+            del turns[0]
+
+    async def _ping(self) -> None:
+        if self._client is None:
+            raise RuntimeError("Redis is not configured")
+        await self._client.ping()
+
+    async def _replay_pending(self) -> None:
+        if self._client is None:
+            return
+        contexts = dict(self._pending_contexts)
+        turns = {session_id: list(entries) for session_id, entries in self._pending_turns.items() if entries}
+        if not contexts and not turns:
+            return
+        self._pending_contexts.clear()
+        self._pending_turns.clear()
+        replayed = 0
+        try:
+            for session_id, context in list(contexts.items()):
+                # Another worker may have saved a newer context while this one sat in the buffer.
+                try:
+                    replayed += await self._write_context_if_current(
+                        session_id, json.dumps(context), int(context.get("context_version", 0))
+                    )
+                except WatchError:
+                    pass
+                del contexts[session_id]
+            if turns:
+                async with self._client.pipeline(transaction=False) as pipeline:
+                    for session_id, entries in turns.items():
+                        pipeline.rpush(self._transcript_key(session_id), *(json.dumps(turn) for turn in entries))
+                    await pipeline.execute()
+        except RedisError:
+            for session_id, context in contexts.items():
+                self._pending_contexts.setdefault(session_id, context)
+            for session_id, entries in turns.items():
+                self._pending_turns[session_id][:0] = entries
+            raise
+        logger.info("Replayed %d contexts and %d transcript turns to Redis", replayed, sum(map(len, turns.values())))
+
+    async def _write_context_if_current(self, session_id: str, encoded: str, version: int) -> bool:
+        key = self._session_context_key(session_id)
+        async with self._client.pipeline(transaction=True) as pipeline:
+            await pipeline.watch(key)
+            current = _decode(await pipeline.get(key))
+            if isinstance(current, dict) and int(current.get("context_version", 0)) > version:
+                return False
+            pipeline.multi()
+            pipeline.set(key, encoded)
+            await pipeline.execute()
+        return True
+
     def _session_context_key(self, session_id: str) -> str:
         return f"session:{session_id}:context"
 
     def _transcript_key(self, session_id: str) -> str:
         return f"session:{session_id}:transcript"
 
+    def _transcript_summary_key(self, session_id: str) -> str:
+        return f"session:{session_id}:transcript_summary"
+
+
+def _decode(raw: str | None) -> Any | None:
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+def _decode_all(raw_entries: list[str]) -> list[Any]:
+    decoded = (_decode(raw) for raw in raw_entries)
+    return [entry for entry in decoded if entry is not None]
+
 
 memory_service = MemoryService()
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
 from typing import Any
 
+from app.core.config import settings
 from app.services.memory import memory_service
-from app.services.storage import storage_service
+from app.services.plan_engine import plan_engine
+from app.services.session_archive import session_archive_service
+from app.services.storage import skill_states_from_session, storage_service
+from app.services.tracing import traced
+from app.services.transcript_compaction import transcript_compactor
+
+logger = logging.getLogger(__name__)
 
 
 class OrchestratorService:
@@ -11,67 +23,95 @@ class OrchestratorService:
 
     def __init__(self) -> None:
         self._fallback_context: dict[str, dict[str, Any]] = {}
+        self._staged_selections: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._staging_tasks: dict[str, asyncio.Task[None]] = {}
+        self._pinned: dict[str, int] = {}
+        self._background: set[asyncio.Task[Any]] = set()
 
+    @traced("orchestrator.fetch_context")
     async def fetch_context(self, session_id: str) -> dict[str, Any]:
-        cached = await memory_service.get_session_context(session_id)
+        if session_id in self._pinned and session_id in self._fallback_context:
+            return self._fallback_context[session_id]
+
+        cached, recent_transcript, transcript_summary = await memory_service.get_session_view(
+            session_id,
+            settings.transcript_window_turns,
+        )
         if cached is not None:
             cached["session_id"] = session_id
-            cached.setdefault("question_plan", self._stage_plan())
             cached.setdefault("plan_index", 0)
             cached.setdefault("asked_questions", [])
+            cached["recent_transcript"] = recent_transcript
+            cached["transcript_summary"] = transcript_summary
             return cached
 
         if session_id in self._fallback_context:
             context = self._fallback_context[session_id]
-            context.setdefault("question_plan", self._stage_plan())
             context.setdefault("plan_index", 0)
             context.setdefault("asked_questions", [])
             return context
 
         session = await storage_service.get_session(session_id)
+        if session is not None and session.get("archive") and await session_archive_service.rehydrate(session_id):
+            return await self.fetch_context(session_id)
         if session is None:
             context = self._default_context(session_id)
             self._fallback_context[session_id] = context
             await memory_service.set_session_context(session_id, context)
             return context
 
-        skill_states = await storage_service.list_skill_states(session_id)
-        normalized_skill_states = [
-            {
-                "skill": state.get("skill"),
-                "rating": state.get("rating", 50),
-                "target_difficulty": state.get("target_difficulty", 2),
-                "asked_count": state.get("asked_count", 0),
-                "correct_count": state.get("correct_count", 0),
-            }
-            for state in skill_states
-        ]
-
-        recent_transcript = await memory_service.get_recent_transcript(session_id)
-
-        context = {
-            "session_id": session_id,
-            "stage": self._derive_stage(session.get("status", "in_progress")),
-            "skill_rotation": [state["skill"] for state in normalized_skill_states if state.get("skill")],
-            "pending_followups": [],
-            "skill_states": normalized_skill_states,
-            "rating_summary": {
-                state["skill"]: state["rating"]
-                for state in normalized_skill_states
-                if state.get("skill")
-            },
-            "recent_transcript": recent_transcript,
-            "question_plan": self._stage_plan(),
-            "plan_index": 0,
-            "asked_questions": [],
-        }
+        if settings.session_aggregate_layout:
+            skill_states = skill_states_from_session(session_id, session)
+        else:
+            skill_states = await storage_service.list_skill_states(session_id)
+        context = self._build_context(session_id, session, skill_states)
+        context["recent_transcript"] = recent_transcript
+        context["transcript_summary"] = transcript_summary
         await memory_service.set_session_context(session_id, context)
         self._fallback_context[session_id] = context
         return context
 
-    async def store_memory(self, session_id: str, memory: dict[str, Any]) -> None:
+    async def pin_context(self, session_id: str) -> dict[str, Any]:
+        context = await self.fetch_context(session_id)
+        self._fallback_context[session_id] = context
+        self._pinned[session_id] = self._pinned.get(session_id, 0) + 1
+        return context
+
+    async def unpin_context(self, session_id: str) -> None:
+        remaining = self._pinned.get(session_id, 0) - 1
+        if remaining > 0:
+            self._pinned[session_id] = remaining
+            return
+        self._pinned.pop(session_id, None)
+        context = self._fallback_context.get(session_id)
+        if context is not None and not await memory_service.set_session_context_if_current(session_id, context):
+            self._fallback_context.pop(session_id, None)
+
+    @traced("orchestrator.store_memory")
+    async def store_memory(
+        self,
+        session_id: str,
+        memory: dict[str, Any],
+        *,
+        sync_skill_states: bool = True,
+    ) -> None:
+        if settings.session_aggregate_layout:
+            memory["context_version"] = await storage_service.save_session_plan(
+                session_id,
+                {
+                    "plan_index": memory.get("plan_index", 0),
+                    "asked_questions": list(memory.get("asked_questions", [])),
+                    "current_question": memory.get("current_question"),
+                },
+            )
+            await memory_service.set_session_context(session_id, memory)
+            self._fallback_context[session_id] = memory
+            return
+        memory["context_version"] = int(memory.get("context_version", 0)) + 1
         await memory_service.set_session_context(session_id, memory)
         self._fallback_context[session_id] = memory
+        if not sync_skill_states:
+            return
         skill_entries = memory.get("skill_states", [])
         if isinstance(skill_entries, list):
             for entry in skill_entries:
@@ -90,6 +130,200 @@ class OrchestratorService:
                     defaults=defaults,
                 )
 
+    async def apply_outcome(
+        self,
+        session_id: str,
+        *,
+        skill: str | None,
+        score: float,
+        difficulty: int,
+        hints_used: int,
+        reported_ms: int,
+    ) -> dict[str, Any]:
+        context = await self.fetch_context(session_id)
+        spent_ms = self.budgeted_time_ms(context, reported_ms)
+        if settings.session_aggregate_layout:
+            session = await storage_service.apply_session_outcome(
+                session_id,
+                skill=skill,
+                score=score,
+                difficulty=difficulty,
+                hints_used=hints_used,
+                time_ms=spent_ms,
+            )
+            context.update(self._build_context(session_id, session, skill_states_from_session(session_id, session)))
+            await memory_service.set_session_context(session_id, context)
+            self._fallback_context[session_id] = context
+            return context
+
+        if skill is not None:
+            await storage_service.update_skill_metrics(
+                session_id=session_id,
+                skill=skill,
+                score=score,
+                difficulty=difficulty,
+                hints_used=hints_used,
+            )
+        updated_states = await storage_service.list_skill_states(session_id)
+        context["time_spent_ms"] = int(context.get("time_spent_ms", 0)) + spent_ms
+        if updated_states:
+            context["skill_states"] = [
+                {
+                    "skill": state.get("skill"),
+                    "rating": state.get("rating", 50),
+                    "target_difficulty": state.get("target_difficulty", 2),
+                    "asked_count": state.get("asked_count", 0),
+                    "correct_count": state.get("correct_count", 0),
+                }
+                for state in updated_states
+            ]
+            context["rating_summary"] = {
+                entry["skill"]: entry["rating"] for entry in context["skill_states"] if entry.get("skill")
+            }
+        await self.store_memory(session_id, context, sync_skill_states=bool(updated_states))
+        return context
+
+    async def record_turn(self, session_id: str, turn: dict[str, Any]) -> None:
+        length = await memory_service.append_transcript_turn(session_id, turn)
+        context = self._fallback_context.get(session_id)
+        if context is None and memory_service.is_disabled:
+            context = await self.fetch_context(session_id)
+        if context is not None:
+            recent = context.setdefault("recent_transcript", [])
+            recent.append(turn)
+            evicted = recent[: max(len(recent) - settings.transcript_window_turns, 0)]
+            del recent[: len(evicted)]
+            if evicted and length is None and memory_service.is_disabled:
+                context["transcript_summary"] = await transcript_compactor.fold_evicted(
+                    session_id,
+                    context.get("transcript_summary"),
+                    evicted,
+                )
+        if length is not None and transcript_compactor.needs_compaction(length):
+            self._spawn(self._compact_transcript(session_id))
+
+    async def _compact_transcript(self, session_id: str) -> None:
+        summary = await transcript_compactor.compact(session_id)
+        context = self._fallback_context.get(session_id)
+        if summary is not None and context is not None:
+            context["transcript_summary"] = summary
+
+    @traced("orchestrator.select_next_question")
+    async def select_next_question(self, context: dict[str, Any]) -> dict[str, Any]:
+        decision = await plan_engine.choose(context)
+        return {
+            "question": decision.question,
+            "plan_index": decision.asked + (decision.question is not None),
+            "remaining": decision.remaining,
+            "completed": decision.completed,
+            "decision": {
+                "reason": decision.reason,
+                "skill": decision.skill,
+                "difficulty": decision.difficulty,
+                "scores": decision.scores,
+                "elapsed_us": decision.elapsed_us,
+            },
+        }
+
+    def log_decision(self, session_id: str, selection: dict[str, Any]) -> None:
+        decision = selection.get("decision")
+        if not decision:
+            return
+        question = selection.get("question") or {}
+        self._spawn(
+            storage_service.log_agent_event(
+                session_id=session_id,
+                step_id="plan_decision",
+                plan="adaptive_plan",
+                action=f"ask {question['id']}" if question else "complete",
+                outcome=decision["reason"],
+                metrics=decision,
+                flagged=False,
+            )
+        )
+
+    def _spawn(self, coroutine: Any) -> None:
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def apply_selection(self, context: dict[str, Any], selection: dict[str, Any]) -> dict[str, Any]:
+        question_payload = selection.get("question")
+        if question_payload is not None:
+            asked_list = context.get("asked_questions", [])
+            asked_list.append(question_payload["id"])
+            context["asked_questions"] = asked_list
+        context["plan_index"] = selection.get("plan_index", context.get("plan_index", 0))
+        context["current_question"] = copy.deepcopy(question_payload)
+        context["question_served_at"] = time.time() if question_payload is not None else None
+        return context
+
+    def budgeted_time_ms(self, context: dict[str, Any], reported_ms: int) -> int:
+        served_at = context.get("question_served_at")
+        now = time.time()
+        if isinstance(served_at, (int, float)) and served_at <= now:
+            elapsed_ms = int((now - served_at) * 1000)
+            context["question_served_at"] = now
+        else:
+            elapsed_ms = max(int(reported_ms), 0)
+        return min(elapsed_ms, settings.plan_max_question_ms)
+
+    def schedule_next_question(self, session_id: str) -> None:
+        self.discard_staged(session_id)
+        self._expire_staged()
+        task = asyncio.create_task(self._stage_next_question(session_id))
+        self._staging_tasks[session_id] = task
+        task.add_done_callback(lambda done: self._clear_staging_task(session_id, done))
+
+    async def take_staged_selection(self, session_id: str, context: dict[str, Any]) -> dict[str, Any] | None:
+        task = self._staging_tasks.get(session_id)
+        if task is not None and not task.done():
+            await asyncio.wait({task})
+        entry = self._staged_selections.pop(session_id, None)
+        if entry is None:
+            return None
+        staged_at, staged = entry
+        if time.monotonic() - staged_at > settings.staged_selection_ttl_seconds:
+            return None
+        if staged.get("context_version") != int(context.get("context_version", 0)):
+            return None
+        return staged
+
+    def discard_staged(self, session_id: str) -> None:
+        task = self._staging_tasks.pop(session_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+        self._staged_selections.pop(session_id, None)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"staged_selections": len(self._staged_selections), "staging_tasks": len(self._staging_tasks)}
+
+    async def _stage_next_question(self, session_id: str) -> None:
+        try:
+            context = await self.fetch_context(session_id)
+            version = int(context.get("context_version", 0))
+            selection = await self.select_next_question(context)
+        except Exception:
+            logger.exception("Failed to stage next question for session %s", session_id)
+            return
+        selection["context_version"] = version
+        self._staged_selections[session_id] = (time.monotonic(), selection)
+        self._staged_selections.move_to_end(session_id)
+        while len(self._staged_selections) > settings.staged_selection_max_sessions:
+            self._staged_selections.popitem(last=False)
+
+    def _expire_staged(self) -> None:
+        cutoff = time.monotonic() - settings.staged_selection_ttl_seconds
+        while self._staged_selections:
+            session_id, (staged_at, _) = next(iter(self._staged_selections.items()))
+            if staged_at >= cutoff:
+                return
+            del self._staged_selections[session_id]
+
+    def _clear_staging_task(self, session_id: str, task: asyncio.Task[None]) -> None:
+        if self._staging_tasks.get(session_id) is task:
+            del self._staging_tasks[session_id]
+
     def _derive_stage(self, status: str) -> str:
         mapping = {
             "created": "intro",
@@ -98,6 +332,43 @@ class OrchestratorService:
         }
         return mapping.get(status, "core")
 
+    def _build_context(
+        self,
+        session_id: str,
+        session: dict[str, Any],
+        skill_states: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        normalized_skill_states = [
+            {
+                "skill": state.get("skill"),
+                "rating": state.get("rating", 50),
+                "target_difficulty": state.get("target_difficulty", 2),
+                "asked_count": state.get("asked_count", 0),
+                "correct_count": state.get("correct_count", 0),
+            }
+            for state in skill_states
+        ]
+        plan = session.get("plan") or {}
+        context = {
+            "session_id": session_id,
+            "stage": self._derive_stage(session.get("status", "in_progress")),
+            "skill_rotation": [state["skill"] for state in normalized_skill_states if state.get("skill")],
+            "pending_followups": [],
+            "skill_states": normalized_skill_states,
+            "rating_summary": {
+                state["skill"]: state["rating"]
+                for state in normalized_skill_states
+                if state.get("skill")
+            },
+            "plan_index": plan.get("plan_index", 0),
+            "asked_questions": list(plan.get("asked_questions", [])),
+        }
+        if settings.session_aggregate_layout:
+            context["current_question"] = plan.get("current_question")
+            context["time_spent_ms"] = int((session.get("aggregates") or {}).get("time_spent_ms", 0))
+            context["context_version"] = int(session.get("version", 0))
+        return context
+
     def _default_context(self, session_id: str) -> dict[str, Any]:
         return {
             "session_id": session_id,
@@ -107,17 +378,9 @@ class OrchestratorService:
             "skill_states": [],
             "rating_summary": {},
             "recent_transcript": [],
-            "question_plan": self._stage_plan(),
+            "transcript_summary": None,
             "plan_index": 0,
             "asked_questions": [],
         }
 
-    def _stage_plan(self) -> list[dict[str, Any]]:
-        return [
-            {"skill": "excel_basics", "difficulty": 2},
-            {"skill": "excel_formulas", "difficulty": 2},
-            {"skill": "excel_analysis", "difficulty": 3},
-            {"skill": "professionalism", "difficulty": 1},
-        ]
-
 orchestrator_service = OrchestratorService()
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.core.config import settings
+from app.services.question_stats import question_stats_service
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_CENTERS = {1: 35.0, 2: 55.0, 3: 75.0}
+RATING_SCALE = 12.0
+DEFAULT_QUESTION_TIME_MS = 120_000
+
+
+@dataclass
+class IndexedQuestion:
+    id: str
+    skill: str
+    difficulty: int
+    payload: dict[str, Any]
+
+
+@dataclass
+class PlanDecision:
+    question: dict[str, Any] | None
+    completed: bool
+    asked: int
+    remaining: int
+    reason: str
+    skill: str | None = None
+    difficulty: int | None = None
+    scores: dict[str, dict[str, float]] = field(default_factory=dict)
+    elapsed_us: float = 0.0
+
+
+class QuestionIndex:
+    """Immutable snapshot of the question bank bucketed by (skill, difficulty)."""
+
+    def __init__(self, questions: list[dict[str, Any]]) -> None:
+        self.buckets: dict[tuple[str, int], list[IndexedQuestion]] = defaultdict(list)
+        self.by_id: dict[str, IndexedQuestion] = {}
+        for question in sorted(questions, key=lambda item: str(item.get("_id"))):
+            entry = IndexedQuestion(
+                id=str(question.get("_id")),
+                skill=str(question.get("skill", "general")),
+                difficulty=int(question.get("difficulty", 2)),
+                payload={
+                    "id": str(question.get("_id")),
+                    "skill": question.get("skill", "general"),
+                    "difficulty": int(question.get("difficulty", 2)),
+                    "type": question.get("type", "open"),
+                    "prompt": question.get("prompt", ""),
+                    "weight": float(question.get("weight", 1.0)),
+                    "meta": question.get("meta", {}),
+                },
+            )
+            self.buckets[(entry.skill, entry.difficulty)].append(entry)
+            self.by_id[entry.id] = entry
+        self.skills = sorted({skill for skill, _ in self.buckets})
+        self.difficulties: dict[str, list[int]] = defaultdict(list)
+        for skill, difficulty in sorted(self.buckets):
+            self.difficulties[skill].append(difficulty)
+
+
+class PlanEngine:
+    """Chooses each next question from live skill ratings, question stats, coverage and the time budget."""
+
+    def __init__(self) -> None:
+        self._index: QuestionIndex | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+
+    async def index(self) -> QuestionIndex:
+        if self._index is None:
+            async with self._lock:
+                if self._index is None:
+                    await self.rebuild()
+        return self._index
+
+    async def rebuild(self) -> QuestionIndex:
+        questions = await storage_service.list_all_questions()
+        self._index = QuestionIndex(questions)
+        return self._index
+
+    def invalidate(self) -> None:
+        self._index = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def choose(self, context: dict[str, Any]) -> PlanDecision:
+        index = await self.index()
+        return self.decide(index, context)
+
+    def decide(self, index: QuestionIndex, context: dict[str, Any]) -> PlanDecision:
+        started = time.perf_counter()
+        asked_ids = list(context.get("asked_questions", []))
+        asked = set(asked_ids)
+        asked_per_skill = Counter(index.by_id[qid].skill for qid in asked_ids if qid in index.by_id)
+        remaining_questions = max(settings.plan_max_questions - len(asked_ids), 0)
+        remaining_ms = settings.plan_time_budget_ms - int(context.get("time_spent_ms", 0))
+
+        def finish(reason: str, **kwargs: Any) -> PlanDecision:
+            decision = PlanDecision(asked=len(asked_ids), reason=reason, **kwargs)
+            decision.elapsed_us = round((time.perf_counter() - started) * 1_000_000, 1)
+            return decision
+
+        closing = settings.plan_closing_skill
+        closing_asked = asked_per_skill.get(closing, 0) > 0 or closing not in index.difficulties
+        if remaining_questions == 0 or (remaining_ms <= 0 and closing_asked):
+            return finish("budget_exhausted", question=None, completed=True, remaining=0)
+
+        ratings = {
+            str(state.get("skill")): float(state.get("rating", 50))
+            for state in context.get("skill_states", [])
+            if state.get("skill")
+        }
+        opening = settings.plan_opening_skill
+        must_close = closing in index.difficulties and not closing_asked and (
+            remaining_questions == 1 or remaining_ms <= self._expected_time_ms(index, closing)
+        )
+
+        core_skills = [skill for skill in index.skills if skill != closing]
+        passes = [[closing]] if must_close else [core_skills, [closing]]
+        scores: dict[str, dict[str, float]] = {}
+        best: tuple[float, str, IndexedQuestion] | None = None
+        for skills in passes:
+            for skill in skills:
+                asked_count = asked_per_skill.get(skill, 0)
+                if asked_count >= settings.plan_max_per_skill:
+                    continue
+                rating = ratings.get(skill, 50.0)
+                for difficulty in index.difficulties.get(skill, []):
+                    question = self._first_unasked(index.buckets[(skill, difficulty)], asked, remaining_ms)
+                    if question is None:
+                        continue
+                    probability = self._success_probability(rating, question)
+                    information = probability * (1 - probability) * 4
+                    uncertainty = 1 / math.sqrt(asked_count + 1)
+                    coverage = 1.0 if asked_count == 0 else 0.0
+                    opening_bonus = 2.0 if skill == opening and not asked_ids else 0.0
+                    score = information * uncertainty + coverage + opening_bonus
+                    scores[f"{skill}:{difficulty}"] = {
+                        "score": round(score, 4),
+                        "information": round(information, 4),
+                        "uncertainty": round(uncertainty, 4),
+                        "coverage": coverage,
+                        "p_correct": round(probability, 4),
+                    }
+                    if best is None or score > best[0]:
+                        best = (score, skill, question)
+            if best is not None:
+                break
+
+        if best is None:
+            return finish("bank_exhausted", question=None, completed=True, remaining=0, scores=scores)
+        _, skill, question = best
+        reason = "closing" if skill == closing else "opening" if skill == opening and not asked_ids else "information_gain"
+        return finish(
+            reason,
+            question=question.payload,
+            completed=False,
+            remaining=remaining_questions - 1,
+            skill=skill,
+            difficulty=question.difficulty,
+            scores=scores,
+        )
+
+    def _first_unasked(
+        self,
+        bucket: list[IndexedQuestion],
+        asked: set[str],
+        remaining_ms: int,
+    ) -> IndexedQuestion | None:
+        fallback = None
+        for question in bucket:
+            if question.id in asked:
+                continue
+            stats = question_stats_service.calibrated(question.id)
+            too_long = stats is not None and stats.time_ms_p50 > remaining_ms
+            if too_long or question_stats_service.is_miscalibrated(question.id, question.difficulty):
+                fallback = fallback or question
+                continue
+            return question
+        return fallback
+
+    def _success_probability(self, rating: float, question: IndexedQuestion) -> float:
+        center = DIFFICULTY_CENTERS.get(question.difficulty, 55.0)
+        probability = 1 / (1 + math.exp(-(rating - center) / RATING_SCALE))
+        stats = question_stats_service.calibrated(question.id)
+        if stats is not None:
+            probability = (probability + stats.mean_score) / 2
+        return min(max(probability, 0.01), 0.99)
+
+    def _expected_time_ms(self, index: QuestionIndex, skill: str) -> float:
+        times = [
+            stats.time_ms_p50
+            for difficulty in index.difficulties.get(skill, [])
+            for question in index.buckets[(skill, difficulty)]
+            if (stats := question_stats_service.get(question.id)) is not None and stats.time_ms_p50
+        ]
+        return min(times) if times else DEFAULT_QUESTION_TIME_MS
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.plan_index_refresh_seconds)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Question index rebuild failed")
+
+
+plan_engine = PlanEngine()
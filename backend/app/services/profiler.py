@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+from app.core.config import BACKEND_DIR, settings
+
+AWAIT_LABEL = "[await]"
+STDLIB_DIR = sysconfig.get_paths()["stdlib"] + "/"
+
+
+@dataclass(eq=False)
+class ProfileSession:
+    task: asyncio.Task[Any]
+    thread_id: int
+    label: str
+    started_at: float = field(default_factory=time.perf_counter)
+    samples: Counter[tuple[str, ...]] = field(default_factory=Counter)
+
+
+@dataclass
+class ProfileInfo:
+    name: str
+    size_bytes: int
+    created_at: datetime
+
+
+class SamplingProfiler:
+    """Samples the coroutine stacks of profiled requests from a background thread and writes folded flamegraph files."""
+
+    def __init__(self) -> None:
+        self._sessions: set[ProfileSession] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._labels: dict[Any, str] = {}
+
+    @property
+    def output_dir(self) -> Path:
+        return Path(settings.profiler_output_dir)
+
+    def begin(self, label: str) -> ProfileSession:
+        session = ProfileSession(task=asyncio.current_task(), thread_id=threading.get_ident(), label=label)
+        with self._lock:
+            self._sessions.add(session)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._sample_forever, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return session
+
+    async def finish(self, session: ProfileSession) -> Path | None:
+        with self._lock:
+            self._sessions.discard(session)
+        if not session.samples:
+            return None
+        elapsed_ms = (time.perf_counter() - session.started_at) * 1000
+        return await asyncio.to_thread(self._write, session, elapsed_ms)
+
+    def list_profiles(self) -> list[ProfileInfo]:
+        if not self.output_dir.exists():
+            return []
+        profiles = []
+        for path in self.output_dir.glob("*.folded"):
+            stat = path.stat()
+            profiles.append(ProfileInfo(path.name, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime)))
+        return sorted(profiles, key=lambda profile: profile.created_at, reverse=True)
+
+    def profile_path(self, name: str) -> Path | None:
+        path = self.output_dir / name
+        if path.suffix != ".folded" or path.name != name or not path.is_file():
+            return None
+        return path
+
+    def _sample_forever(self) -> None:
+        interval = settings.profiler_interval_ms / 1000
+        while True:
+            with self._lock:
+                idle = not self._sessions
+                if idle:
+                    self._wake.clear()
+                else:
+                    frames = sys._current_frames()
+                    for session in self._sessions:
+                        stack = self._stack(session, frames.get(session.thread_id))
+                        if stack:
+                            session.samples[stack] += 1
+            if idle:
+                self._wake.wait()
+            else:
+                time.sleep(interval)
+
+    def _stack(self, session: ProfileSession, thread_frame: FrameType | None) -> tuple[str, ...]:
+        coroutine_frames: list[FrameType] = []
+        awaitable: Any = session.task.get_coro()
+        while awaitable is not None:
+            frame = (
+                getattr(awaitable, "cr_frame", None)
+                or getattr(awaitable, "gi_frame", None)
+                or getattr(awaitable, "ag_frame", None)
+            )
+            if frame is None:
+                break
+            coroutine_frames.append(frame)
+            awaitable = (
+                getattr(awaitable, "cr_await", None)
+                or getattr(awaitable, "gi_yieldfrom", None)
+                or getattr(awaitable, "ag_await", None)
+            )
+        if not coroutine_frames:
+            return ()
+
+        labels = [self._label(frame) for frame in coroutine_frames]
+        running = self._frames_below(thread_frame, coroutine_frames[-1])
+        if running is None:
+            labels.append(AWAIT_LABEL)
+        else:
+            labels.extend(self._label(frame) for frame in running)
+        return tuple(labels)
+
+    def _frames_below(self, thread_frame: FrameType | None, leaf: FrameType) -> list[FrameType] | None:
+        frames: list[FrameType] = []
+        frame = thread_frame
+        while frame is not None:
+            if frame is leaf:
+                return list(reversed(frames))
+            frames.append(frame)
+            frame = frame.f_back
+        return None
+
+    def _label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        cached = self._labels.get(code)
+        if cached is None:
+            filename = code.co_filename
+            try:
+                filename = str(Path(filename).relative_to(BACKEND_DIR))
+            except ValueError:
+                filename = filename.rsplit("site-packages/", 1)[-1].removeprefix(STDLIB_DIR)
+            cached = f"{code.co_qualname} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = cached
+        return cached
+
+    def _write(self, session: ProfileSession, elapsed_ms: float) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", session.label).strip("_")[:80]
+        path = self.output_dir / f"{stamp}-{slug}-{elapsed_ms:.0f}ms.folded"
+        lines = [f"{';'.join(stack)} {count}" for stack, count in session.samples.most_common()]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self._enforce_retention()
+        return path
+
+    def _enforce_retention(self) -> None:
+        cutoff = time.time() - settings.profiler_max_age_seconds
+        paths = sorted(self.output_dir.glob("*.folded"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for index, path in enumerate(paths):
+            if index >= settings.profiler_max_files or path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+
+
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+import pandas as pd
+from openpyxl import load_workbook
+from pydantic import ValidationError
+
+from app.models.tools import Question
+from app.services.plan_engine import plan_engine
+from app.services.storage import storage_service
+
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    inserted: int = 0
+    updated: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    conflicts: int = 0
+    invalid: int = 0
+    failed: int = 0
+    errors: list[str] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+
+class QuestionImportService:
+    """Streams question rows from spreadsheets into the question bank in bounded batches."""
+
+    async def import_path(self, path: Path, *, batch_size: int = 500) -> ImportReport:
+        with path.open("rb") as source:
+            return await self.import_stream(source, filename=path.name, batch_size=batch_size)
+
+    async def import_stream(self, source: IO[bytes], *, filename: str, batch_size: int = 500) -> ImportReport:
+        report = ImportReport()
+        started = time.perf_counter()
+        rows = self._iter_rows(source, filename, batch_size)
+
+        while True:
+            batch = await asyncio.to_thread(_take, rows, batch_size)
+            if not batch:
+                break
+            documents: dict[str, dict[str, Any]] = {}
+            id_owners: dict[str, str] = {}
+            for line_number, row in batch:
+                report.rows_read += 1
+                try:
+                    document = self._row_to_document(row)
+                except (ValidationError, ValueError, TypeError) as exc:
+                    report.invalid += 1
+                    if len(report.errors) < MAX_REPORTED_ERRORS:
+                        report.errors.append(f"row {line_number}: {_describe_error(exc)}")
+                    continue
+                owner = id_owners.setdefault(document["_id"], document["content_hash"])
+                if owner != document["content_hash"]:
+                    report.skipped += 1
+                    if len(report.errors) < MAX_REPORTED_ERRORS:
+                        report.errors.append(f"row {line_number}: id {document['_id']} repeats an earlier row")
+                    continue
+                if document["content_hash"] in documents:
+                    report.duplicates += 1
+                documents[document["content_hash"]] = document
+
+            counts = await storage_service.bulk_upsert_questions(list(documents.values()))
+            report.inserted += counts["inserted"]
+            report.updated += counts["updated"]
+            report.conflicts += counts["conflicts"]
+            report.failed += counts["failed"]
+            for question_id in counts["conflicting_ids"]:
+                if len(report.errors) >= MAX_REPORTED_ERRORS:
+                    break
+                report.errors.append(f"id {question_id} already belongs to another question")
+
+        if report.inserted or report.updated:
+            plan_engine.invalidate()
+        report.elapsed_seconds = round(time.perf_counter() - started, 3)
+        report.rows_per_second = round(report.rows_read / report.elapsed_seconds, 1) if report.elapsed_seconds else 0.0
+        return report
+
+    def _iter_rows(self, source: IO[bytes], filename: str, batch_size: int) -> Iterator[tuple[int, dict[str, Any]]]:
+        suffix = Path(filename).suffix.lower()
+        if suffix in {".xlsx", ".xlsm"}:
+            return self._iter_xlsx(source)
+        if suffix == ".csv":
+            return self._iter_csv(source, batch_size)
+        raise ValueError(f"Unsupported question bank format: {suffix or filename}")
+
+    def _iter_xlsx(self, source: IO[bytes]) -> Iterator[tuple[int, dict[str, Any]]]:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            worksheet = workbook.worksheets[0]
+            rows = worksheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(value).strip().lower() if value is not None else "" for value in header]
+            for line_number, values in enumerate(rows, start=2):
+                if values is None or all(value is None for value in values):
+                    continue
+                yield line_number, {column: value for column, value in zip(columns, values) if column}
+        finally:
+            workbook.close()
+
+    def _iter_csv(self, source: IO[bytes], batch_size: int) -> Iterator[tuple[int, dict[str, Any]]]:
+        line_number = 1
+        for chunk in pd.read_csv(source, chunksize=batch_size, dtype=str, keep_default_na=False):
+            chunk.columns = [str(column).strip().lower() for column in chunk.columns]
+            for record in chunk.to_dict("records"):
+                line_number += 1
+                yield line_number, record
+
+    def _row_to_document(self, row: dict[str, Any]) -> dict[str, Any]:
+        prompt = " ".join(str(row.get("prompt") or "").split())
+        if not prompt:
+            raise ValueError("prompt is required")
+        skill = str(row.get("skill") or "").strip()
+        if not skill:
+            raise ValueError("skill is required")
+        question_type = str(row.get("type") or "open").strip()
+
+        meta = row.get("meta") or {}
+        if isinstance(meta, str):
+            meta = json.loads(meta) if meta.strip() else {}
+        if not isinstance(meta, dict):
+            raise ValueError("meta must be a JSON object")
+
+        content_hash = hashlib.sha256(
+            "\x1f".join([skill.lower(), question_type.lower(), prompt.lower()]).encode("utf-8")
+        ).hexdigest()
+        question_id = str(row.get("id") or "").strip() or f"q_{content_hash[:16]}"
+
+        question = Question.model_validate(
+            {
+                "id": question_id,
+                "skill": skill,
+                "difficulty": row.get("difficulty") or 2,
+                "type": question_type,
+                "prompt": prompt,
+                "weight": row.get("weight") or 1.0,
+                "meta": meta,
+            }
+        )
+        return {
+            "_id": question.id,
+            "skill": question.skill,
+            "difficulty": question.difficulty,
+            "type": question.type,
+            "prompt": question.prompt,
+            "weight": question.weight,
+            "meta": question.meta,
+            "reference_answers": _parse_reference_answers(row.get("reference_answers")),
+            "content_hash": content_hash,
+        }
+
+
+def _take(rows: Iterator[tuple[int, dict[str, Any]]], size: int) -> list[tuple[int, dict[str, Any]]]:
+    batch: list[tuple[int, dict[str, Any]]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def _parse_reference_answers(value: Any) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value if item]
+    text = str(value).strip()
+    if not text:
+        return []
+    if text.startswith("["):
+        parsed = json.loads(text)
+        if not isinstance(parsed, list):
+            raise ValueError("reference_answers must be a list")
+        return [str(item) for item in parsed if item]
+    return [part.strip() for part in text.split("||") if part.strip()]
+
+
+def _describe_error(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in exc.errors())
+    return str(exc)
+
+
+question_import_service = QuestionImportService()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "question_stats"
+TIME_BUCKET_BOUNDS_MS: tuple[int, ...] = (
+    5_000, 10_000, 20_000, 30_000, 45_000, 60_000, 90_000, 120_000, 180_000, 300_000, 600_000,
+)
+TARGET_SCORE_BY_DIFFICULTY = {1: 0.75, 2: 0.6, 3: 0.45}
+
+
+@dataclass
+class QuestionStats:
+    question_id: str
+    attempts: int
+    mean_score: float
+    score_variance: float
+    hint_rate: float
+    time_ms_p50: float
+    time_ms_p90: float
+
+
+class QuestionStatsService:
+    """Maintains materialised per-question calibration stats and an in-process snapshot of them."""
+
+    def __init__(self) -> None:
+        self._snapshot: dict[str, QuestionStats] = {}
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: asyncio.Task[None] | None = None
+
+    def get(self, question_id: str) -> QuestionStats | None:
+        return self._snapshot.get(question_id)
+
+    def snapshot(self) -> dict[str, QuestionStats]:
+        return self._snapshot
+
+    def calibrated(self, question_id: str) -> QuestionStats | None:
+        stats = self._snapshot.get(question_id)
+        if stats is None or stats.attempts < settings.question_stats_min_attempts:
+            return None
+        return stats
+
+    def is_miscalibrated(self, question_id: str, difficulty: int) -> bool:
+        stats = self.calibrated(question_id)
+        target = TARGET_SCORE_BY_DIFFICULTY.get(difficulty)
+        if stats is None or target is None:
+            return False
+        return abs(stats.mean_score - target) > settings.question_stats_tolerance
+
+    async def refresh(self) -> int:
+        processed = 0
+        state = await storage_service.acquire_job_lease(
+            JOB_NAME,
+            owner=self._owner,
+            ttl_seconds=settings.question_stats_refresh_seconds * 2,
+        )
+        if state is not None:
+            after_id = state.get("last_attempt_id")
+            settled = datetime.utcnow() - timedelta(seconds=settings.question_stats_lag_seconds)
+            if after_id is not None:
+                # Journal replays insert attempts (flagged stats_pending) whose ids can sit behind the
+                # checkpoint, where the id scan below would never reach them.
+                async for batch in storage_service.iter_stats_pending_attempts(through_id=after_id):
+                    await storage_service.apply_question_stats(self._increments(batch))
+                    await storage_service.clear_stats_pending([document["_id"] for document in batch])
+                    processed += len(batch)
+            async for batch in storage_service.iter_export_batches(
+                "attempts", after_id=after_id, before_id=str(ObjectId.from_datetime(settled)), batch_size=1000
+            ):
+                after_id = str(batch[-1].get("_id"))
+                await storage_service.apply_question_stats(self._increments(batch), through_id=after_id)
+                await storage_service.clear_stats_pending(
+                    [document["_id"] for document in batch if document.get("stats_pending")]
+                )
+                processed += len(batch)
+                await storage_service.update_job_state(JOB_NAME, {"last_attempt_id": after_id})
+
+        documents = await storage_service.list_question_stats()
+        self._snapshot = {
+            str(document["_id"]): self._to_stats(document)
+            for document in documents
+            if document.get("attempts")
+        }
+        return processed
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Question stats refresh failed")
+            await asyncio.sleep(settings.question_stats_refresh_seconds)
+
+    def _increments(self, attempts: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+        increments: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for attempt in attempts:
+            question_id = attempt.get("question_id")
+            if not question_id:
+                continue
+            score = _normalized_score(attempt.get("score"))
+            fields = increments[str(question_id)]
+            fields["attempts"] += 1
+            fields["score_sum"] += score
+            fields["score_sq_sum"] += score * score
+            if int(attempt.get("hints_used") or 0) > 0:
+                fields["hinted"] += 1
+            fields[f"time_hist.{_time_bucket(int(attempt.get('time_ms') or 0))}"] += 1
+        return {question_id: dict(fields) for question_id, fields in increments.items()}
+
+    def _to_stats(self, document: dict[str, Any]) -> QuestionStats:
+        attempts = int(document.get("attempts", 0))
+        mean = float(document.get("score_sum", 0.0)) / attempts
+        variance = max(float(document.get("score_sq_sum", 0.0)) / attempts - mean * mean, 0.0)
+        histogram = document.get("time_hist", {}) or {}
+        counts = [int(histogram.get(str(index), 0)) for index in range(len(TIME_BUCKET_BOUNDS_MS) + 1)]
+        return QuestionStats(
+            question_id=str(document["_id"]),
+            attempts=attempts,
+            mean_score=round(mean, 4),
+            score_variance=round(variance, 4),
+            hint_rate=round(float(document.get("hinted", 0)) / attempts, 4),
+            time_ms_p50=_histogram_percentile(counts, 0.5),
+            time_ms_p90=_histogram_percentile(counts, 0.9),
+        )
+
+
+def _normalized_score(value: Any) -> float:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return min(max(score, 0.0), 1.0)
+
+
+def _time_bucket(time_ms: int) -> int:
+    for index, bound in enumerate(TIME_BUCKET_BOUNDS_MS):
+        if time_ms <= bound:
+            return index
+    return len(TIME_BUCKET_BOUNDS_MS)
+
+
+def _histogram_percentile(counts: list[int], fraction: float) -> float:
+    total = sum(counts)
+    if not total:
+        return 0.0
+    threshold = fraction * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if count and cumulative + count >= threshold:
+            lower = TIME_BUCKET_BOUNDS_MS[index - 1] if index > 0 else 0
+            upper = TIME_BUCKET_BOUNDS_MS[index] if index < len(TIME_BUCKET_BOUNDS_MS) else TIME_BUCKET_BOUNDS_MS[-1] * 2
+            return float(lower + (upper - lower) * (threshold - cumulative) / count)
+        cumulative += count
+    return float(TIME_BUCKET_BOUNDS_MS[-1])
+
+
+question_stats_service = QuestionStatsService()
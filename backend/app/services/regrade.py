@@ -0,0 +1,397 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker, responses_breaker
+from app.services.graders.dispatcher import GradingDispatcher
+from app.services.graders.local import local_grader
+from app.services.graders.rubric import RubricGrader
+from app.services.session_archive import session_archive_service
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+JOB_PREFIX = "regrade:"
+REGRADERS: tuple[str, ...] = ("rubric", "local")
+DETERMINISTIC_QUESTION_TYPES = frozenset({"mcq", "short_text", "shortcut", "formula", "excel_formula"})
+LOCAL_CHUNK_SIZE = 64
+FLUSH_SECONDS = 5.0
+
+GradeChunk = Callable[[list[tuple[dict[str, Any], dict[str, Any] | None]]], Awaitable[list[dict[str, Any]]]]
+
+
+@dataclass
+class RegradeCheckpoint:
+    run_id: str
+    grader: str = "rubric"
+    model: str | None = None
+    start: str | None = None
+    end: str | None = None
+    session_ids: list[str] | None = None
+    question_ids: list[str] | None = None
+    skills: list[str] | None = None
+    after_id: str | None = None
+    live_complete: bool = False
+    archived_after: str | None = None
+    archived_attempt_after: str | None = None
+    scanned: int = 0
+    graded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    delta_sum: float = 0.0
+    abs_delta_sum: float = 0.0
+    status: str = "running"
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RegradeCheckpoint":
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in fields})
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "mean_delta": round(self.delta_sum / self.graded, 3) if self.graded else 0.0,
+            "mean_abs_delta": round(self.abs_delta_sum / self.graded, 3) if self.graded else 0.0,
+        }
+
+
+class _RegradeHalted(Exception):
+    pass
+
+
+class _LeaseLost(_RegradeHalted):
+    pass
+
+
+class _Chunk:
+    __slots__ = ("items", "task")
+
+    def __init__(self) -> None:
+        self.items: list[tuple[dict[str, Any], dict[str, Any] | None]] = []
+        self.task: asyncio.Task[list[dict[str, Any]]] | None = None
+
+
+class CohortRegradeService:
+    """Re-scores historical attempts for a cohort with the current graders and stores the score deltas."""
+
+    def __init__(
+        self,
+        *,
+        base_url: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._questions: dict[str, dict[str, Any] | None] = {}
+        self._base_url = base_url
+        self._transport = transport
+        self._breaker = breaker or responses_breaker
+
+    async def load(self, run_id: str) -> RegradeCheckpoint | None:
+        state = await storage_service.get_job_state(JOB_PREFIX + run_id)
+        return RegradeCheckpoint.from_dict(state) if state else None
+
+    async def run(
+        self,
+        checkpoint: RegradeCheckpoint,
+        *,
+        concurrency: int | None = None,
+        workers: int | None = None,
+        batch_size: int = 1000,
+        flush_size: int = 500,
+    ) -> RegradeCheckpoint:
+        if checkpoint.grader not in REGRADERS:
+            raise ValueError(f"Unknown regrader: {checkpoint.grader}")
+        job_name = JOB_PREFIX + checkpoint.run_id
+        if await self._renew_lease(job_name) is None:
+            raise RuntimeError(f"Regrade run {checkpoint.run_id} is held by another worker")
+
+        concurrency = concurrency or settings.regrade_concurrency
+        executor: Executor | None = None
+        dispatcher: GradingDispatcher | None = None
+        if checkpoint.grader == "local":
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            grade = self._local_chunk_grader(executor)
+            chunk_size = LOCAL_CHUNK_SIZE
+            concurrency = 2 * (workers or os.cpu_count() or 1)
+        else:
+            dispatcher = GradingDispatcher(
+                requests_per_minute=settings.regrade_requests_per_minute,
+                tokens_per_minute=settings.regrade_tokens_per_minute,
+                max_queue=2 * concurrency,
+                max_concurrency=concurrency,
+                base_url=self._base_url,
+                transport=self._transport,
+                breaker=self._breaker,
+            )
+            grade = self._rubric_chunk_grader(RubricGrader(dispatcher))
+            chunk_size = 1
+
+        checkpoint.status = "running"
+        cohort = _Cohort(checkpoint)
+        semaphore = asyncio.Semaphore(concurrency)
+        window: deque[tuple[str, _Chunk | None, int]] = deque()
+        results: list[dict[str, Any]] = []
+        flushed_at = time.monotonic()
+        chunk = _Chunk()
+        lease_lost = False
+
+        async def submit(current: _Chunk) -> None:
+            await semaphore.acquire()
+            current.task = asyncio.create_task(grade(current.items))
+            current.task.add_done_callback(lambda _: semaphore.release())
+
+        async def flush() -> None:
+            nonlocal flushed_at, lease_lost
+            if await self._renew_lease(job_name) is None:
+                lease_lost = True
+                raise _LeaseLost
+            await storage_service.save_regrade_results(results)
+            results.clear()
+            await storage_service.update_job_state(job_name, {**asdict(checkpoint), "updated_at": datetime.utcnow()})
+            flushed_at = time.monotonic()
+
+        async def feed(attempt: dict[str, Any]) -> None:
+            nonlocal chunk
+            question = await self._question(attempt.get("question_id"))
+            if not cohort.includes(attempt, question):
+                window.append((str(attempt.get("_id")), None, 0))
+                return
+            chunk.items.append((attempt, question))
+            window.append((str(attempt.get("_id")), chunk, len(chunk.items) - 1))
+            if len(chunk.items) >= chunk_size:
+                await submit(chunk)
+                chunk = _Chunk()
+
+        async def settle() -> None:
+            nonlocal chunk
+            if chunk.items:
+                await submit(chunk)
+                chunk = _Chunk()
+            while len(window) > 8 * concurrency * chunk_size:
+                await _wait_head(window)
+                self._drain(checkpoint, window, results)
+            self._drain(checkpoint, window, results)
+            if len(results) >= flush_size or time.monotonic() - flushed_at >= FLUSH_SECONDS:
+                await flush()
+
+        async def finish() -> None:
+            await settle()
+            while window:
+                await _wait_head(window)
+                self._drain(checkpoint, window, results)
+
+        start = datetime.fromisoformat(checkpoint.start) if checkpoint.start else None
+        end = datetime.fromisoformat(checkpoint.end) if checkpoint.end else None
+        try:
+            if not checkpoint.live_complete:
+                async for batch in storage_service.iter_export_batches(
+                    "attempts", start=start, end=end, after_id=checkpoint.after_id, batch_size=batch_size
+                ):
+                    for attempt in batch:
+                        await feed(attempt)
+                    await settle()
+                await finish()
+                checkpoint.live_complete = True
+            resume_after = checkpoint.archived_attempt_after
+            async for session_id, attempts in session_archive_service.iter_archived_documents(
+                "attempts", start=start, end=end, after_session_id=checkpoint.archived_after
+            ):
+                for attempt in attempts:
+                    if resume_after is None or str(attempt.get("_id")) > resume_after:
+                        await feed(attempt)
+                resume_after = None
+                window.append((session_id, None, -1))
+                await settle()
+            await finish()
+            checkpoint.status = "completed"
+        except _LeaseLost:
+            logger.warning("Regrade run %s lost its lease to another worker", checkpoint.run_id)
+        except _RegradeHalted:
+            logger.warning("Regrade run %s stopped at %s; resume to retry", checkpoint.run_id, checkpoint.after_id)
+        finally:
+            with contextlib.suppress(_RegradeHalted):
+                self._drain(checkpoint, window, results)
+            for _, pending, _ in window:
+                if pending is not None and pending.task is not None:
+                    pending.task.cancel()
+            if checkpoint.status != "completed":
+                checkpoint.status = "interrupted"
+            try:
+                if not lease_lost:
+                    with contextlib.suppress(_LeaseLost):
+                        await asyncio.shield(flush())
+            finally:
+                if dispatcher is not None:
+                    await dispatcher.close()
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+                self._questions.clear()
+        return checkpoint
+
+    def _drain(
+        self,
+        checkpoint: RegradeCheckpoint,
+        window: deque[tuple[str, _Chunk | None, int]],
+        results: list[dict[str, Any]],
+    ) -> None:
+        while window:
+            attempt_id, chunk, index = window[0]
+            if chunk is not None and (chunk.task is None or not chunk.task.done()):
+                return
+            error = None if chunk is None or chunk.task.cancelled() else chunk.task.exception()
+            if chunk is not None and (chunk.task.cancelled() or isinstance(error, _RegradeHalted)):
+                logger.warning("Regrading halted at attempt %s: %s", attempt_id, error or "cancelled")
+                for _, pending, _ in window:
+                    if pending is not None and pending.task is not None:
+                        pending.task.cancel()
+                window.clear()
+                raise _RegradeHalted
+            window.popleft()
+            if index < 0:
+                checkpoint.archived_after = attempt_id
+                checkpoint.archived_attempt_after = None
+                continue
+            checkpoint.scanned += 1
+            if checkpoint.live_complete:
+                checkpoint.archived_attempt_after = attempt_id
+            else:
+                checkpoint.after_id = attempt_id
+            if chunk is None:
+                checkpoint.skipped += 1
+                continue
+            attempt, _ = chunk.items[index]
+            original = _as_percent(attempt.get("score"))
+            document = {
+                "_id": f"{checkpoint.run_id}:{attempt_id}",
+                "run_id": checkpoint.run_id,
+                "attempt_id": attempt_id,
+                "session_id": attempt.get("session_id"),
+                "question_id": attempt.get("question_id"),
+                "grader": checkpoint.grader,
+                "model": checkpoint.model,
+                "original_score": original,
+                "attempt_created_at": attempt.get("created_at"),
+                "created_at": datetime.utcnow(),
+            }
+            if error is not None:
+                logger.warning("Regrading attempt %s failed: %r", attempt_id, error)
+                checkpoint.failed += 1
+                results.append({**document, "status": "failed", "error": repr(error)})
+                continue
+            result = chunk.task.result()[index]
+            score = float(result.get("score", 0.0))
+            delta = round(score - original, 2)
+            checkpoint.graded += 1
+            checkpoint.delta_sum += delta
+            checkpoint.abs_delta_sum += abs(delta)
+            results.append(
+                {
+                    **document,
+                    "status": "graded",
+                    "score": score,
+                    "delta": delta,
+                    "objective": result.get("objective"),
+                    "notes": result.get("notes"),
+                }
+            )
+
+    def _rubric_chunk_grader(self, grader: RubricGrader) -> GradeChunk:
+        async def grade(items: list[tuple[dict[str, Any], dict[str, Any] | None]]) -> list[dict[str, Any]]:
+            results = []
+            for attempt, question in items:
+                result = await grader.grade_with_model(_grading_payload(attempt, question))
+                if result is None and (self._breaker.is_open() or not settings.openai_api_key):
+                    raise _RegradeHalted("model grading is unavailable")
+                if result is None:
+                    raise RuntimeError("model grading failed for this attempt")
+                results.append(result)
+            return results
+
+        return grade
+
+    def _local_chunk_grader(self, executor: Executor) -> GradeChunk:
+        async def grade(items: list[tuple[dict[str, Any], dict[str, Any] | None]]) -> list[dict[str, Any]]:
+            payloads = []
+            for attempt, question in items:
+                payload = _grading_payload(attempt, question)
+                reference = {key: payload["question"].get(key) for key in ("_id", "reference_answers")}
+                payloads.append((reference, payload["question_prompt"] or "", payload["answer_payload"].get("text") or ""))
+            return await asyncio.get_running_loop().run_in_executor(executor, _grade_locally, payloads)
+
+        return grade
+
+    async def _question(self, question_id: Any) -> dict[str, Any] | None:
+        if not isinstance(question_id, str):
+            return None
+        if question_id not in self._questions:
+            self._questions[question_id] = await storage_service.get_question(question_id)
+        return self._questions[question_id]
+
+    async def _renew_lease(self, job_name: str) -> dict[str, Any] | None:
+        return await storage_service.acquire_job_lease(
+            job_name, owner=self._owner, ttl_seconds=settings.regrade_lease_seconds
+        )
+
+
+class _Cohort:
+    def __init__(self, checkpoint: RegradeCheckpoint) -> None:
+        self.session_ids = frozenset(checkpoint.session_ids or ())
+        self.question_ids = frozenset(checkpoint.question_ids or ())
+        self.skills = frozenset(checkpoint.skills or ())
+
+    def includes(self, attempt: dict[str, Any], question: dict[str, Any] | None) -> bool:
+        if question is not None and question.get("type") in DETERMINISTIC_QUESTION_TYPES:
+            return False
+        if self.session_ids and attempt.get("session_id") not in self.session_ids:
+            return False
+        if self.question_ids and attempt.get("question_id") not in self.question_ids:
+            return False
+        return not self.skills or (question is not None and question.get("skill") in self.skills)
+
+
+async def _wait_head(window: deque[tuple[str, _Chunk | None, int]]) -> None:
+    chunk = window[0][1]
+    if chunk is not None and chunk.task is not None:
+        await asyncio.wait([chunk.task])
+
+
+def _grading_payload(attempt: dict[str, Any], question: dict[str, Any] | None) -> dict[str, Any]:
+    answer_payload = attempt.get("answer_payload") or {}
+    return {
+        "question": question or {},
+        "question_prompt": (question or {}).get("prompt", answer_payload.get("question_prompt")),
+        "answer_payload": answer_payload,
+    }
+
+
+def _grade_locally(payloads: list[tuple[dict[str, Any], str, str]]) -> list[dict[str, Any]]:
+    return [
+        local_grader.format_result(local_grader.assess(question, question_prompt, answer_text))
+        for question, question_prompt, answer_text in payloads
+    ]
+
+
+def _as_percent(value: Any) -> float:
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return score * 100
+
+
+cohort_regrader = CohortRegradeService()
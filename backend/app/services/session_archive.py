@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator
+
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+from app.core.config import settings
+from app.services.blob_store import BlobStore, build_blob_store
+from app.services.memory import memory_service
+from app.services.storage import EXPORT_TIME_FIELDS, storage_service
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "session_archive"
+ARCHIVE_FORMAT_VERSION = 1
+
+
+class SessionArchiveService:
+    """Moves finalized sessions from the hot stores into compressed blobs and rehydrates them on demand."""
+
+    def __init__(self) -> None:
+        self._store: BlobStore | None = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: asyncio.Task[None] | None = None
+        self._scheduled: dict[str, asyncio.Task[None]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    @property
+    def store(self) -> BlobStore:
+        if self._store is None:
+            self._store = build_blob_store()
+        return self._store
+
+    async def schedule(self, session_id: str) -> None:
+        delay = settings.archive_after_finalize_seconds
+        await storage_service.mark_session_archivable(
+            session_id,
+            eligible_at=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        previous = self._scheduled.pop(session_id, None)
+        if previous is not None and not previous.done():
+            previous.cancel()
+        task = asyncio.create_task(self._archive_later(session_id, delay))
+        self._scheduled[session_id] = task
+        task.add_done_callback(lambda done: self._clear_scheduled(session_id, done))
+
+    async def archive_session(self, session_id: str) -> bool:
+        if storage_service.is_degraded:
+            return False
+        async with self._lock(session_id):
+            session = await storage_service.get_session(session_id)
+            if session is not None and session.get("archive"):
+                return False
+            documents = await storage_service.collect_session_documents(session_id)
+            memory_snapshot = await memory_service.export_session(session_id)
+            archived_at = datetime.utcnow()
+            bundle = {
+                "version": ARCHIVE_FORMAT_VERSION,
+                "session_id": session_id,
+                "archived_at": archived_at,
+                "documents": documents,
+                "memory": memory_snapshot,
+            }
+            data = await asyncio.to_thread(_encode, bundle)
+            key = _archive_key(session_id)
+            await self.store.put(key, data)
+            await storage_service.mark_session_archived(
+                session_id,
+                {
+                    "key": key,
+                    "backend": settings.archive_backend,
+                    "bytes": len(data),
+                    "counts": {collection: len(items) for collection, items in documents.items()},
+                    "archived_at": archived_at,
+                },
+            )
+            await storage_service.delete_session_documents(session_id, documents)
+            await memory_service.delete_session(session_id)
+        logger.info("Archived session %s (%d bytes)", session_id, len(data))
+        return True
+
+    async def ensure_hot(self, session_id: str) -> bool:
+        session = await storage_service.get_session(session_id)
+        if session is None or not session.get("archive"):
+            return False
+        return await self.rehydrate(session_id)
+
+    async def rehydrate(self, session_id: str) -> bool:
+        async with self._lock(session_id):
+            session = await storage_service.get_session(session_id)
+            archive = (session or {}).get("archive")
+            if not archive:
+                return False
+            data = await self.store.get(archive["key"])
+            bundle = await asyncio.to_thread(_decode, data)
+            await storage_service.restore_session_documents(session_id, bundle.get("documents", {}))
+            await memory_service.restore_session(session_id, bundle.get("memory", {}))
+            await storage_service.mark_session_archivable(
+                session_id,
+                eligible_at=datetime.utcnow() + timedelta(seconds=settings.archive_after_finalize_seconds),
+            )
+        logger.info("Rehydrated session %s from %s", session_id, archive["key"])
+        return True
+
+    async def iter_archived_documents(
+        self,
+        collection: str,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        after_session_id: str | None = None,
+    ) -> AsyncIterator[tuple[str, list[dict[str, Any]]]]:
+        time_field = EXPORT_TIME_FIELDS[collection]
+        async for session in storage_service.iter_archived_sessions(after_id=after_session_id):
+            data = await self.store.get(session["archive"]["key"])
+            bundle = await asyncio.to_thread(_decode, data)
+            documents = [
+                document
+                for document in bundle.get("documents", {}).get(collection, [])
+                if _in_window(document.get(time_field), start, end)
+            ]
+            documents.sort(key=lambda document: str(document.get("_id")))
+            yield str(session["_id"]), documents
+
+    async def sweep(self) -> int:
+        if storage_service.is_degraded:
+            return 0
+        state = await storage_service.acquire_job_lease(
+            JOB_NAME,
+            owner=self._owner,
+            ttl_seconds=settings.archive_sweep_interval_seconds * 2,
+        )
+        if state is None:
+            return 0
+        session_ids = await storage_service.list_archivable_sessions(
+            before=datetime.utcnow(),
+            limit=settings.archive_sweep_batch_size,
+        )
+        archived = 0
+        for session_id in session_ids:
+            try:
+                archived += await self.archive_session(session_id)
+            except Exception:
+                logger.exception("Failed to archive session %s", session_id)
+        return archived
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = [task for task in (self._task, *self._scheduled.values()) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._scheduled.clear()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Session archive sweep failed")
+            await asyncio.sleep(settings.archive_sweep_interval_seconds)
+
+    async def _archive_later(self, session_id: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await self.archive_session(session_id)
+        except Exception:
+            logger.exception("Failed to archive session %s", session_id)
+
+    def _clear_scheduled(self, session_id: str, task: asyncio.Task[None]) -> None:
+        if self._scheduled.get(session_id) is task:
+            del self._scheduled[session_id]
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        if len(self._locks) > 1024:
+            for key in [key for key, value in self._locks.items() if not value.locked() and key != session_id]:
+                del self._locks[key]
+        return lock
+
+
+def _archive_key(session_id: str) -> str:
+    return f"sessions/{session_id}.json.gz"
+
+
+def _in_window(value: Any, start: datetime | None, end: datetime | None) -> bool:
+    if start is None and end is None:
+        return True
+    if not isinstance(value, datetime):
+        return False
+    return (start is None or value >= start) and (end is None or value < end)
+
+
+def _encode(bundle: dict[str, Any]) -> bytes:
+    return gzip.compress(json_util.dumps(bundle, json_options=CANONICAL_JSON_OPTIONS).encode("utf-8"))
+
+
+def _decode(data: bytes) -> dict[str, Any]:
+    return json_util.loads(gzip.decompress(data).decode("utf-8"), json_options=CANONICAL_JSON_OPTIONS)
+
+
+session_archive_service = SessionArchiveService()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Sender = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class SessionChannelHub:
+    """Tracks open per-session sockets so services can push events to connected clients."""
+
+    def __init__(self) -> None:
+        self._senders: dict[str, list[Sender]] = defaultdict(list)
+
+    def register(self, session_id: str, sender: Sender) -> None:
+        self._senders[session_id].append(sender)
+
+    def unregister(self, session_id: str, sender: Sender) -> None:
+        senders = self._senders.get(session_id)
+        if not senders:
+            return
+        if sender in senders:
+            senders.remove(sender)
+        if not senders:
+            del self._senders[session_id]
+
+    def is_connected(self, session_id: str) -> bool:
+        return bool(self._senders.get(session_id))
+
+    async def publish(self, session_id: str, event: str, data: dict[str, Any]) -> None:
+        for sender in list(self._senders.get(session_id, [])):
+            try:
+                await sender({"event": event, "data": data})
+            except Exception:
+                logger.warning("Dropping session channel for %s after failed push", session_id)
+                self.unregister(session_id, sender)
+
+
+session_channel_hub = SessionChannelHub()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+from app.services.admission import admission_controller
+from app.services.idempotency import request_fingerprint
+
+logger = logging.getLogger(__name__)
+
+GradeCallable = Callable[[], Awaitable[dict[str, Any] | None]]
+
+
+def answer_fingerprint(answer_payload: dict[str, Any]) -> str | None:
+    text = answer_payload.get("text")
+    canonical = {**answer_payload, "text": text.strip()} if isinstance(text, str) else dict(answer_payload)
+    if all(value in (None, "", [], {}) for value in canonical.values()):
+        return None
+    return request_fingerprint(canonical)
+
+
+@dataclass
+class _Speculation:
+    fingerprint: str
+    task: asyncio.Task[dict[str, Any] | None]
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+
+class SpeculativeGrader:
+    """Grades answers as soon as answer_received is logged and hands the result to the matching grade_answer call."""
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[tuple[str, str], _Speculation] = OrderedDict()
+        self._saved_ms: deque[float] = deque(maxlen=1000)
+        self._counters = {
+            "started": 0,
+            "skipped": 0,
+            "lookups": 0,
+            "hits": 0,
+            "awaited": 0,
+            "misses": 0,
+            "cancelled": 0,
+            "expired": 0,
+            "errors": 0,
+        }
+
+    def speculate(self, session_id: str, question_id: str, answer_payload: dict[str, Any], grade: GradeCallable) -> bool:
+        fingerprint = answer_fingerprint(answer_payload)
+        if not settings.speculative_grading_enabled or fingerprint is None:
+            return False
+        if admission_controller.overloaded():
+            self._counters["skipped"] += 1
+            return False
+        key = (session_id, question_id)
+        current = self._entries.get(key)
+        if current is not None:
+            if current.fingerprint == fingerprint:
+                return True
+            self._discard(key, "cancelled")
+        self._expire()
+        speculation = _Speculation(fingerprint=fingerprint, task=asyncio.create_task(grade()))
+        speculation.task.add_done_callback(lambda task: _finished(speculation, task))
+        self._entries[key] = speculation
+        self._counters["started"] += 1
+        return True
+
+    async def take(self, session_id: str, question_id: str, answer_payload: dict[str, Any]) -> dict[str, Any] | None:
+        self._counters["lookups"] += 1
+        speculation = self._entries.pop((session_id, question_id), None)
+        if speculation is None:
+            return None
+        if speculation.fingerprint != answer_fingerprint(answer_payload):
+            speculation.task.cancel()
+            self._counters["misses"] += 1
+            return None
+        requested_at = time.monotonic()
+        if not speculation.task.done():
+            self._counters["awaited"] += 1
+        try:
+            result = await speculation.task
+        except asyncio.CancelledError:
+            if speculation.task.cancelled() and not _current_task_cancelling():
+                self._counters["errors"] += 1
+                return None
+            raise
+        except Exception:
+            self._counters["errors"] += 1
+            return None
+        if result is None:
+            self._counters["misses"] += 1
+            return None
+        done_at = min(speculation.finished_at or requested_at, requested_at)
+        self._saved_ms.append((done_at - speculation.started_at) * 1000)
+        self._counters["hits"] += 1
+        return result
+
+    def snapshot(self) -> dict[str, Any]:
+        saved = sorted(self._saved_ms)
+        lookups = self._counters["lookups"]
+        return {
+            **self._counters,
+            "in_flight": sum(1 for entry in self._entries.values() if not entry.task.done()),
+            "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+            "saved_ms": {
+                "count": len(saved),
+                "total": sum(saved),
+                "p50": saved[len(saved) // 2] if saved else 0.0,
+                "p95": saved[min(int(len(saved) * 0.95), len(saved) - 1)] if saved else 0.0,
+            },
+        }
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - settings.speculative_grading_ttl_seconds
+        while self._entries:
+            key, oldest = next(iter(self._entries.items()))
+            if oldest.started_at >= cutoff and len(self._entries) < settings.speculative_grading_max_entries:
+                return
+            self._discard(key, "expired")
+
+    def _discard(self, key: tuple[str, str], reason: str) -> None:
+        speculation = self._entries.pop(key)
+        speculation.task.cancel()
+        self._counters[reason] += 1
+
+
+def _finished(speculation: _Speculation, task: asyncio.Task[dict[str, Any] | None]) -> None:
+    speculation.finished_at = time.monotonic()
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Speculative grading task failed: %r", task.exception())
+
+
+def _current_task_cancelling() -> bool:
+    task = asyncio.current_task()
+    return task is not None and task.cancelling() > 0
+
+
+speculative_grader = SpeculativeGrader()
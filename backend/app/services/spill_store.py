@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import pickle
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ClassVar, Iterator
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RECORD_COLLECTIONS: tuple[str, ...] = ("attempts", "agent_events", "transcript_turns")
+_MISSING = object()
+
+
+class CompactRecord:
+    """Tuple-backed document with fixed field positions and an overflow dict for unexpected keys."""
+
+    __slots__ = ("values", "extra")
+    FIELDS: ClassVar[tuple[str, ...]] = ()
+
+    def __init__(self, document: dict[str, Any]) -> None:
+        self.values = tuple(document.get(name, _MISSING) for name in self.FIELDS)
+        extra = {key: value for key, value in document.items() if key not in self.FIELDS}
+        self.extra = extra or None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in self.FIELDS:
+            value = self.values[self.FIELDS.index(name)]
+            return default if value is _MISSING else value
+        return (self.extra or {}).get(name, default)
+
+    def to_document(self) -> dict[str, Any]:
+        document = {name: value for name, value in zip(self.FIELDS, self.values) if value is not _MISSING}
+        if self.extra:
+            document.update(self.extra)
+        return document
+
+
+class AttemptRecord(CompactRecord):
+    __slots__ = ()
+    FIELDS = (
+        "_id",
+        "session_id",
+        "question_id",
+        "score",
+        "objective",
+        "time_ms",
+        "difficulty",
+        "answer_payload",
+        "feedback",
+        "hints_used",
+        "created_at",
+    )
+
+
+class AgentEventRecord(CompactRecord):
+    __slots__ = ()
+    FIELDS = ("_id", "session_id", "step_id", "plan", "action", "outcome", "metrics", "flagged", "created_at")
+
+
+class TranscriptTurnRecord(CompactRecord):
+    __slots__ = ()
+    FIELDS = ("_id", "session_id", "seq", "turn", "archived_at")
+
+
+RECORD_TYPES: dict[str, type[CompactRecord]] = {
+    "attempts": AttemptRecord,
+    "agent_events": AgentEventRecord,
+    "transcript_turns": TranscriptTurnRecord,
+}
+
+
+class SessionBucket:
+    """Everything the in-memory storage mode keeps for one session, with its accounted size."""
+
+    __slots__ = ("session", "skill_state", "attempts", "agent_events", "transcript_turns", "record_bytes", "state_bytes")
+
+    def __init__(self) -> None:
+        self.session: dict[str, Any] | None = None
+        self.skill_state: dict[str, dict[str, Any]] = {}
+        self.attempts: list[CompactRecord] = []
+        self.agent_events: list[CompactRecord] = []
+        self.transcript_turns: list[CompactRecord] = []
+        self.record_bytes = 0
+        self.state_bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.record_bytes + self.state_bytes
+
+    @property
+    def finished(self) -> bool:
+        return bool(self.session and (self.session.get("archive_eligible_at") or self.session.get("archive")))
+
+    def records(self, collection: str) -> list[CompactRecord]:
+        return getattr(self, collection)
+
+    def documents(self, collection: str) -> list[dict[str, Any]]:
+        return [record.to_document() for record in self.records(collection)]
+
+    def dump(self) -> bytes:
+        return pickle.dumps(
+            {
+                "session": self.session,
+                "skill_state": self.skill_state,
+                **{collection: self.documents(collection) for collection in RECORD_COLLECTIONS},
+            },
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+    @classmethod
+    def load(cls, blob: bytes | memoryview) -> "SessionBucket":
+        data = pickle.loads(blob)
+        bucket = cls()
+        bucket.session = data["session"]
+        bucket.skill_state = data["skill_state"]
+        for collection in RECORD_COLLECTIONS:
+            record_type = RECORD_TYPES[collection]
+            bucket.records(collection).extend(record_type(document) for document in data[collection])
+        return bucket
+
+    def measure(self) -> None:
+        self.record_bytes = sum(
+            _estimate(record.to_document()) for collection in RECORD_COLLECTIONS for record in self.records(collection)
+        )
+        self.state_bytes = _estimate((self.session, self.skill_state))
+
+
+@dataclass(slots=True)
+class _SpillEntry:
+    offset: int
+    length: int
+    archive_eligible_at: datetime | None
+
+
+class SpillingSessionStore:
+    """Byte-budgeted session buckets that spill cold or finished sessions to an append-only file read through mmap."""
+
+    def __init__(self) -> None:
+        self._buckets: OrderedDict[str, SessionBucket] = OrderedDict()
+        self._spilled: dict[str, _SpillEntry] = {}
+        self._bytes = 0
+        self._path: Path | None = None
+        self._handle: Any = None
+        self._map: mmap.mmap | None = None
+        self._file_bytes = 0
+        self._dead_bytes = 0
+        self._counters = {"spilled": 0, "rehydrated": 0, "peeked": 0, "compactions": 0}
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._buckets or session_id in self._spilled
+
+    def session_ids(self) -> list[str]:
+        return [*self._buckets, *self._spilled]
+
+    def is_spilled(self, session_id: str) -> bool:
+        return session_id in self._spilled
+
+    def get(self, session_id: str) -> SessionBucket | None:
+        bucket = self._buckets.get(session_id)
+        if bucket is not None:
+            self._buckets.move_to_end(session_id)
+            return bucket
+        if session_id not in self._spilled:
+            return None
+        bucket = self._read(self._spilled[session_id])
+        bucket.measure()
+        self._release(session_id)
+        self._counters["rehydrated"] += 1
+        self._admit(session_id, bucket)
+        return bucket
+
+    def bucket(self, session_id: str) -> SessionBucket:
+        bucket = self.get(session_id)
+        if bucket is None:
+            bucket = SessionBucket()
+            self._admit(session_id, bucket)
+        return bucket
+
+    def peek(self, session_id: str) -> SessionBucket | None:
+        bucket = self._buckets.get(session_id)
+        if bucket is not None or session_id not in self._spilled:
+            return bucket
+        self._counters["peeked"] += 1
+        return self._read(self._spilled[session_id])
+
+    def iter_buckets(self) -> Iterator[tuple[str, SessionBucket]]:
+        for session_id in self.session_ids():
+            bucket = self.peek(session_id)
+            if bucket is not None:
+                yield session_id, bucket
+
+    def session(self, session_id: str, now: datetime) -> dict[str, Any]:
+        bucket = self.bucket(session_id)
+        if bucket.session is None:
+            bucket.session = {"_id": session_id, "created_at": now}
+        return bucket.session
+
+    def archivable(self, before: datetime) -> Iterator[str]:
+        for session_id, bucket in self._buckets.items():
+            eligible_at = (bucket.session or {}).get("archive_eligible_at")
+            if eligible_at and eligible_at <= before:
+                yield session_id
+        for session_id, entry in self._spilled.items():
+            if entry.archive_eligible_at and entry.archive_eligible_at <= before:
+                yield session_id
+
+    def append(self, session_id: str, collection: str, documents: list[dict[str, Any]]) -> None:
+        bucket = self.bucket(session_id)
+        record_type = RECORD_TYPES[collection]
+        added = 0
+        for document in documents:
+            bucket.records(collection).append(record_type(document))
+            added += _estimate(document)
+        bucket.record_bytes += added
+        self._bytes += added
+        self._enforce_budget(keep=session_id)
+
+    def updated(self, session_id: str) -> None:
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            return
+        state_bytes = _estimate((bucket.session, bucket.skill_state))
+        self._bytes += state_bytes - bucket.state_bytes
+        bucket.state_bytes = state_bytes
+        self._enforce_budget(keep=session_id)
+
+    def replace(self, session_id: str, bucket: SessionBucket) -> None:
+        self.discard(session_id)
+        bucket.measure()
+        self._admit(session_id, bucket)
+
+    def discard(self, session_id: str) -> SessionBucket | None:
+        bucket = self._buckets.pop(session_id, None)
+        if bucket is not None:
+            self._bytes -= bucket.nbytes
+            return bucket
+        if session_id not in self._spilled:
+            return None
+        bucket = self._read(self._spilled[session_id])
+        self._release(session_id)
+        return bucket
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self._path is not None:
+            self._path.unlink(missing_ok=True)
+            self._path = None
+        self._spilled.clear()
+        self._file_bytes = self._dead_bytes = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            **self._counters,
+            "budget_bytes": settings.memory_store_budget_bytes,
+            "resident_sessions": len(self._buckets),
+            "resident_bytes": self._bytes,
+            "spilled_sessions": len(self._spilled),
+            "spill_file_bytes": self._file_bytes,
+            "spill_dead_bytes": self._dead_bytes,
+        }
+
+    def _admit(self, session_id: str, bucket: SessionBucket) -> None:
+        self._buckets[session_id] = bucket
+        self._bytes += bucket.nbytes
+        self._enforce_budget(keep=session_id)
+
+    def _enforce_budget(self, *, keep: str) -> None:
+        budget = settings.memory_store_budget_bytes
+        if budget <= 0 or self._bytes <= budget:
+            return
+        finished = [session_id for session_id, bucket in self._buckets.items() if bucket.finished and session_id != keep]
+        for session_id in [*finished, *self._buckets]:
+            if self._bytes <= budget:
+                break
+            if session_id != keep and session_id in self._buckets:
+                self._spill(session_id)
+        if self._dead_bytes > max(self._file_bytes - self._dead_bytes, budget):
+            self._compact()
+
+    def _spill(self, session_id: str) -> None:
+        bucket = self._buckets.pop(session_id)
+        self._bytes -= bucket.nbytes
+        blob = bucket.dump()
+        handle = self._open()
+        handle.seek(0, os.SEEK_END)
+        offset = handle.tell()
+        handle.write(blob)
+        handle.flush()
+        self._file_bytes = offset + len(blob)
+        self._spilled[session_id] = _SpillEntry(offset, len(blob), (bucket.session or {}).get("archive_eligible_at"))
+        self._counters["spilled"] += 1
+
+    def _release(self, session_id: str) -> _SpillEntry:
+        entry = self._spilled.pop(session_id)
+        self._dead_bytes += entry.length
+        if not self._spilled:
+            self._truncate()
+        return entry
+
+    def _read(self, entry: _SpillEntry) -> SessionBucket:
+        if self._map is None or len(self._map) < entry.offset + entry.length:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        with memoryview(self._map)[entry.offset:entry.offset + entry.length] as view:
+            return SessionBucket.load(view)
+
+    def _open(self) -> Any:
+        if self._handle is None:
+            directory = Path(settings.memory_store_spill_dir)
+            directory.mkdir(parents=True, exist_ok=True)
+            self._path = directory / f"sessions-{os.getpid()}.spill"
+            self._handle = self._path.open("w+b")
+        return self._handle
+
+    def _truncate(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._handle is not None:
+            self._handle.truncate(0)
+        self._file_bytes = self._dead_bytes = 0
+
+    def _compact(self) -> None:
+        assert self._path is not None and self._handle is not None
+        if self._map is None or len(self._map) < self._file_bytes:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        path = self._path.with_suffix(".compact")
+        offset = 0
+        with path.open("wb") as target:
+            for entry in self._spilled.values():
+                target.write(self._map[entry.offset:entry.offset + entry.length])
+                entry.offset = offset
+                offset += entry.length
+        self._map.close()
+        self._map = None
+        self._handle.close()
+        os.replace(path, self._path)
+        self._handle = self._path.open("r+b")
+        self._file_bytes = offset
+        self._dead_bytes = 0
+        self._counters["compactions"] += 1
+        logger.info("Compacted session spill file to %d bytes for %d sessions", offset, len(self._spilled))
+
+
+def _estimate(value: Any) -> int:
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
@@ -1,10 +1,24 @@
 from __future__ import annotations
 
-from collections import defaultdict
-from datetime import datetime
-from typing import Any
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, AsyncIterator
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.core.config import settings
+from app.services.spill_store import RECORD_COLLECTIONS, RECORD_TYPES, SessionBucket, SpillingSessionStore
+from app.services.tracing import traced_methods
+
+logger = logging.getLogger(__name__)
 
 SAMPLE_QUESTIONS: list[dict[str, Any]] = [
     {
@@ -14,6 +28,10 @@ SAMPLE_QUESTIONS: list[dict[str, Any]] = [
         "type": "open",
         "prompt": "We focus heavily on Microsoft Excel. Walk me through a recent workbook you built—what was the business goal and which Excel features did you lean on the most?",
         "weight": 1.0,
+        "reference_answers": [
+            "I built a monthly sales workbook to track revenue against targets. I used tables and named ranges for clean inputs, SUMIFS and XLOOKUP to pull figures, a pivot table with slicers for the summary, conditional formatting to flag misses, and a chart on a dashboard sheet.",
+            "The goal was a budget tracker for finance. I relied on Power Query to import and clean the exports, data validation dropdowns for categories, SUMIFS for totals by month, and a pivot chart so managers could filter by department.",
+        ],
         "meta": {},
     },
     {
@@ -23,6 +41,10 @@ SAMPLE_QUESTIONS: list[dict[str, Any]] = [
         "type": "open",
         "prompt": "A stakeholder needs to reconcile two customer lists with mismatched IDs. Explain how you would approach this in Excel, including the exact formulas or functions you would combine and any data-cleaning steps.",
         "weight": 1.0,
+        "reference_answers": [
+            "First clean both ID columns with TRIM, CLEAN and SUBSTITUTE, convert text numbers with VALUE, and remove duplicates. Then use XLOOKUP or INDEX MATCH with an IFERROR wrapper to find matching customers, and COUNTIF to flag IDs missing from either list. Conditional formatting highlights mismatches for review.",
+            "I would standardise the keys with TRIM and UPPER, use Power Query to merge the two tables with a fuzzy match on names, and check unmatched rows with a left anti join. In formulas I would use XLOOKUP with a not-found value and COUNTIFS to reconcile counts.",
+        ],
         "meta": {},
     },
     {
@@ -32,6 +54,10 @@ SAMPLE_QUESTIONS: list[dict[str, Any]] = [
         "type": "open",
         "prompt": "You receive a dump of 50k sales rows. Describe how you would build an analysis in Excel that surfaces the top 3 performance drivers, including pivot tables, charts, or Power Query steps you would rely on.",
         "weight": 1.0,
+        "reference_answers": [
+            "Load the 50k rows into a table or through Power Query, clean types, and add the data to the data model. Build pivot tables by region, product and rep, with slicers and a pivot chart. Rank drivers by contribution using calculated fields or DAX measures, and surface the top 3 on a dashboard with conditional formatting.",
+            "I would use Power Query to clean and unpivot the data, then a pivot table to compare sales by segment and period, SUMIFS for variance analysis, sorting to find the top 3 drivers, and charts with trendlines on a dashboard.",
+        ],
         "meta": {},
     },
     {
@@ -41,23 +67,114 @@ SAMPLE_QUESTIONS: list[dict[str, Any]] = [
         "type": "behavioral",
         "prompt": "To close, tell me about a time you coached someone on Excel—what made it effective and what would you do differently next time?",
         "weight": 1.0,
+        "reference_answers": [
+            "I coached a new analyst on lookups by building a small practice workbook together. We walked through VLOOKUP, then XLOOKUP, with absolute references explained on real data. It worked because it was hands-on; next time I would prepare a cheat sheet of keyboard shortcuts and follow up a week later.",
+        ],
         "meta": {},
     },
 ]
 
 
+EXPORT_TIME_FIELDS: dict[str, str] = {
+    "attempts": "created_at",
+    "agent_events": "created_at",
+    "session_skill_state": "updated_at",
+}
+SESSION_COLLECTIONS: tuple[str, ...] = ("attempts", "agent_events", "session_skill_state", "transcript_turns")
+AGGREGATE_FIELDS: tuple[str, ...] = ("skills", "plan", "aggregates")
+AGGREGATE_SKILL_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+@traced_methods("storage")
 class StorageService:
     """Data access abstractions backed by MongoDB collections."""
 
     def __init__(self) -> None:
         self._db: AsyncIOMotorDatabase | None = None
-        self._memory_sessions: dict[str, dict[str, Any]] = {}
-        self._memory_skill_state: dict[str, dict[str, Any]] = defaultdict(dict)
-        self._memory_attempts: dict[str, list[dict[str, Any]]] = defaultdict(list)
-        self._memory_agent_events: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self._memory = SpillingSessionStore()
+        self._memory_questions: list[dict[str, Any]] = [dict(question) for question in SAMPLE_QUESTIONS]
+        self._question_indexes_ready = False
+        self._stats_pending_index_ready = False
+        self._regrade_index_ready = False
+        self._memory_question_stats: dict[str, dict[str, Any]] = {}
+        self._memory_job_state: dict[str, dict[str, Any]] = {}
+        self._memory_regrade_results: dict[str, dict[str, Any]] = {}
+        self._journal_writes = False
+        self._pending_writes: deque[tuple[str, dict[str, Any]]] = deque(maxlen=settings.degraded_write_buffer_size)
+        self._pending_skill_updates: dict[tuple[str, str], SkillStateDelta] = {}
+        self._pending_aggregate_keys: set[str] = set()
 
-    def configure(self, db: AsyncIOMotorDatabase | None) -> None:
+    def configure(self, db: AsyncIOMotorDatabase | None, *, degraded: bool = False) -> None:
         self._db = db
+        self._journal_writes = db is None and degraded
+
+    @property
+    def is_degraded(self) -> bool:
+        return self._journal_writes
+
+    def memory_snapshot(self) -> dict[str, Any]:
+        return self._memory.snapshot()
+
+    def close_memory_store(self) -> None:
+        self._memory.close()
+
+    def pending_write_count(self) -> int:
+        return len(self._pending_writes) + len(self._pending_skill_updates) + len(self._pending_aggregate_keys)
+
+    async def replay_pending_writes(self) -> int:
+        if self._db is None or not self.pending_write_count():
+            return 0
+        db = self._require_db()
+        pending = list(self._pending_writes)
+        skill_updates = dict(self._pending_skill_updates)
+        skill_count = len(skill_updates)
+        aggregate_keys = set(self._pending_aggregate_keys)
+        self._pending_writes.clear()
+        self._pending_skill_updates.clear()
+        self._pending_aggregate_keys.clear()
+        try:
+            for collection in ("attempts", "agent_events", "transcript_turns"):
+                documents = [document for name, document in pending if name == collection]
+                if collection == "attempts":
+                    documents = [{**document, "stats_pending": True} for document in documents]
+                if not documents:
+                    continue
+                try:
+                    await db[collection].insert_many(documents, ordered=False)
+                except BulkWriteError as exc:
+                    duplicates = [error for error in exc.details.get("writeErrors", []) if error.get("code") == 11000]
+                    if len(duplicates) != len(exc.details.get("writeErrors", [])):
+                        raise
+            for (session_id, skill), delta in list(skill_updates.items()):
+                await db.session_skill_state.update_one(
+                    {"session_id": session_id, "skill": skill},
+                    delta.pipeline(),
+                    upsert=True,
+                )
+                del skill_updates[(session_id, skill)]
+            for session_id in aggregate_keys:
+                bucket = self._memory.peek(session_id)
+                session = bucket.session if bucket is not None else None
+                if session is None:
+                    continue
+                await db.sessions.update_one(
+                    {"_id": session_id},
+                    {
+                        "$set": {field: session[field] for field in AGGREGATE_FIELDS if field in session},
+                        "$max": {"version": int(session.get("version", 0))},
+                    },
+                    upsert=True,
+                )
+        except Exception:
+            self._pending_writes.extendleft(reversed(pending))
+            for key, delta in skill_updates.items():
+                later = self._pending_skill_updates.get(key)
+                self._pending_skill_updates[key] = delta.merge(later) if later is not None else delta
+            self._pending_aggregate_keys.update(aggregate_keys)
+            raise
+        replayed = len(pending) + skill_count + len(aggregate_keys)
+        logger.info("Replayed %d buffered writes to Mongo", replayed)
+        return replayed
 
     def _require_db(self) -> AsyncIOMotorDatabase:
         if self._db is None:
@@ -66,7 +183,8 @@ class StorageService:
 
     async def get_session(self, session_id: str) -> dict[str, Any] | None:
         if self._db is None:
-            return self._memory_sessions.get(session_id)
+            bucket = self._memory.get(session_id)
+            return bucket.session if bucket is not None else None
         db = self._require_db()
         return await db.sessions.find_one({"_id": session_id})
 
@@ -74,13 +192,13 @@ class StorageService:
         if question_id is None:
             return None
         if self._db is None:
-            return next((q for q in SAMPLE_QUESTIONS if q["_id"] == question_id), None)
+            return next((q for q in self._memory_questions if q["_id"] == question_id), None)
         db = self._require_db()
         return await db.questions.find_one({"_id": question_id})
 
     async def list_questions_by_skill(self, skill: str, difficulty: int, limit: int = 50) -> list[dict[str, Any]]:
         if self._db is None:
-            matched = [q for q in SAMPLE_QUESTIONS if q["skill"] == skill and q["difficulty"] == difficulty]
+            matched = [q for q in self._memory_questions if q["skill"] == skill and q["difficulty"] == difficulty]
             return matched[:limit]
         db = self._require_db()
         cursor = (
@@ -90,14 +208,93 @@ class StorageService:
         )
         return await cursor.to_list(length=limit)
 
+    async def list_all_questions(self) -> list[dict[str, Any]]:
+        if self._db is None:
+            return [dict(question) for question in self._memory_questions]
+        db = self._require_db()
+        projection = {"skill": 1, "difficulty": 1, "type": 1, "prompt": 1, "weight": 1, "meta": 1}
+        return await db.questions.find({}, projection).to_list(length=None)
+
     async def get_any_question(self) -> dict[str, Any] | None:
         if self._db is None:
-            return SAMPLE_QUESTIONS[0] if SAMPLE_QUESTIONS else None
+            return self._memory_questions[0] if self._memory_questions else None
         db = self._require_db()
         cursor = db.questions.find().sort([("difficulty", 1), ("_id", 1)]).limit(1)
         results = await cursor.to_list(length=1)
         return results[0] if results else None
 
+    async def bulk_upsert_questions(self, documents: list[dict[str, Any]]) -> dict[str, Any]:
+        now = datetime.utcnow()
+        if self._db is None:
+            inserted = updated = 0
+            conflicting_ids: list[str] = []
+            positions = {q.get("content_hash"): index for index, q in enumerate(self._memory_questions)}
+            owners = {q["_id"]: q.get("content_hash") for q in self._memory_questions}
+            for document in documents:
+                index = positions.get(document["content_hash"])
+                if index is None:
+                    if document["_id"] in owners:
+                        conflicting_ids.append(document["_id"])
+                        continue
+                    self._memory_questions.append({**document, "created_at": now, "updated_at": now})
+                    positions[document["content_hash"]] = len(self._memory_questions) - 1
+                    owners[document["_id"]] = document["content_hash"]
+                    inserted += 1
+                else:
+                    existing = self._memory_questions[index]
+                    existing.update({key: value for key, value in document.items() if key != "_id"})
+                    existing["updated_at"] = now
+                    updated += 1
+            return {
+                "inserted": inserted,
+                "updated": updated,
+                "conflicts": len(conflicting_ids),
+                "failed": 0,
+                "conflicting_ids": conflicting_ids,
+            }
+
+        db = self._require_db()
+        if not self._question_indexes_ready:
+            await db.questions.create_index("content_hash", unique=True, sparse=True)
+            self._question_indexes_ready = True
+        operations = [
+            UpdateOne(
+                {"content_hash": document["content_hash"]},
+                {
+                    "$set": {**{key: value for key, value in document.items() if key != "_id"}, "updated_at": now},
+                    "$setOnInsert": {"_id": document["_id"], "created_at": now},
+                },
+                upsert=True,
+            )
+            for document in documents
+        ]
+        if not operations:
+            return {"inserted": 0, "updated": 0, "conflicts": 0, "failed": 0, "conflicting_ids": []}
+        try:
+            result = await db.questions.bulk_write(operations, ordered=False)
+        except BulkWriteError as exc:
+            details = exc.details
+            write_errors = details.get("writeErrors", [])
+            # Duplicate keys mean another question (an earlier batch, a hand-inserted row or a concurrent
+            # import) already owns the _id or content hash; everything else is a genuine write failure.
+            conflicting_ids = [
+                documents[error["index"]]["_id"] for error in write_errors if error.get("code") == 11000
+            ]
+            return {
+                "inserted": int(details.get("nUpserted", 0)),
+                "updated": int(details.get("nModified", 0)),
+                "conflicts": len(conflicting_ids),
+                "failed": len(write_errors) - len(conflicting_ids),
+                "conflicting_ids": conflicting_ids,
+            }
+        return {
+            "inserted": result.upserted_count,
+            "updated": result.modified_count,
+            "conflicts": 0,
+            "failed": 0,
+            "conflicting_ids": [],
+        }
+
     async def upsert_session_skill_state(
         self,
         *,
@@ -107,7 +304,7 @@ class StorageService:
     ) -> dict[str, Any]:
         now = datetime.utcnow()
         if self._db is None:
-            session_state = self._memory_skill_state[session_id]
+            session_state = self._memory.bucket(session_id).skill_state
             entry = session_state.get(skill)
             if entry is None:
                 entry = {
@@ -125,6 +322,13 @@ class StorageService:
                 }
             )
             session_state[skill] = entry
+            self._memory.updated(session_id)
+            if self._journal_writes:
+                self._pending_skill_updates[(session_id, skill)] = SkillStateDelta(
+                    created_at=entry["created_at"],
+                    fields={key: entry[key] for key in ("rating", "target_difficulty", "asked_count", "correct_count", "updated_at")},
+                    reset=True,
+                )
             return entry
 
         db = self._require_db()
@@ -152,12 +356,100 @@ class StorageService:
         return existing
 
     async def list_skill_states(self, session_id: str) -> list[dict[str, Any]]:
+        if settings.session_aggregate_layout:
+            return skill_states_from_session(session_id, await self.get_session(session_id))
         if self._db is None:
-            return list(self._memory_skill_state.get(session_id, {}).values())
+            bucket = self._memory.get(session_id)
+            return list(bucket.skill_state.values()) if bucket is not None else []
         db = self._require_db()
         cursor = db.session_skill_state.find({"session_id": session_id}).sort("skill", 1)
         return await cursor.to_list(length=None)
 
+    async def apply_session_outcome(
+        self,
+        session_id: str,
+        *,
+        skill: str | None,
+        score: float,
+        difficulty: int,
+        hints_used: int,
+        time_ms: int,
+    ) -> dict[str, Any]:
+        if skill is not None and not AGGREGATE_SKILL_PATTERN.match(skill):
+            raise ValueError(f"Invalid skill name: {skill!r}")
+        now = datetime.utcnow()
+        delta = self._rating_delta(score, hints_used=hints_used)
+        correct = int(score >= 0.8)
+        if self._db is None:
+            session = self._memory.session(session_id, now)
+            aggregates = session.setdefault("aggregates", {})
+            aggregates["attempts"] = int(aggregates.get("attempts", 0)) + 1
+            aggregates["score_sum"] = float(aggregates.get("score_sum", 0.0)) + score
+            aggregates["time_spent_ms"] = int(aggregates.get("time_spent_ms", 0)) + time_ms
+            aggregates["hints_used"] = int(aggregates.get("hints_used", 0)) + hints_used
+            if skill is not None:
+                entry = session.setdefault("skills", {}).setdefault(skill, {})
+                entry["rating"] = max(0, min(100, int(entry.get("rating", 50)) + delta))
+                entry["asked_count"] = int(entry.get("asked_count", 0)) + 1
+                entry["correct_count"] = int(entry.get("correct_count", 0)) + correct
+                entry["target_difficulty"] = difficulty
+            session["version"] = int(session.get("version", 0)) + 1
+            session["updated_at"] = now
+            self._memory.updated(session_id)
+            if self._journal_writes:
+                self._pending_aggregate_keys.add(session_id)
+            return session
+
+        fields: dict[str, Any] = {
+            "aggregates.attempts": _increment("aggregates.attempts", 1),
+            "aggregates.score_sum": _increment("aggregates.score_sum", score),
+            "aggregates.time_spent_ms": _increment("aggregates.time_spent_ms", time_ms),
+            "aggregates.hints_used": _increment("aggregates.hints_used", hints_used),
+            "version": _increment("version", 1),
+            "created_at": {"$ifNull": ["$created_at", now]},
+            "updated_at": now,
+        }
+        if skill is not None:
+            prefix = f"skills.{skill}"
+            rating = {"$add": [{"$ifNull": [f"${prefix}.rating", 50]}, delta]}
+            fields.update(
+                {
+                    f"{prefix}.rating": {"$min": [100, {"$max": [0, rating]}]},
+                    f"{prefix}.asked_count": _increment(f"{prefix}.asked_count", 1),
+                    f"{prefix}.correct_count": _increment(f"{prefix}.correct_count", correct),
+                    f"{prefix}.target_difficulty": difficulty,
+                }
+            )
+        db = self._require_db()
+        return await db.sessions.find_one_and_update(
+            {"_id": session_id},
+            [{"$set": fields}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def save_session_plan(self, session_id: str, plan: dict[str, Any]) -> int:
+        now = datetime.utcnow()
+        if self._db is None:
+            session = self._memory.session(session_id, now)
+            session["plan"] = plan
+            session["version"] = int(session.get("version", 0)) + 1
+            session["updated_at"] = now
+            self._memory.updated(session_id)
+            if self._journal_writes:
+                self._pending_aggregate_keys.add(session_id)
+            return session["version"]
+
+        db = self._require_db()
+        session = await db.sessions.find_one_and_update(
+            {"_id": session_id},
+            {"$set": {"plan": plan, "updated_at": now}, "$inc": {"version": 1}, "$setOnInsert": {"created_at": now}},
+            projection={"version": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return int(session["version"])
+
     async def record_attempt(
         self,
         *,
@@ -185,9 +477,11 @@ class StorageService:
             "created_at": now,
         }
         if self._db is None:
-            self._memory_attempts[session_id].append(doc)
-            doc["_id"] = f"mem_attempt_{len(self._memory_attempts[session_id])}"
-            return doc
+            doc["_id"] = ObjectId()
+            self._memory.append(session_id, "attempts", [doc])
+            if self._journal_writes:
+                self._pending_writes.append(("attempts", doc))
+            return {**doc, "_id": str(doc["_id"])}
 
         db = self._require_db()
         result = await db.attempts.insert_one(doc)
@@ -196,7 +490,9 @@ class StorageService:
 
     async def list_recent_attempts(self, session_id: str, limit: int = 5) -> list[dict[str, Any]]:
         if self._db is None:
-            return list(reversed(self._memory_attempts.get(session_id, [])))[:limit]
+            bucket = self._memory.get(session_id)
+            attempts = bucket.attempts[-limit:] if bucket is not None and limit > 0 else []
+            return [record.to_document() for record in reversed(attempts)]
         db = self._require_db()
         cursor = (
             db.attempts.find({"session_id": session_id})
@@ -228,15 +524,48 @@ class StorageService:
             "created_at": now,
         }
         if self._db is None:
-            self._memory_agent_events[session_id].append(doc)
-            doc["_id"] = f"mem_event_{len(self._memory_agent_events[session_id])}"
-            return doc
+            doc["_id"] = ObjectId()
+            self._memory.append(session_id, "agent_events", [doc])
+            if self._journal_writes:
+                self._pending_writes.append(("agent_events", doc))
+            return {**doc, "_id": str(doc["_id"])}
 
         db = self._require_db()
         result = await db.agent_events.insert_one(doc)
         doc["_id"] = str(result.inserted_id)
         return doc
 
+    async def archive_transcript_turns(self, session_id: str, turns: list[dict[str, Any]], *, first_seq: int) -> None:
+        if not turns:
+            return
+        now = datetime.utcnow()
+        documents = [
+            {
+                "_id": f"{session_id}:{first_seq + offset}",
+                "session_id": session_id,
+                "seq": first_seq + offset,
+                "turn": turn,
+                "archived_at": now,
+            }
+            for offset, turn in enumerate(turns)
+        ]
+        if self._db is None:
+            bucket = self._memory.get(session_id)
+            if bucket is not None:
+                archived = {record.get("_id") for record in bucket.transcript_turns}
+                documents = [document for document in documents if document["_id"] not in archived]
+            self._memory.append(session_id, "transcript_turns", documents)
+            if self._journal_writes:
+                self._pending_writes.extend(("transcript_turns", document) for document in documents)
+            return
+
+        db = self._require_db()
+        try:
+            await db.transcript_turns.insert_many(documents, ordered=False)
+        except BulkWriteError as exc:
+            if any(error.get("code") != 11000 for error in exc.details.get("writeErrors", [])):
+                raise
+
     async def update_skill_metrics(
         self,
         *,
@@ -248,7 +577,7 @@ class StorageService:
     ) -> dict[str, Any]:
         now = datetime.utcnow()
         if self._db is None:
-            session_state = self._memory_skill_state[session_id]
+            session_state = self._memory.bucket(session_id).skill_state
             entry = session_state.get(skill)
             if entry is None:
                 entry = {
@@ -260,13 +589,23 @@ class StorageService:
                     "correct_count": 0,
                     "created_at": now,
                 }
+            delta = self._rating_delta(score, hints_used=hints_used)
             entry["asked_count"] = int(entry.get("asked_count", 0)) + 1
-            entry["rating"] = max(0, min(100, int(entry.get("rating", 50)) + self._rating_delta(score, hints_used=hints_used)))
+            entry["rating"] = max(0, min(100, int(entry.get("rating", 50)) + delta))
             entry["target_difficulty"] = difficulty
             if score >= 0.8:
                 entry["correct_count"] = int(entry.get("correct_count", 0)) + 1
             entry["updated_at"] = now
             session_state[skill] = entry
+            self._memory.updated(session_id)
+            if self._journal_writes:
+                increment = SkillStateDelta(
+                    created_at=entry["created_at"],
+                    fields={"target_difficulty": difficulty, "updated_at": now},
+                    increments={"asked_count": 1, "correct_count": int(score >= 0.8), "rating": delta},
+                )
+                earlier = self._pending_skill_updates.get((session_id, skill))
+                self._pending_skill_updates[(session_id, skill)] = earlier.merge(increment) if earlier else increment
             return entry
 
         db = self._require_db()
@@ -297,11 +636,380 @@ class StorageService:
 
     async def list_attempts(self, session_id: str) -> list[dict[str, Any]]:
         if self._db is None:
-            return list(reversed(self._memory_attempts.get(session_id, [])))
+            bucket = self._memory.get(session_id)
+            return list(reversed(bucket.documents("attempts"))) if bucket is not None else []
         db = self._require_db()
         cursor = db.attempts.find({"session_id": session_id}).sort("created_at", -1)
         return await cursor.to_list(length=None)
 
+    async def mark_session_archivable(self, session_id: str, *, eligible_at: datetime) -> None:
+        now = datetime.utcnow()
+        if self._db is None:
+            session = self._memory.session(session_id, now)
+            session.pop("archive", None)
+            session.update({"archive_eligible_at": eligible_at, "updated_at": now})
+            self._memory.updated(session_id)
+            return
+        db = self._require_db()
+        await db.sessions.update_one(
+            {"_id": session_id},
+            {
+                "$set": {"archive_eligible_at": eligible_at, "updated_at": now},
+                "$unset": {"archive": ""},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
+
+    async def list_archivable_sessions(self, *, before: datetime, limit: int) -> list[str]:
+        if self._db is None:
+            return list(islice(self._memory.archivable(before), limit))
+        db = self._require_db()
+        cursor = db.sessions.find({"archive_eligible_at": {"$lte": before}}, {"_id": 1}).limit(limit)
+        return [str(document["_id"]) async for document in cursor]
+
+    async def mark_session_archived(self, session_id: str, archive: dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        if self._db is None:
+            session = self._memory.session(session_id, now)
+            session.pop("archive_eligible_at", None)
+            session.update({"archive": archive, "updated_at": now})
+            self._memory.updated(session_id)
+            return
+        db = self._require_db()
+        await db.sessions.update_one(
+            {"_id": session_id},
+            {"$set": {"archive": archive, "updated_at": now}, "$unset": {"archive_eligible_at": ""}},
+            upsert=True,
+        )
+
+    async def collect_session_documents(self, session_id: str) -> dict[str, list[dict[str, Any]]]:
+        if self._db is None:
+            bucket = self._memory.peek(session_id) or SessionBucket()
+            return {
+                "attempts": bucket.documents("attempts"),
+                "agent_events": bucket.documents("agent_events"),
+                "session_skill_state": [dict(doc) for doc in bucket.skill_state.values()],
+                "transcript_turns": bucket.documents("transcript_turns"),
+            }
+        db = self._require_db()
+        return {
+            collection: await db[collection].find({"session_id": session_id}).sort("_id", 1).to_list(length=None)
+            for collection in SESSION_COLLECTIONS
+        }
+
+    async def delete_session_documents(
+        self,
+        session_id: str,
+        documents: dict[str, list[dict[str, Any]]] | None = None,
+    ) -> int:
+        if self._db is None:
+            bucket = self._memory.discard(session_id)
+            if bucket is None:
+                return 0
+            remaining = SessionBucket()
+            remaining.session = bucket.session
+            deleted = 0
+            for collection in RECORD_COLLECTIONS:
+                ids = None if documents is None else {doc.get("_id") for doc in documents.get(collection, [])}
+                for record in bucket.records(collection):
+                    if ids is None or record.get("_id") in ids:
+                        deleted += 1
+                    else:
+                        remaining.records(collection).append(record)
+            collected = None if documents is None else {
+                str(doc.get("skill")): doc.get("updated_at") for doc in documents.get("session_skill_state", [])
+            }
+            for skill, entry in bucket.skill_state.items():
+                if collected is None or (skill in collected and entry.get("updated_at") == collected[skill]):
+                    deleted += 1
+                else:
+                    remaining.skill_state[skill] = entry
+            if remaining.session is not None or remaining.skill_state or any(
+                remaining.records(collection) for collection in RECORD_COLLECTIONS
+            ):
+                self._memory.replace(session_id, remaining)
+            return deleted
+        db = self._require_db()
+        deleted = 0
+        for collection in SESSION_COLLECTIONS:
+            query: dict[str, Any] = {"session_id": session_id}
+            if documents is not None:
+                collected = documents.get(collection, [])
+                if not collected:
+                    continue
+                if collection == "session_skill_state":
+                    query["$or"] = [{"_id": doc["_id"], "updated_at": doc.get("updated_at")} for doc in collected]
+                else:
+                    query["_id"] = {"$in": [doc["_id"] for doc in collected]}
+            result = await db[collection].delete_many(query)
+            deleted += result.deleted_count
+        return deleted
+
+    async def restore_session_documents(self, session_id: str, documents: dict[str, list[dict[str, Any]]]) -> None:
+        if self._db is None:
+            restored = self._memory.discard(session_id) or SessionBucket()
+            for doc in documents.get("session_skill_state", []):
+                restored.skill_state.setdefault(str(doc.get("skill")), doc)
+            for collection in RECORD_COLLECTIONS:
+                records = restored.records(collection)
+                existing = {record.get("_id") for record in records}
+                records[:0] = [
+                    RECORD_TYPES[collection](doc) for doc in documents.get(collection, []) if doc.get("_id") not in existing
+                ]
+            self._memory.replace(session_id, restored)
+            return
+        db = self._require_db()
+        for collection in SESSION_COLLECTIONS:
+            operations = [
+                UpdateOne({"_id": doc["_id"]}, {"$setOnInsert": doc}, upsert=True)
+                for doc in documents.get(collection, [])
+            ]
+            if operations:
+                await db[collection].bulk_write(operations, ordered=False)
+
+    async def iter_archived_sessions(
+        self,
+        *,
+        after_id: str | None = None,
+        archived_since: datetime | None = None,
+        created_before: datetime | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        if self._db is None:
+            sessions = sorted(
+                (bucket.session for _, bucket in self._memory.iter_buckets() if bucket.session and bucket.session.get("archive")),
+                key=lambda session: str(session["_id"]),
+            )
+            for session in sessions:
+                if after_id is not None and str(session["_id"]) <= after_id:
+                    continue
+                if archived_since is not None and session["archive"]["archived_at"] < archived_since:
+                    continue
+                if created_before is not None and session.get("created_at") and session["created_at"] >= created_before:
+                    continue
+                yield {"_id": session["_id"], "archive": session["archive"]}
+            return
+        db = self._require_db()
+        query: dict[str, Any] = {"archive": {"$exists": True}}
+        if after_id is not None:
+            query["_id"] = {"$gt": after_id}
+        if archived_since is not None:
+            query["archive.archived_at"] = {"$gte": archived_since}
+        if created_before is not None:
+            query["created_at"] = {"$lt": created_before}
+        async for session in db.sessions.find(query, {"archive": 1}).sort("_id", 1):
+            yield session
+
+    async def acquire_job_lease(self, name: str, *, owner: str, ttl_seconds: float) -> dict[str, Any] | None:
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=ttl_seconds)
+        if self._db is None:
+            state = self._memory_job_state.setdefault(name, {"_id": name})
+            state.update({"owner": owner, "lease_until": lease_until})
+            return dict(state)
+
+        db = self._require_db()
+        try:
+            return await db.job_state.find_one_and_update(
+                {
+                    "_id": name,
+                    "$or": [{"lease_until": {"$lt": now}}, {"owner": owner}, {"lease_until": {"$exists": False}}],
+                },
+                {"$set": {"owner": owner, "lease_until": lease_until}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return None
+
+    async def get_job_state(self, name: str) -> dict[str, Any] | None:
+        if self._db is None:
+            state = self._memory_job_state.get(name)
+            return dict(state) if state is not None else None
+        db = self._require_db()
+        return await db.job_state.find_one({"_id": name})
+
+    async def update_job_state(self, name: str, fields: dict[str, Any]) -> None:
+        if self._db is None:
+            self._memory_job_state.setdefault(name, {"_id": name}).update(fields)
+            return
+        db = self._require_db()
+        await db.job_state.update_one({"_id": name}, {"$set": fields}, upsert=True)
+
+    async def save_regrade_results(self, documents: list[dict[str, Any]]) -> None:
+        if self._db is None:
+            self._memory_regrade_results.update((str(document["_id"]), document) for document in documents)
+            return
+        if not documents:
+            return
+        db = self._require_db()
+        operations = [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents]
+        await db.regrade_results.bulk_write(operations, ordered=False)
+
+    async def list_regrade_results(self, run_id: str) -> list[dict[str, Any]]:
+        if self._db is None:
+            results = [result for result in self._memory_regrade_results.values() if result["run_id"] == run_id]
+            return sorted(results, key=lambda result: str(result["attempt_id"]))
+        db = self._require_db()
+        if not self._regrade_index_ready:
+            await db.regrade_results.create_index([("run_id", 1), ("attempt_id", 1)])
+            self._regrade_index_ready = True
+        cursor = db.regrade_results.find({"run_id": run_id}).sort("attempt_id", 1)
+        return await cursor.to_list(length=None)
+
+    async def apply_question_stats(
+        self,
+        increments: dict[str, dict[str, float]],
+        *,
+        through_id: str | None = None,
+    ) -> None:
+        now = datetime.utcnow()
+        if self._db is None:
+            for question_id, fields in increments.items():
+                entry = self._memory_question_stats.setdefault(question_id, {"_id": question_id})
+                if through_id is not None and entry.get("last_attempt_id", "") >= through_id:
+                    continue
+                if through_id is not None:
+                    entry["last_attempt_id"] = through_id
+                for key, value in fields.items():
+                    if "." in key:
+                        parent, child = key.split(".", 1)
+                        bucket = entry.setdefault(parent, {})
+                        bucket[child] = bucket.get(child, 0) + value
+                    else:
+                        entry[key] = entry.get(key, 0) + value
+                entry["updated_at"] = now
+            return
+
+        if not increments:
+            return
+        db = self._require_db()
+        if through_id is None:
+            operations = [
+                UpdateOne({"_id": question_id}, {"$inc": fields, "$set": {"updated_at": now}}, upsert=True)
+                for question_id, fields in increments.items()
+            ]
+            await db.question_stats.bulk_write(operations, ordered=False)
+            return
+        operations = [
+            UpdateOne({"_id": question_id}, {"$setOnInsert": {"last_attempt_id": ""}}, upsert=True)
+            for question_id in increments
+        ]
+        operations.extend(
+            UpdateOne(
+                {"_id": question_id, "last_attempt_id": {"$lt": through_id}},
+                {"$inc": fields, "$set": {"updated_at": now, "last_attempt_id": through_id}},
+            )
+            for question_id, fields in increments.items()
+        )
+        await db.question_stats.bulk_write(operations, ordered=True)
+
+    async def iter_stats_pending_attempts(
+        self,
+        *,
+        through_id: str,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        if self._db is None:
+            return
+        db = self._require_db()
+        if not self._stats_pending_index_ready:
+            await db.attempts.create_index("stats_pending", sparse=True)
+            self._stats_pending_index_ready = True
+        query = {"stats_pending": True, "_id": {"$lte": self._coerce_object_id(through_id)}}
+        cursor = db.attempts.find(query).sort("_id", 1).batch_size(batch_size)
+        batch: list[dict[str, Any]] = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def clear_stats_pending(self, attempt_ids: list[Any]) -> None:
+        if self._db is None or not attempt_ids:
+            return
+        db = self._require_db()
+        await db.attempts.update_many({"_id": {"$in": attempt_ids}}, {"$unset": {"stats_pending": ""}})
+
+    async def list_question_stats(self) -> list[dict[str, Any]]:
+        if self._db is None:
+            return [dict(entry) for entry in self._memory_question_stats.values()]
+        db = self._require_db()
+        return await db.question_stats.find().to_list(length=None)
+
+    async def iter_export_batches(
+        self,
+        collection: str,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        after_id: str | None = None,
+        before_id: str | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        time_field = EXPORT_TIME_FIELDS[collection]
+        if self._db is None:
+            documents = sorted(
+                self._memory_export_documents(collection),
+                key=lambda doc: (doc.get(time_field) or datetime.min, str(doc.get("_id", ""))),
+            )
+            if after_id is not None:
+                ids = [str(doc.get("_id")) for doc in documents]
+                documents = documents[ids.index(after_id) + 1:] if after_id in ids else documents
+            documents = [
+                doc
+                for doc in documents
+                if (start is None or (doc.get(time_field) and doc[time_field] >= start))
+                and (end is None or (doc.get(time_field) and doc[time_field] < end))
+                and (before_id is None or str(doc.get("_id")) < before_id)
+            ]
+            for offset in range(0, len(documents), batch_size):
+                yield documents[offset:offset + batch_size]
+            return
+
+        db = self._require_db()
+        query: dict[str, Any] = {}
+        time_range: dict[str, Any] = {}
+        if start is not None:
+            time_range["$gte"] = start
+        if end is not None:
+            time_range["$lt"] = end
+        if time_range:
+            query[time_field] = time_range
+        id_range: dict[str, Any] = {}
+        if after_id is not None:
+            id_range["$gt"] = self._coerce_object_id(after_id)
+        if before_id is not None:
+            id_range["$lt"] = self._coerce_object_id(before_id)
+        if id_range:
+            query["_id"] = id_range
+        cursor = db[collection].find(query).sort("_id", 1).batch_size(batch_size)
+        batch: list[dict[str, Any]] = []
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _memory_export_documents(self, collection: str) -> list[dict[str, Any]]:
+        if collection in RECORD_COLLECTIONS:
+            return [doc for _, bucket in self._memory.iter_buckets() for doc in bucket.documents(collection)]
+        return [
+            {"_id": f"{session_id}:{skill}", **entry}
+            for session_id, bucket in self._memory.iter_buckets()
+            for skill, entry in bucket.skill_state.items()
+        ]
+
+    def _coerce_object_id(self, value: str) -> ObjectId | str:
+        try:
+            return ObjectId(value)
+        except (InvalidId, TypeError):
+            return value
+
     def _rating_delta(self, score: float, *, hints_used: int) -> int:
         if score >= 0.8:
             delta = 8
@@ -314,4 +1022,60 @@ class StorageService:
         return delta
 
 
+def skill_states_from_session(session_id: str, session: dict[str, Any] | None) -> list[dict[str, Any]]:
+    skills = (session or {}).get("skills") or {}
+    return [
+        {
+            "session_id": session_id,
+            "skill": skill,
+            "rating": entry.get("rating", 50),
+            "target_difficulty": entry.get("target_difficulty", 2),
+            "asked_count": entry.get("asked_count", 0),
+            "correct_count": entry.get("correct_count", 0),
+        }
+        for skill, entry in sorted(skills.items())
+    ]
+
+
+@dataclass
+class SkillStateDelta:
+    """Skill-state changes made while Mongo was down, replayed as increments over whatever Mongo holds."""
+
+    created_at: datetime
+    fields: dict[str, Any] = field(default_factory=dict)
+    increments: dict[str, float] = field(default_factory=dict)
+    reset: bool = False
+
+    def merge(self, later: "SkillStateDelta") -> "SkillStateDelta":
+        if later.reset:
+            return later
+        increments = dict(self.increments)
+        for name, amount in later.increments.items():
+            increments[name] = increments.get(name, 0) + amount
+        return SkillStateDelta(self.created_at, {**self.fields, **later.fields}, increments, self.reset)
+
+    def pipeline(self) -> list[dict[str, Any]]:
+        stages: list[dict[str, Any]] = [
+            {
+                "$set": {
+                    **{name: {"$literal": value} for name, value in self.fields.items()},
+                    "created_at": {"$ifNull": ["$created_at", self.created_at]},
+                }
+            }
+        ]
+        increments = {
+            name: _increment(name, amount) for name, amount in self.increments.items() if name != "rating"
+        }
+        if "rating" in self.increments:
+            rating = {"$add": [{"$ifNull": ["$rating", 50]}, self.increments["rating"]]}
+            increments["rating"] = {"$min": [100, {"$max": [0, rating]}]}
+        if increments:
+            stages.append({"$set": increments})
+        return stages
+
+
+def _increment(path: str, amount: float) -> dict[str, Any]:
+    return {"$add": [{"$ifNull": [f"${path}", 0]}, amount]}
+
+
 storage_service = StorageService()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INHERITED_ATTRIBUTES = ("session_id", "question_id")
+F = TypeVar("F", bound=Callable[..., Any])
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    end_time: float | None = None
+    status: str = "ok"
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_time or time.time()) - self.start_time) * 1000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "duration_ms": round(self.duration_ms, 3)}
+
+
+class ConsoleSpanExporter:
+    """Writes finished spans to stderr, one JSON object per line."""
+
+    def export(self, spans: list[Span]) -> None:
+        for span in spans:
+            sys.stderr.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class FileSpanExporter:
+    """Appends finished spans to a JSON-lines file."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with self._path.open("a", encoding="utf-8") as handle:
+                handle.write(lines)
+
+
+class Tracer:
+    """Creates parent/child spans through a context variable and hands finished spans to a pluggable exporter."""
+
+    def __init__(self) -> None:
+        self._current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+        self._exporter: Any | None = None
+        self._finished: deque[Span] = deque(maxlen=settings.tracing_buffer_size)
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._exporter is not None
+
+    def set_exporter(self, exporter: Any | None) -> None:
+        self._exporter = exporter
+
+    def current_span(self) -> Span | None:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | None]:
+        if self._exporter is None:
+            yield None
+            return
+        parent = self._current.get()
+        inherited = {key: parent.attributes[key] for key in INHERITED_ATTRIBUTES if parent and key in parent.attributes}
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes={**inherited, **{key: value for key, value in attributes.items() if value is not None}},
+        )
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.status = "error"
+            span.error = repr(exc)
+            raise
+        finally:
+            span.end_time = time.time()
+            self._current.reset(token)
+            self._finished.append(span)
+
+    def start(self) -> None:
+        if self._exporter is not None and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if self._exporter is None or not self._finished:
+            return
+        spans = list(self._finished)
+        self._finished.clear()
+        try:
+            await asyncio.to_thread(self._exporter.export, spans)
+        except Exception:
+            logger.exception("Failed to export %d spans", len(spans))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.tracing_flush_seconds)
+            await self.flush()
+
+
+def traced(name: str) -> Callable[[F], F]:
+    def decorator(func: F) -> F:
+        extract = _attribute_extractor(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not tracer.enabled:
+                return await func(*args, **kwargs)
+            with tracer.span(name, **extract(args, kwargs)):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def traced_methods(prefix: str) -> Callable[[type[T]], type[T]]:
+    def decorator(cls: type[T]) -> type[T]:
+        for attribute, value in list(vars(cls).items()):
+            if attribute.startswith("_") or not inspect.iscoroutinefunction(value):
+                continue
+            setattr(cls, attribute, traced(f"{prefix}.{attribute}")(value))
+        return cls
+
+    return decorator
+
+
+def _attribute_extractor(func: Callable[..., Any]) -> Callable[[tuple[Any, ...], dict[str, Any]], dict[str, Any]]:
+    positions = {
+        name: index
+        for index, name in enumerate(inspect.signature(func).parameters)
+        if name in INHERITED_ATTRIBUTES
+    }
+
+    def extract(args: tuple[Any, ...], kwargs: dict[str, Any]) -> dict[str, Any]:
+        attributes: dict[str, Any] = {}
+        for name, index in positions.items():
+            value = kwargs.get(name, args[index] if index < len(args) else None)
+            if value is not None:
+                attributes[name] = value
+        for value in (*args, *kwargs.values()):
+            if isinstance(value, dict):
+                question = value.get("question")
+                if isinstance(question, dict) and question.get("_id") is not None:
+                    attributes.setdefault("question_id", str(question["_id"]))
+                for key in INHERITED_ATTRIBUTES:
+                    if value.get(key) is not None:
+                        attributes.setdefault(key, value[key])
+        return attributes
+
+    return extract
+
+
+def build_span_exporter() -> Any | None:
+    if settings.tracing_exporter == "console":
+        return ConsoleSpanExporter()
+    if settings.tracing_exporter == "file":
+        return FileSpanExporter(Path(settings.tracing_file_path))
+    return None
+
+
+tracer = Tracer()
+tracer.set_exporter(build_span_exporter())
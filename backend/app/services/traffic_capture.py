@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, get_args
+
+import orjson
+
+from app.core.config import settings
+from app.models.tools import LogInteractionPayload
+from app.services.session_archive import session_archive_service
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_FORMAT_VERSION = 1
+LOG_EVENT_TYPES = frozenset(get_args(LogInteractionPayload.model_fields["event_type"].annotation))
+SERVER_EVENT_STEPS = {"plan_decision"}
+
+
+@dataclass
+class CapturedCall:
+    session_id: str
+    tool: str
+    path: str
+    started_at: float
+    request: dict[str, Any]
+    status: int | None = None
+    response: Any = None
+    latency_ms: float | None = None
+    transport: str = "http"
+    source: str = "recorder"
+    version: int = CAPTURE_FORMAT_VERSION
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CapturedCall":
+        fields = cls.__dataclass_fields__
+        return cls(**{key: value for key, value in data.items() if key in fields})
+
+
+def read_capture(paths: Iterable[Path]) -> dict[str, list[CapturedCall]]:
+    sessions: dict[str, list[CapturedCall]] = defaultdict(list)
+    for path in paths:
+        with path.open("rb") as handle:
+            for line in handle:
+                if line.strip():
+                    call = CapturedCall.from_dict(orjson.loads(line))
+                    sessions[call.session_id].append(call)
+    for calls in sessions.values():
+        calls.sort(key=lambda call: call.started_at)
+    return dict(sessions)
+
+
+def write_capture(path: Path, calls: Iterable[CapturedCall]) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with path.open("ab") as handle:
+        for call in calls:
+            handle.write(orjson.dumps(asdict(call), default=str) + b"\n")
+            written += 1
+    return written
+
+
+class TrafficCaptureService:
+    """Samples whole sessions of tool calls into JSON-lines capture files for later replay."""
+
+    def __init__(self) -> None:
+        self._buffer: deque[CapturedCall] = deque(maxlen=settings.traffic_capture_buffer_size)
+        self._lock = threading.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.traffic_capture_rate > 0
+
+    def sampled(self, session_id: Any) -> bool:
+        if not self.enabled or not isinstance(session_id, str) or not session_id:
+            return False
+        bucket = int.from_bytes(hashlib.blake2b(session_id.encode(), digest_size=8).digest(), "big")
+        return bucket / 2**64 < settings.traffic_capture_rate
+
+    def record(
+        self,
+        *,
+        tool: str,
+        path: str,
+        request: dict[str, Any],
+        started_at: float,
+        status: int | None,
+        response: Any,
+        transport: str,
+    ) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(
+            CapturedCall(
+                session_id=request["session_id"],
+                tool=tool,
+                path=path,
+                started_at=started_at,
+                request=request,
+                status=status,
+                response=response,
+                latency_ms=round((time.time() - started_at) * 1000, 3),
+                transport=transport,
+            )
+        )
+
+    def start(self) -> None:
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        calls = list(self._buffer)
+        self._buffer.clear()
+        path = Path(settings.traffic_capture_dir) / f"capture-{datetime.utcnow():%Y%m%d}.jsonl"
+        try:
+            await asyncio.to_thread(self._write, path, calls)
+        except Exception:
+            logger.exception("Failed to write %d captured tool calls", len(calls))
+
+    async def derive_from_storage(
+        self,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        batch_size: int = 1000,
+    ) -> dict[str, list[CapturedCall]]:
+        timeline: dict[str, list[tuple[datetime, int, CapturedCall]]] = defaultdict(list)
+
+        def add_events(events: list[dict[str, Any]]) -> None:
+            for event in events:
+                call = _call_from_event(event)
+                if call is not None:
+                    timeline[call.session_id].append((event["created_at"], 0, call))
+
+        def add_attempts(attempts: list[dict[str, Any]]) -> None:
+            for attempt in attempts:
+                for order, call in enumerate(_calls_from_attempt(attempt), start=1):
+                    timeline[call.session_id].append((attempt["created_at"], order, call))
+
+        async for batch in storage_service.iter_export_batches(
+            "agent_events", start=start, end=end, batch_size=batch_size
+        ):
+            add_events(batch)
+        async for batch in storage_service.iter_export_batches(
+            "attempts", start=start, end=end, batch_size=batch_size
+        ):
+            add_attempts(batch)
+        async for _, events in session_archive_service.iter_archived_documents("agent_events", start=start, end=end):
+            add_events(events)
+        async for _, attempts in session_archive_service.iter_archived_documents("attempts", start=start, end=end):
+            add_attempts(attempts)
+
+        sessions: dict[str, list[CapturedCall]] = {}
+        for session_id, entries in timeline.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1]))
+            has_decisions = any(call.tool == "get_next_question" for _, _, call in entries)
+            calls: list[CapturedCall] = []
+            for created_at, order, call in entries:
+                if not has_decisions and order == 1:
+                    calls.append(_derived_call(session_id, "get_next_question", {"session_id": session_id}, created_at))
+                calls.append(call)
+            sessions[session_id] = calls
+        return sessions
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"enabled": self.enabled, "buffered": len(self._buffer), "dropped": self.dropped}
+
+    def _write(self, path: Path, calls: list[CapturedCall]) -> None:
+        with self._lock:
+            if self._enforce_retention(path.parent) <= 0:
+                self.dropped += len(calls)
+                return
+            write_capture(path, calls)
+
+    def _enforce_retention(self, directory: Path) -> int:
+        cutoff = time.time() - settings.traffic_capture_max_age_seconds
+        kept: list[tuple[Path, int]] = []
+        for path in sorted(directory.glob("capture-*.jsonl")):
+            stat = path.stat()
+            if stat.st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+            else:
+                kept.append((path, stat.st_size))
+        total = sum(size for _, size in kept)
+        while len(kept) > 1 and total > settings.traffic_capture_max_bytes:
+            path, size = kept.pop(0)
+            path.unlink(missing_ok=True)
+            total -= size
+        return settings.traffic_capture_max_bytes - total
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.traffic_capture_flush_seconds)
+            await self.flush()
+
+
+def _derived_call(session_id: str, tool: str, request: dict[str, Any], created_at: datetime) -> CapturedCall:
+    return CapturedCall(
+        session_id=session_id,
+        tool=tool,
+        path=f"/tools/{tool}",
+        started_at=created_at.timestamp(),
+        request=request,
+        source="storage",
+    )
+
+
+def _call_from_event(event: dict[str, Any]) -> CapturedCall | None:
+    session_id = event.get("session_id")
+    created_at = event.get("created_at")
+    if not isinstance(session_id, str) or not isinstance(created_at, datetime):
+        return None
+    step_id = str(event.get("step_id", ""))
+    if step_id in SERVER_EVENT_STEPS:
+        return _derived_call(session_id, "get_next_question", {"session_id": session_id}, created_at)
+    plan = str(event.get("plan", ""))
+    event_type = next((name for name in (step_id, plan) if name in LOG_EVENT_TYPES), "plan")
+    payload = {key: event.get(key) for key in ("step_id", "plan", "action", "outcome", "flagged")}
+    if isinstance(event.get("metrics"), dict):
+        payload["metrics"] = event["metrics"]
+    request = {
+        "session_id": session_id,
+        "event_type": event_type,
+        "payload": payload,
+        "created_at": created_at.isoformat(),
+    }
+    return _derived_call(session_id, "log_interaction", request, created_at)
+
+
+def _calls_from_attempt(attempt: dict[str, Any]) -> list[CapturedCall]:
+    session_id = attempt.get("session_id")
+    created_at = attempt.get("created_at")
+    question_id = attempt.get("question_id")
+    if not isinstance(session_id, str) or not isinstance(created_at, datetime) or not isinstance(question_id, str):
+        return []
+    grade = {
+        "session_id": session_id,
+        "question_id": question_id,
+        "answer_payload": attempt.get("answer_payload") or {},
+    }
+    outcome = {
+        "session_id": session_id,
+        "question_id": question_id,
+        "score": attempt.get("score", 0.0),
+        "time_ms": attempt.get("time_ms", 0),
+        "difficulty": attempt.get("difficulty", 2),
+        "meta": {
+            "hints_used": attempt.get("hints_used", 0),
+            "objective": attempt.get("objective"),
+            "feedback": attempt.get("feedback"),
+            "answer_payload": grade["answer_payload"],
+        },
+    }
+    return [
+        _derived_call(session_id, "grade_answer", grade, created_at),
+        _derived_call(session_id, "record_outcome", outcome, created_at),
+    ]
+
+
+traffic_capture = TrafficCaptureService()
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.services.admission import admission_controller
+from app.services.graders.dispatcher import grading_dispatcher
+from app.services.memory import memory_service
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ("utterance", "text", "answer", "question_prompt", "prompt", "feedback", "summary", "message")
+EVENT_LABELS = {"question_asked": "Q", "answer_received": "A", "feedback_shared": "F"}
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+WHITESPACE = re.compile(r"\s+")
+ABSTRACT_INSTRUCTIONS = (
+    "You maintain a running summary of an Excel skills interview. Merge the previous summary with the new "
+    "transcript highlights into one neutral paragraph covering the questions asked, how the candidate answered "
+    "and any feedback given. Do not invent details."
+)
+
+
+def empty_summary() -> dict[str, Any]:
+    return {"turns_compacted": 0, "event_counts": {}, "highlights": [], "text": "", "abstract": None, "updated_at": None}
+
+
+def fold_turns(summary: dict[str, Any] | None, turns: list[dict[str, Any]]) -> dict[str, Any]:
+    folded = {**empty_summary(), **(summary or {})}
+    counts = Counter(folded["event_counts"])
+    highlights = list(folded["highlights"])
+    for turn in turns:
+        event_type = str(turn.get("event_type", "event"))
+        counts[event_type] += 1
+        highlight = _highlight(event_type, turn.get("payload") or {})
+        if highlight:
+            highlights.append(highlight)
+    highlights = highlights[-settings.transcript_summary_highlights:]
+    folded.update(
+        turns_compacted=int(folded["turns_compacted"]) + len(turns),
+        event_counts=dict(counts),
+        highlights=highlights,
+        text=" ".join(highlights),
+        updated_at=datetime.utcnow().isoformat(),
+    )
+    return folded
+
+
+def _highlight(event_type: str, payload: dict[str, Any]) -> str:
+    text = next((str(payload[key]) for key in TEXT_FIELDS if payload.get(key)), "")
+    text = SENTENCE_END.split(WHITESPACE.sub(" ", text).strip(), maxsplit=1)[0]
+    limit = settings.transcript_highlight_chars
+    if len(text) > limit:
+        text = text[: limit - 1].rstrip() + "…"
+    details = [
+        f"{key}={payload[key]}"
+        for key in ("question_id", "score")
+        if isinstance(payload.get(key), (str, int, float)) and not isinstance(payload.get(key), bool)
+    ]
+    if not text and not details:
+        return ""
+    label = EVENT_LABELS.get(event_type, event_type)
+    suffix = f"({', '.join(details)})" if details else ""
+    return f"{label}: " + " ".join(filter(None, [text, suffix]))
+
+
+class TranscriptCompactor:
+    """Folds transcript turns that fall out of the hot window into a bounded rolling summary and cold storage."""
+
+    def __init__(self) -> None:
+        self._running: set[str] = set()
+        self._abstract_tasks: dict[str, asyncio.Task[None]] = {}
+        self.compactions = 0
+        self.turns_compacted = 0
+
+    def needs_compaction(self, length: int) -> bool:
+        return length >= settings.transcript_window_turns + settings.transcript_compact_batch
+
+    async def compact(self, session_id: str) -> dict[str, Any] | None:
+        if session_id in self._running:
+            return None
+        self._running.add(session_id)
+        try:
+            return await self._compact(session_id)
+        except RedisError:
+            logger.warning("Transcript compaction for session %s deferred; Redis unavailable", session_id)
+            return None
+        finally:
+            self._running.discard(session_id)
+
+    async def fold_evicted(
+        self,
+        session_id: str,
+        summary: dict[str, Any] | None,
+        turns: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        first_seq = int((summary or {}).get("turns_compacted", 0))
+        await storage_service.archive_transcript_turns(session_id, turns, first_seq=first_seq)
+        folded = fold_turns(summary, turns)
+        self._record(len(turns))
+        return folded
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"compactions": self.compactions, "turns_compacted": self.turns_compacted, "running": len(self._running)}
+
+    def schedule_abstract(self, session_id: str, summary: dict[str, Any]) -> None:
+        if not settings.transcript_llm_summary or not settings.openai_api_key or admission_controller.overloaded():
+            return
+        previous = self._abstract_tasks.get(session_id)
+        if previous is not None and not previous.done():
+            return
+        task = asyncio.create_task(self._abstract(session_id, summary))
+        self._abstract_tasks[session_id] = task
+        task.add_done_callback(lambda _: self._abstract_tasks.pop(session_id, None))
+
+    async def _compact(self, session_id: str) -> dict[str, Any] | None:
+        count = await memory_service.transcript_length(session_id) - settings.transcript_window_turns
+        if count <= 0:
+            return None
+        head = await memory_service.read_transcript_head(session_id, count)
+        if not head:
+            return None
+        summary = await memory_service.get_transcript_summary(session_id)
+        first_seq = int((summary or {}).get("turns_compacted", 0))
+        await storage_service.archive_transcript_turns(session_id, head, first_seq=first_seq)
+        folded = fold_turns(summary, head)
+        if not await memory_service.commit_compaction(session_id, len(head), folded, compacted=first_seq):
+            return None
+        self._record(len(head))
+        self.schedule_abstract(session_id, folded)
+        return folded
+
+    async def _abstract(self, session_id: str, summary: dict[str, Any]) -> None:
+        prompt = "\n".join(filter(None, [
+            f"Previous summary:\n{summary['abstract']}" if summary.get("abstract") else "",
+            "New highlights:\n" + "\n".join(summary["highlights"]),
+        ]))
+        try:
+            abstract = await grading_dispatcher.summarize(ABSTRACT_INSTRUCTIONS, prompt)
+            if not abstract:
+                return
+            current = await memory_service.get_transcript_summary(session_id)
+            if current is None or current.get("turns_compacted") != summary["turns_compacted"]:
+                return
+            current["abstract"] = abstract[: settings.transcript_abstract_chars]
+            await memory_service.set_transcript_summary(session_id, current)
+        except Exception:
+            logger.exception("Transcript abstract failed for session %s", session_id)
+
+    def _record(self, turns: int) -> None:
+        self.compactions += 1
+        self.turns_compacted += turns
+
+
+transcript_compactor = TranscriptCompactor()
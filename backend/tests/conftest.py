@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+VAR_DIR = Path(tempfile.mkdtemp(prefix="interview-tests-"))
+
+os.environ.update(
+    {
+        "MONGO_DSN": "",
+        "REDIS_URL": "",
+        "OPENAI_API_KEY": "",
+        "ARCHIVE_BACKEND": "local",
+        "ARCHIVE_LOCAL_DIR": str(VAR_DIR / "archive"),
+        "MEMORY_STORE_SPILL_DIR": str(VAR_DIR / "spill"),
+        "ANSWER_UPLOAD_DIR": str(VAR_DIR / "answers"),
+        "TRAFFIC_CAPTURE_DIR": str(VAR_DIR / "captures"),
+        "PROFILER_OUTPUT_DIR": str(VAR_DIR / "profiles"),
+        "TRACING_EXPORTER": "none",
+    }
+)
+
+
+@pytest.fixture
+def client() -> Iterator[TestClient]:
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejectedError
+
+
+async def _hold(
+    controller: AdmissionController, session_id: str | None, release: asyncio.Event, *, opening: bool = False
+) -> None:
+    async with controller.admit(session_id, opening=opening):
+        await release.wait()
+
+
+def test_admits_up_to_capacity_then_queues() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(max_concurrency=2, max_per_session=2, max_queue=4, queue_timeout_seconds=1)
+        release = asyncio.Event()
+        holders = [asyncio.create_task(_hold(controller, f"s{i}", release)) for i in range(3)]
+        await asyncio.sleep(0)
+        snapshot = controller.snapshot()
+        assert snapshot["in_flight"] == 2 and snapshot["queue_depth"] == 1
+        assert controller.overloaded()
+        release.set()
+        await asyncio.gather(*holders)
+        snapshot = controller.snapshot()
+        assert snapshot["in_flight"] == 0 and snapshot["admitted"] == 3 and snapshot["queued"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_per_session_limit() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(max_concurrency=10, max_per_session=1, queue_timeout_seconds=0.05)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, "s1", release))
+        await asyncio.sleep(0)
+        async with controller.admit("s2"):
+            pass
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            async with controller.admit("s1"):
+                pass
+        assert rejected.value.reason == "deadline" and rejected.value.status_code == 503
+        release.set()
+        await holder
+        assert controller.snapshot()["shed_deadline"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_sheds_new_sessions() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout_seconds=1)
+        release = asyncio.Event()
+        holders = [asyncio.create_task(_hold(controller, f"s{i}", release)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            async with controller.admit("s9"):
+                pass
+        assert rejected.value.reason == "queue_full"
+        release.set()
+        await asyncio.gather(*holders)
+
+    asyncio.run(scenario())
+
+
+def test_active_sessions_evict_queued_new_ones() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout_seconds=1)
+        async with controller.admit("active"):
+            pass
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, "busy", release))
+        await asyncio.sleep(0)
+        newcomer = asyncio.create_task(_hold(controller, "newcomer", release, opening=True))
+        await asyncio.sleep(0)
+        returning = asyncio.create_task(_hold(controller, "active", release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejectedError) as rejected:
+            await newcomer
+        assert rejected.value.reason == "evicted"
+        release.set()
+        await asyncio.gather(holder, returning)
+        assert controller.snapshot()["shed_evicted"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot() -> None:
+    async def scenario() -> None:
+        controller = AdmissionController(max_concurrency=1, queue_timeout_seconds=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, "s1", release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(controller, "s2", release))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await holder
+        snapshot = controller.snapshot()
+        assert snapshot["in_flight"] == 0 and snapshot["queue_depth"] == 0
+
+    asyncio.run(scenario())
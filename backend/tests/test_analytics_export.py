@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.analytics_export import analytics_export_service
+from app.services.session_archive import session_archive_service
+from app.services.storage import storage_service
+
+
+async def _record(session_id: str, count: int) -> None:
+    for index in range(count):
+        await storage_service.record_attempt(
+            session_id=session_id,
+            question_id=f"q{index}",
+            score=0.5,
+            objective=None,
+            time_ms=1000,
+            difficulty=2,
+            answer_payload={"text": f"answer {index}"},
+            feedback=None,
+            hints_used=0,
+        )
+
+
+def _seed(tag: str) -> datetime:
+    started = datetime.utcnow() - timedelta(seconds=1)
+
+    async def scenario() -> None:
+        await _record(f"exp-{tag}-hot", 3)
+        for suffix in ("a", "b"):
+            await _record(f"exp-{tag}-{suffix}", 2)
+            assert await session_archive_service.archive_session(f"exp-{tag}-{suffix}")
+
+    asyncio.run(scenario())
+    return started
+
+
+def _sessions(body: str, tag: str) -> list[str]:
+    rows = [json.loads(line) for line in body.splitlines() if line]
+    return [row["session_id"] for row in rows if row["session_id"].startswith(f"exp-{tag}-")]
+
+
+def test_http_export_resumes_across_live_and_archived_rows(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    headers = {"Authorization": "Bearer secret"}
+    tag = uuid.uuid4().hex[:8]
+    start = _seed(tag).isoformat()
+
+    response = client.get("/api/v1/admin/exports/attempts", params={"start": start}, headers=headers)
+    assert response.status_code == 200
+    assert _sessions(response.text, tag) == [f"exp-{tag}-hot"] * 3 + [f"exp-{tag}-a"] * 2 + [f"exp-{tag}-b"] * 2
+
+    live = [json.loads(line) for line in response.text.splitlines() if f"exp-{tag}-hot" in line]
+    params = {"start": start, "after": live[1]["_id"]}
+    resumed = client.get("/api/v1/admin/exports/attempts", params=params, headers=headers)
+    assert _sessions(resumed.text, tag) == [f"exp-{tag}-hot"] + [f"exp-{tag}-a"] * 2 + [f"exp-{tag}-b"] * 2
+
+    params = {"start": start, "archived_after": f"exp-{tag}-a"}
+    resumed = client.get("/api/v1/admin/exports/attempts", params=params, headers=headers)
+    assert _sessions(resumed.text, tag) == [f"exp-{tag}-b"] * 2
+
+
+def test_directory_export_resumes_from_its_checkpoint(tmp_path: Path) -> None:
+    tag = uuid.uuid4().hex[:8]
+    start = _seed(tag)
+
+    checkpoint = asyncio.run(analytics_export_service.export_to_directory("attempts", tmp_path, start=start))
+    assert checkpoint.live_complete and checkpoint.archived_after is not None
+    exported = (tmp_path / "attempts.ndjson").read_text()
+    assert len(_sessions(exported, tag)) == 7
+
+    again = asyncio.run(analytics_export_service.export_to_directory("attempts", tmp_path, start=start))
+    assert again.rows == checkpoint.rows
+    assert (tmp_path / "attempts.ndjson").read_text() == exported
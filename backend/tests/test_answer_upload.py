@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import Workbook
+
+from app.core.config import settings
+from app.services.storage import storage_service
+
+
+def _workbook(formulas: dict[str, str], extra_sheet: dict[str, str] | None = None) -> bytes:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Answer"
+    sheet["A1"], sheet["A2"] = 2, 3
+    for cell, formula in formulas.items():
+        sheet[cell] = formula
+    if extra_sheet:
+        scratch = workbook.create_sheet("Scratch")
+        for cell, formula in extra_sheet.items():
+            scratch[cell] = formula
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _formula_question() -> str:
+    question_id = f"q_upload_{uuid.uuid4().hex[:8]}"
+    document = {
+        "_id": question_id,
+        "content_hash": question_id,
+        "skill": "excel_formulas",
+        "difficulty": 2,
+        "type": "formula",
+        "prompt": "Total the values in A1:A2 in cell B1.",
+        "meta": {"workbook": {"A1": 2, "A2": 3}, "answer_cells": ["B1"], "reference": {"B1": "=SUM(A1:A2)"}},
+    }
+    asyncio.run(storage_service.bulk_upsert_questions([document]))
+    return question_id
+
+
+def _upload(client: TestClient, question_id: str, content: bytes, filename: str = "answer.xlsx"):
+    return client.post(
+        "/api/v1/tools/grade_answer/upload",
+        data={"session_id": f"upload-{uuid.uuid4().hex}", "question_id": question_id},
+        files={"file": (filename, content, "application/octet-stream")},
+    )
+
+
+def test_uploaded_workbook_is_graded_cell_by_cell(client: TestClient) -> None:
+    question_id = _formula_question()
+    response = _upload(client, question_id, _workbook({"B1": "=SUM(A1:A2)"}, extra_sheet={"B1": "=A1"}))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["score"] == 100.0
+    assert body["objective"]["checks"] == [
+        {"cell": "B1", "submitted": "=SUM(A1:A2)", "expected": 5, "actual": 5, "error": None, "passed": True}
+    ]
+
+
+def test_wrong_uploaded_formula_fails_the_check(client: TestClient) -> None:
+    question_id = _formula_question()
+    response = _upload(client, question_id, _workbook({"B1": "=A1*A2"}))
+
+    assert response.status_code == 200
+    check = response.json()["objective"]["checks"][0]
+    assert check["actual"] == 6 and not check["passed"]
+
+
+def test_upload_limits(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    question_id = _formula_question()
+    unsupported = _upload(client, question_id, b"a,b\n1,2\n", filename="answer.csv")
+    assert unsupported.status_code == 400 and "Unsupported workbook type" in unsupported.json()["detail"]
+
+    missing = client.post("/api/v1/tools/grade_answer/upload", data={"question_id": question_id})
+    assert missing.status_code == 400
+
+    monkeypatch.setattr(settings, "answer_upload_max_bytes", 1024)
+    too_large = _upload(client, question_id, _workbook({"B1": "=SUM(A1:A2)"}))
+    assert too_large.status_code == 413
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+
+from app.cli.replay_traffic import build_model_stub
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, STREAM, CircuitBreaker
+from app.services.graders.dispatcher import GradingDispatcher
+
+
+def _tripped_breaker(**kwargs: float) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", max_timeout=20, min_requests=4, cooldown_seconds=0.01, **kwargs)
+    for _ in range(4):
+        breaker.record_failure(0.01)
+    assert breaker.state == OPEN
+    time.sleep(0.02)
+    assert breaker.state == HALF_OPEN
+    return breaker
+
+
+def test_dispatcher_opens_breaker_after_repeated_failures() -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(503, json={"error": "unavailable"})
+
+    breaker = CircuitBreaker("test", max_timeout=20)
+
+    async def scenario() -> dict:
+        dispatcher = GradingDispatcher(
+            base_url="http://stub",
+            transport=httpx.MockTransport(handler),
+            breaker=breaker,
+            max_concurrency=1,
+            max_retries=0,
+        )
+        try:
+            for index in range(15):
+                assert await dispatcher.grade(f"Question {index}", "Answer") is None
+            return dispatcher.snapshot()
+        finally:
+            await dispatcher.close()
+
+    snapshot = asyncio.run(scenario())
+    assert calls == 10
+    assert breaker.state == OPEN
+    assert snapshot["short_circuited"] == 5 and snapshot["fallbacks"] == 15
+
+
+def test_half_open_probes_close_or_reopen() -> None:
+    breaker = _tripped_breaker(half_open_probes=2)
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success(0.01)
+    breaker.record_success(0.01)
+    assert breaker.state == CLOSED
+
+    breaker = _tripped_breaker(half_open_probes=2)
+    assert breaker.allow()
+    breaker.record_failure(0.01)
+    assert breaker.state == OPEN
+
+
+def test_timeouts_adapt_per_kind() -> None:
+    breaker = CircuitBreaker("test", max_timeout=20, min_timeout=0.5, min_requests=5, timeout_multiplier=2)
+    assert breaker.timeout() == 20
+    for _ in range(10):
+        breaker.record_success(0.4)
+        breaker.record_success(3.0, kind=STREAM)
+    assert breaker.timeout() == 0.8
+    assert breaker.timeout(STREAM) == 6.0
+
+
+def test_cancelled_half_open_stream_releases_its_probe() -> None:
+    breaker = _tripped_breaker(half_open_probes=1)
+
+    async def scenario() -> None:
+        slow = GradingDispatcher(
+            base_url="http://stub",
+            transport=httpx.ASGITransport(app=build_model_stub(latency_ms=10_000)),
+            breaker=breaker,
+        )
+
+        async def consume() -> None:
+            async for _ in slow.stream("Explain XLOOKUP", "It searches a range"):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        assert breaker.snapshot()["probes_in_flight"] == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await slow.close()
+        assert breaker.snapshot()["probes_in_flight"] == 0
+
+        dispatcher = GradingDispatcher(
+            base_url="http://stub",
+            transport=httpx.ASGITransport(app=build_model_stub()),
+            breaker=breaker,
+        )
+        try:
+            events = [event async for event in dispatcher.stream("Explain XLOOKUP", "It searches a range")]
+        finally:
+            await dispatcher.close()
+        assert events[-1][0] == "completed" and events[-1][1] is not None
+
+    asyncio.run(scenario())
+    assert breaker.state == CLOSED
+
+
+def test_abandoned_half_open_stream_releases_its_probe() -> None:
+    breaker = _tripped_breaker(half_open_probes=1)
+
+    async def scenario() -> None:
+        dispatcher = GradingDispatcher(
+            base_url="http://stub",
+            transport=httpx.ASGITransport(app=build_model_stub()),
+            breaker=breaker,
+        )
+        try:
+            events = dispatcher.stream("Explain XLOOKUP", "It searches a range")
+            kind, _ = await anext(events)
+            assert kind == "delta"
+            await events.aclose()
+        finally:
+            await dispatcher.close()
+
+    asyncio.run(scenario())
+    assert breaker.snapshot()["probes_in_flight"] == 0
+    assert breaker.allow()
+
+
+def test_stale_probes_expire_after_the_timeout() -> None:
+    breaker = CircuitBreaker("test", max_timeout=0.01, min_requests=4, cooldown_seconds=0.01, half_open_probes=1)
+    for _ in range(4):
+        breaker.record_failure(0.01)
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+import httpx
+import pytest
+
+from app.cli.replay_traffic import build_model_stub
+from app.core.config import settings
+from app.services.circuit_breaker import CLOSED, CircuitBreaker
+from app.services.graders.dispatcher import GradingDispatcher
+
+
+def _stub_dispatcher(breaker: CircuitBreaker | None = None, **kwargs: Any) -> GradingDispatcher:
+    transport = httpx.ASGITransport(app=build_model_stub())
+    breaker = breaker or CircuitBreaker("test", max_timeout=20)
+    return GradingDispatcher(base_url="http://stub", transport=transport, breaker=breaker, **kwargs)
+
+
+def test_grade_against_stub() -> None:
+    breaker = CircuitBreaker("test", max_timeout=20)
+
+    async def scenario() -> dict:
+        dispatcher = _stub_dispatcher(breaker)
+        try:
+            return await dispatcher.grade("Explain XLOOKUP", "It searches a range and returns a match")
+        finally:
+            await dispatcher.close()
+
+    result = asyncio.run(scenario())
+    assert result is not None
+    assert 40 <= result["score"] <= 100
+    assert result["summary"].startswith("Deterministic stub grade")
+    assert breaker.state == CLOSED and breaker.snapshot()["requests"] == 1
+
+
+def test_concurrent_grades_are_micro_batched() -> None:
+    async def scenario() -> tuple[list, dict]:
+        dispatcher = _stub_dispatcher(max_concurrency=1, batch_size=4, batch_threshold=2)
+        try:
+            results = await asyncio.gather(*(dispatcher.grade(f"Question {i}", f"Answer {i}") for i in range(8)))
+            return results, dispatcher.snapshot()
+        finally:
+            await dispatcher.close()
+
+    results, snapshot = asyncio.run(scenario())
+    assert all(result is not None and "score" in result for result in results)
+    assert snapshot["batches"] >= 1
+    assert snapshot["requests"] < 8
+    assert snapshot["completed"] == 8
+
+
+def test_stream_yields_deltas_then_grade() -> None:
+    breaker = CircuitBreaker("test", max_timeout=20)
+
+    async def scenario() -> list:
+        dispatcher = _stub_dispatcher(breaker)
+        try:
+            return [event async for event in dispatcher.stream("Explain INDEX/MATCH", "Use MATCH for the row")]
+        finally:
+            await dispatcher.close()
+
+    events = asyncio.run(scenario())
+    deltas = [payload for kind, payload in events if kind == "delta"]
+    kind, parsed = events[-1]
+    assert kind == "completed"
+    assert parsed is not None and json.loads("".join(deltas)) == parsed
+    assert breaker.snapshot()["stream_headers_latency_ms"]["p50"] > 0
+
+
+def test_retries_retryable_status(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "grading_backoff_max_seconds", 0.0)
+    calls = []
+    stub = build_model_stub()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after-ms": "1"})
+        return await httpx.ASGITransport(app=stub).handle_async_request(request)
+
+    async def scenario() -> tuple[dict | None, dict]:
+        dispatcher = GradingDispatcher(
+            base_url="http://stub",
+            transport=httpx.MockTransport(handler),
+            breaker=CircuitBreaker("test", max_timeout=20),
+        )
+        try:
+            return await dispatcher.grade("q", "a"), dispatcher.snapshot()
+        finally:
+            await dispatcher.close()
+
+    result, snapshot = asyncio.run(scenario())
+    assert result is not None
+    assert len(calls) == 2
+    assert snapshot["retries"] == 1 and snapshot["rate_limited"] == 1
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cli.replay_traffic import build_model_stub
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.graders.dispatcher import GradingDispatcher
+from app.services.graders.rubric import PartialGradeParser, RubricGrader
+
+ANSWER = "I would use XLOOKUP with IFERROR to return a default and wrap it in a pivot table"
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_partial_parser_surfaces_summary_and_strengths() -> None:
+    parser = PartialGradeParser()
+    document = json.dumps(
+        {"score": 70, "summary": 'Clear "lookup" answer', "strengths": ["Uses XLOOKUP", "Handles errors"]}
+    )
+    events = [event for offset in range(0, len(document), 7) for event in parser.feed(document[offset:offset + 7])]
+    summary = "".join(data["delta"] for kind, data in events if kind == "summary")
+    strengths = [data["text"] for kind, data in events if kind == "strength"]
+    assert summary == json.loads(document)["summary"]
+    assert strengths == ["Uses XLOOKUP", "Handles errors"]
+
+
+def test_stream_endpoint_sends_the_final_grade(client: TestClient) -> None:
+    payload = {"session_id": "stream-1", "question_id": "q_tech_1", "answer_payload": {"text": ANSWER}}
+    response = client.post("/api/v1/tools/grade_answer/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    kind, grade = events[-1]
+    assert kind == "grade"
+    assert 0 <= grade["score"] <= 100 and "auto_feedback" in grade
+
+
+def test_rubric_stream_forwards_partial_feedback_from_the_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+
+    async def scenario() -> list[tuple[str, dict]]:
+        dispatcher = GradingDispatcher(
+            base_url="http://stub",
+            transport=httpx.ASGITransport(app=build_model_stub()),
+            breaker=CircuitBreaker("test", max_timeout=20),
+        )
+        grader = RubricGrader(dispatcher)
+        payload = {"question_prompt": "How do you look up a price?", "answer_payload": {"text": ANSWER}}
+        try:
+            return [event async for event in grader.stream(payload)]
+        finally:
+            await dispatcher.close()
+
+    events = asyncio.run(scenario())
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "grade" and "summary" in kinds and "strength" in kinds
+    grade = events[-1][1]
+    summary = "".join(data["delta"] for kind, data in events if kind == "summary")
+    assert grade["notes"] == summary
+    assert 40 <= grade["score"] <= 100
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.idempotency import IdempotencyConflictError, IdempotencyService, request_fingerprint
+from app.services.storage import storage_service
+
+
+def _outcome(session_id: str, score: float) -> dict:
+    return {
+        "session_id": session_id,
+        "question_id": "q_intro_1",
+        "score": score,
+        "time_ms": 1000,
+        "difficulty": 1,
+        "meta": {"skill": "excel_formulas"},
+    }
+
+
+def test_retried_outcome_is_replayed_once(client: TestClient) -> None:
+    session_id = f"idem-{uuid.uuid4().hex}"
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    first = client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, 0.9), headers=headers)
+    retry = client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, 0.9), headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers.get("Idempotent-Replayed") == "true" and "Idempotent-Replayed" not in first.headers
+    assert len(asyncio.run(storage_service.list_attempts(session_id))) == 1
+
+
+def test_reused_key_with_a_different_body_conflicts(client: TestClient) -> None:
+    session_id = f"idem-{uuid.uuid4().hex}"
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, 0.9), headers=headers)
+    conflict = client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, 0.2), headers=headers)
+
+    assert conflict.status_code == 422
+    assert "different request" in conflict.json()["detail"]
+    assert len(asyncio.run(storage_service.list_attempts(session_id))) == 1
+
+
+def test_concurrent_duplicates_share_one_computation() -> None:
+    service = IdempotencyService()
+    calls = 0
+
+    async def compute() -> dict:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"status": 200, "body": {"ok": True}}
+
+    async def scenario() -> list[tuple[dict, bool]]:
+        fingerprint = request_fingerprint({"session_id": "s1"})
+        return await asyncio.gather(*(service.run("tool", "key-1", fingerprint, compute) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert calls == 1
+    assert [replayed for _, replayed in results].count(False) == 1
+    assert all(record["body"] == {"ok": True} for record, _ in results)
+
+
+def test_server_errors_are_not_cached() -> None:
+    service = IdempotencyService()
+    statuses = iter([503, 200])
+
+    async def compute() -> dict:
+        return {"status": next(statuses), "body": {}}
+
+    async def scenario() -> list[int]:
+        fingerprint = request_fingerprint({"session_id": "s1"})
+        first, _ = await service.run("tool", "key-2", fingerprint, compute)
+        second, replayed = await service.run("tool", "key-2", fingerprint, compute)
+        assert not replayed
+        with pytest.raises(IdempotencyConflictError):
+            await service.run("tool", "key-2", request_fingerprint({"session_id": "s2"}), compute)
+        return [first["status"], second["status"]]
+
+    assert asyncio.run(scenario()) == [503, 200]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.graders.dispatcher import GradingDispatcher
+from app.services.graders.local import LocalGrader
+from app.services.graders.rubric import RubricGrader
+
+QUESTION = {
+    "id": "q-lookup",
+    "prompt": "How would you return the price for a product code from another sheet?",
+    "reference_answers": [
+        "Use XLOOKUP on the product code column and return the price column, wrapped in IFERROR for missing codes.",
+        "INDEX and MATCH with an exact match type also works and is not limited to the leftmost column.",
+    ],
+}
+
+
+def test_reference_answers_score_higher_than_weak_answers() -> None:
+    grader = LocalGrader()
+    strong = grader.assess(QUESTION, QUESTION["prompt"], QUESTION["reference_answers"][0])
+    partial = grader.assess(QUESTION, QUESTION["prompt"], "I would use VLOOKUP to find the price for the code")
+    off_topic = grader.assess(QUESTION, QUESTION["prompt"], "My favourite football team won yesterday")
+    empty = grader.assess(QUESTION, QUESTION["prompt"], "   ")
+
+    assert strong.score > partial.score > off_topic.score
+    assert strong.score >= 80 and strong.similarity > 0.9
+    assert "xlookup" in strong.matched_terms and "index" in partial.missing_terms
+    assert off_topic.off_topic and not partial.off_topic
+    assert empty.score == 0 and empty.word_count == 0
+
+
+def test_formatted_result_carries_feedback_and_confidence() -> None:
+    grader = LocalGrader()
+    result = asyncio.run(grader.grade({"question": QUESTION, "answer_payload": {"text": "Use VLOOKUP with IFERROR"}}))
+    assert 0 <= result["score"] <= 100
+    assert result["objective"]["strengths"] and result["objective"]["improvements"]
+    assert result["auto_feedback"].startswith("Thanks for the answer")
+    assert 0.3 <= result["confidence"] <= 0.6
+
+
+def test_assessment_is_fast_once_references_are_cached() -> None:
+    grader = LocalGrader()
+    answer = "I would use XLOOKUP with an exact match and IFERROR to default missing product codes to zero"
+    grader.assess(QUESTION, QUESTION["prompt"], answer)
+    started = time.perf_counter()
+    for _ in range(200):
+        grader.assess(QUESTION, QUESTION["prompt"], answer)
+    assert (time.perf_counter() - started) / 200 < 0.005
+
+
+def test_off_topic_answers_skip_the_model(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "local_grader_prefilter", True)
+    dispatcher = GradingDispatcher(base_url="http://unused", breaker=CircuitBreaker("test", max_timeout=20))
+    grader = RubricGrader(dispatcher)
+    payload = {"question": QUESTION, "answer_payload": {"text": "My favourite football team won yesterday"}}
+
+    result = asyncio.run(grader.grade(payload))
+    assert result["notes"] == "Local similarity score"
+    assert dispatcher.snapshot()["submitted"] == 0
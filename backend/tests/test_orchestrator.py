@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.orchestrator import orchestrator_service
+
+
+def _outcome(session_id: str) -> dict:
+    return {
+        "session_id": session_id,
+        "question_id": "q_intro_1",
+        "score": 0.8,
+        "time_ms": 1000,
+        "difficulty": 2,
+        "meta": {"skill": "excel_formulas"},
+    }
+
+
+def _record_and_wait_for_staging(client: TestClient, session_id: str) -> int:
+    before = orchestrator_service.snapshot()["staged_selections"]
+    assert client.post("/api/v1/tools/record_outcome", json=_outcome(session_id)).status_code == 200
+    for _ in range(100):
+        if orchestrator_service.snapshot()["staged_selections"] > before:
+            break
+        time.sleep(0.01)
+    assert orchestrator_service.snapshot()["staged_selections"] == before + 1
+    return before
+
+
+def test_get_next_question_takes_the_staged_selection(client: TestClient) -> None:
+    session_id = f"orch-{uuid.uuid4().hex}"
+    first = client.post("/api/v1/tools/get_next_question", json={"session_id": session_id}).json()
+    before = _record_and_wait_for_staging(client, session_id)
+    second = client.post("/api/v1/tools/get_next_question", json={"session_id": session_id}).json()
+    assert second["plan_index"] == first["plan_index"] + 1
+    assert second["question"]["id"] != first["question"]["id"]
+    assert orchestrator_service.snapshot()["staged_selections"] == before
+
+
+def test_finalize_discards_the_staged_selection(client: TestClient) -> None:
+    session_id = f"orch-{uuid.uuid4().hex}"
+    client.post("/api/v1/tools/get_next_question", json={"session_id": session_id})
+    before = _record_and_wait_for_staging(client, session_id)
+    client.post("/api/v1/tools/finalize_session", json={"session_id": session_id})
+    assert orchestrator_service.snapshot() == {"staged_selections": before, "staging_tasks": 0}
+
+
+def test_expired_selections_are_not_served(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "staged_selection_ttl_seconds", 0.0)
+    session_id = f"orch-{uuid.uuid4().hex}"
+
+    async def scenario() -> dict | None:
+        orchestrator_service.schedule_next_question(session_id)
+        context = await orchestrator_service.fetch_context(session_id)
+        await asyncio.sleep(0.01)
+        return await orchestrator_service.take_staged_selection(session_id, context)
+
+    assert asyncio.run(scenario()) is None
+    assert orchestrator_service.snapshot()["staged_selections"] == 0
+
+
+def test_staged_selections_are_capped(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "staged_selection_max_sessions", 3)
+
+    async def scenario() -> None:
+        for index in range(6):
+            orchestrator_service.schedule_next_question(f"orch-cap-{uuid.uuid4().hex}-{index}")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert orchestrator_service.snapshot()["staged_selections"] <= 3
+
+
+def test_apply_selection_copies_the_question_payload() -> None:
+    question = {"id": "q1", "prompt": "Explain XLOOKUP", "meta": {"hints": ["use match mode"]}}
+    context = orchestrator_service.apply_selection({"asked_questions": []}, {"question": question, "plan_index": 1})
+    context["current_question"]["meta"]["hints"].append("changed")
+    assert question["meta"]["hints"] == ["use match mode"]
+    assert context["asked_questions"] == ["q1"] and context["question_served_at"] is not None
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.orchestrator import orchestrator_service
+from app.services.plan_engine import PlanEngine, QuestionIndex
+
+
+def _bank() -> QuestionIndex:
+    questions = [
+        {"_id": f"{skill}-{difficulty}", "skill": skill, "difficulty": difficulty, "prompt": skill}
+        for skill in ("basics", "formulas", "wrapup")
+        for difficulty in (1, 2, 3)
+    ]
+    return QuestionIndex(questions)
+
+
+@pytest.fixture
+def plan_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "plan_opening_skill", "basics")
+    monkeypatch.setattr(settings, "plan_closing_skill", "wrapup")
+    monkeypatch.setattr(settings, "plan_max_questions", 4)
+    monkeypatch.setattr(settings, "plan_max_per_skill", 2)
+    monkeypatch.setattr(settings, "plan_time_budget_ms", 60 * 60 * 1000)
+
+
+def test_plan_opens_covers_and_closes(plan_settings: None) -> None:
+    engine, index = PlanEngine(), _bank()
+    context: dict = {"asked_questions": [], "skill_states": [], "time_spent_ms": 0}
+    reasons, skills = [], []
+    while True:
+        decision = engine.decide(index, context)
+        if decision.completed:
+            break
+        reasons.append(decision.reason)
+        skills.append(decision.skill)
+        context["asked_questions"].append(decision.question["id"])
+
+    assert reasons[0] == "opening" and reasons[-1] == "closing"
+    assert skills[:2] == ["basics", "formulas"] and skills.count("wrapup") == 1
+    assert decision.reason == "budget_exhausted" and len(context["asked_questions"]) == 4
+    assert len(set(context["asked_questions"])) == 4
+
+
+def test_ratings_steer_difficulty_and_budget_forces_the_closer(plan_settings: None) -> None:
+    engine, index = PlanEngine(), _bank()
+    strong = {"asked_questions": ["basics-1"], "skill_states": [{"skill": "formulas", "rating": 80}]}
+    weak = {"asked_questions": ["basics-1"], "skill_states": [{"skill": "formulas", "rating": 20}]}
+    assert engine.decide(index, strong).question["id"] == "formulas-3"
+    assert engine.decide(index, weak).question["id"] == "formulas-1"
+
+    late = {**strong, "time_spent_ms": settings.plan_time_budget_ms - 1000}
+    decision = engine.decide(index, late)
+    assert decision.reason == "closing" and decision.skill == "wrapup"
+    assert decision.scores and decision.elapsed_us >= 0
+
+
+@pytest.mark.parametrize("aggregate_layout", [False, True])
+def test_outcome_time_is_charged_once_per_served_question(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, aggregate_layout: bool
+) -> None:
+    monkeypatch.setattr(settings, "session_aggregate_layout", aggregate_layout)
+    session_id = f"plan-{uuid.uuid4().hex}"
+    question = client.post("/api/v1/tools/get_next_question", json={"session_id": session_id}).json()["question"]
+    context = asyncio.run(orchestrator_service.fetch_context(session_id))
+    context["question_served_at"] = time.time() - 60
+    outcome = {
+        "session_id": session_id,
+        "question_id": question["id"],
+        "score": 0.8,
+        "time_ms": 5 * 60 * 1000,
+        "difficulty": question["difficulty"],
+        "meta": {"skill": question["skill"]},
+    }
+
+    assert client.post("/api/v1/tools/record_outcome", json=outcome).status_code == 200
+    first = dict(asyncio.run(orchestrator_service.fetch_context(session_id)))
+    assert 60_000 <= first["time_spent_ms"] < 65_000
+
+    assert client.post("/api/v1/tools/record_outcome", json=outcome).status_code == 200
+    second = asyncio.run(orchestrator_service.fetch_context(session_id))
+    assert second["time_spent_ms"] - first["time_spent_ms"] < 5_000
+    assert second["context_version"] > first["context_version"]
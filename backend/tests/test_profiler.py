@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.profiler import AWAIT_LABEL, SamplingProfiler
+
+
+@pytest.fixture
+def profile_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "profiler_output_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiler_interval_ms", 1.0)
+    return tmp_path
+
+
+def _spin(seconds: float) -> int:
+    total = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+async def _busy_request() -> None:
+    _spin(0.05)
+    await asyncio.sleep(0.05)
+
+
+def _profile(profiler: SamplingProfiler, label: str) -> Path | None:
+    async def scenario() -> Path | None:
+        async def handler() -> Path | None:
+            session = profiler.begin(label)
+            await _busy_request()
+            return await profiler.finish(session)
+
+        return await asyncio.create_task(handler())
+
+    return asyncio.run(scenario())
+
+
+def test_profiles_fold_running_and_awaiting_stacks(profile_dir: Path) -> None:
+    path = _profile(SamplingProfiler(), "POST /api/v1/tools/grade_answer")
+    assert path is not None and path.parent == profile_dir
+    assert "POST_api_v1_tools_grade_answer" in path.name
+
+    stacks = [line.rsplit(" ", 1)[0].split(";") for line in path.read_text().splitlines()]
+    assert any(any("_spin" in frame for frame in stack) for stack in stacks)
+    assert any(stack[-1] == AWAIT_LABEL for stack in stacks)
+    assert all(stack[0].startswith("_profile.<locals>.scenario.<locals>.handler") for stack in stacks)
+
+
+def test_retention_keeps_the_newest_profiles(profile_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "profiler_max_files", 2)
+    profiler = SamplingProfiler()
+    for index in range(3):
+        _profile(profiler, f"request-{index}")
+        time.sleep(0.01)
+    names = [profile.name for profile in profiler.list_profiles()]
+    assert len(names) == 2 and "request-2" in names[0]
+
+
+def test_admin_routes_list_and_download_profiles(
+    client: TestClient, profile_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    headers = {"Authorization": "Bearer secret"}
+    path = _profile(SamplingProfiler(), "GET /download")
+
+    listed = client.get("/api/v1/admin/profiles", headers=headers).json()
+    assert [profile["name"] for profile in listed] == [path.name]
+    download = client.get(f"/api/v1/admin/profiles/{path.name}", headers=headers)
+    assert download.status_code == 200 and download.text == path.read_text()
+    assert client.get("/api/v1/admin/profiles/secrets.txt", headers=headers).status_code == 404
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import uuid
+
+from openpyxl import Workbook
+
+from app.services.question_import import question_import_service
+from app.services.storage import storage_service
+
+
+def _csv(rows: list[tuple[str, str, str]]) -> io.BytesIO:
+    lines = ["id,skill,type,prompt,difficulty,reference_answers"]
+    lines += [f"{question_id},excel_formulas,open,{prompt},{difficulty},Use XLOOKUP||Use INDEX MATCH"
+              for question_id, prompt, difficulty in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def test_csv_rows_are_validated_deduplicated_and_upserted() -> None:
+    tag = uuid.uuid4().hex[:8]
+    source = _csv(
+        [
+            (f"imp-{tag}-1", f"Explain lookups {tag}", "2"),
+            ("", f"Explain pivots {tag}", "3"),
+            ("", f"Explain pivots {tag}", "3"),
+            ("", f"Explain charts {tag}", "hard"),
+        ]
+    )
+    report = asyncio.run(question_import_service.import_stream(source, filename="bank.csv", batch_size=10))
+    assert (report.rows_read, report.inserted, report.duplicates, report.invalid) == (4, 2, 1, 1)
+    assert report.failed == 0 and report.errors[0].startswith("row 5:")
+
+    question = asyncio.run(storage_service.get_question(f"imp-{tag}-1"))
+    assert question is not None and question["reference_answers"] == ["Use XLOOKUP", "Use INDEX MATCH"]
+
+
+def test_repeated_ids_are_skipped_or_reported_as_conflicts() -> None:
+    tag = uuid.uuid4().hex[:8]
+    source = _csv(
+        [
+            (f"imp-{tag}-a", f"First prompt {tag}", "2"),
+            (f"imp-{tag}-a", f"Same id other prompt {tag}", "2"),
+            (f"imp-{tag}-b", f"Second prompt {tag}", "2"),
+            (f"imp-{tag}-a", f"Later batch other prompt {tag}", "2"),
+            ("q_intro_1", f"Clashes with a bundled question {tag}", "1"),
+            (f"imp-{tag}-b", f"Second prompt {tag}", "2"),
+        ]
+    )
+    report = asyncio.run(question_import_service.import_stream(source, filename="bank.csv", batch_size=3))
+    assert report.inserted == 2 and report.updated == 1
+    assert report.skipped == 1 and report.conflicts == 2 and report.failed == 0
+    assert any(f"imp-{tag}-a already belongs" in error for error in report.errors)
+
+
+def test_xlsx_rows_are_streamed_from_the_first_sheet() -> None:
+    tag = uuid.uuid4().hex[:8]
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["ID", "Skill", "Prompt", "Meta"])
+    sheet.append([f"imp-{tag}-x", "excel_charts", f"Build a combo chart {tag}", '{"hint": "secondary axis"}'])
+    sheet.append([None, None, None, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    report = asyncio.run(question_import_service.import_stream(buffer, filename="bank.xlsx"))
+    assert report.rows_read == 1 and report.inserted == 1
+    question = asyncio.run(storage_service.get_question(f"imp-{tag}-x"))
+    assert question is not None and question["meta"] == {"hint": "secondary axis"}
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.question_stats import question_stats_service
+from app.services.storage import storage_service
+
+
+def _outcome(session_id: str, question_id: str, score: float, time_ms: int = 20_000) -> dict:
+    return {
+        "session_id": session_id,
+        "question_id": question_id,
+        "score": score,
+        "time_ms": time_ms,
+        "difficulty": 2,
+        "meta": {},
+    }
+
+
+def test_outcome_scores_are_stored_as_fractions(client: TestClient) -> None:
+    session_id = f"stats-{uuid.uuid4().hex}"
+    for score in (85, 1, 0.4, 140):
+        assert client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, "q1", score)).status_code == 200
+    attempts = asyncio.run(storage_service.list_attempts(session_id))
+    assert sorted(attempt["score"] for attempt in attempts) == [0.4, 0.85, 1.0, 1.0]
+
+
+def test_refresh_folds_new_attempts_into_question_stats(client: TestClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "question_stats_lag_seconds", -5.0)
+    monkeypatch.setattr(settings, "question_stats_min_attempts", 2)
+    session_id = f"stats-{uuid.uuid4().hex}"
+    question_id = f"q-stats-{uuid.uuid4().hex[:8]}"
+    for score, time_ms in ((0.9, 8_000), (0.5, 25_000), (0.7, 40_000)):
+        client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, question_id, score, time_ms))
+
+    asyncio.run(question_stats_service.refresh())
+    stats = question_stats_service.calibrated(question_id)
+    assert stats is not None and stats.attempts == 3
+    assert stats.mean_score == pytest.approx(0.7)
+    assert 10_000 <= stats.time_ms_p50 <= 30_000
+    assert question_stats_service.is_miscalibrated(question_id, 3)
+    assert not question_stats_service.is_miscalibrated(question_id, 2)
+
+    asyncio.run(question_stats_service.refresh())
+    assert question_stats_service.get(question_id).attempts == 3
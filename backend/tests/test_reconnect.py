@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.db.supervisor import CONNECTED, DEGRADED, ConnectionSupervisor
+from app.services.memory import MemoryService
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def fast_reconnect(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "reconnect_base_delay_seconds", 0.01)
+    monkeypatch.setattr(settings, "reconnect_max_delay_seconds", 0.02)
+    monkeypatch.setattr(settings, "health_check_interval_seconds", 0.01)
+
+
+async def _wait_for(predicate, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_supervisor_reconnects_and_runs_health_callbacks() -> None:
+    outages = {"remaining": 2}
+    calls = {"up": 0, "down": 0, "healthy": 0}
+
+    async def connect() -> None:
+        if outages["remaining"]:
+            outages["remaining"] -= 1
+            raise ConnectionError("refused")
+
+    async def count(name: str) -> None:
+        calls[name] += 1
+
+    async def scenario() -> ConnectionSupervisor:
+        supervisor = ConnectionSupervisor(
+            "test",
+            connect=connect,
+            check=connect,
+            on_up=lambda: count("up"),
+            on_down=lambda: count("down"),
+            on_healthy=lambda: count("healthy"),
+            base_delay=0.01,
+            max_delay=0.02,
+            check_interval=0.01,
+        )
+        supervisor.start()
+        await _wait_for(lambda: calls["healthy"] >= 3)
+        supervisor.report_failure(ConnectionError("blip"))
+        assert supervisor.state == DEGRADED
+        await _wait_for(lambda: calls["up"] == 2)
+        await supervisor.stop()
+        return supervisor
+
+    supervisor = asyncio.run(scenario())
+    assert supervisor.state == CONNECTED
+    assert supervisor.reconnects == 1 and supervisor.status()["consecutive_failures"] == 0
+    assert calls["down"] == 2
+
+
+def test_replayed_context_does_not_overwrite_a_newer_version(fast_reconnect: None) -> None:
+    async def scenario() -> tuple[dict, dict, list]:
+        server = fakeredis.FakeServer()
+        client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        memory = MemoryService(client=client)
+        memory.start()
+        await _wait_for(lambda: memory.status()["state"] == CONNECTED)
+        await client.set("session:stale:context", json.dumps({"context_version": 3, "step": "newer"}))
+
+        server.connected = False
+        assert await memory.set_session_context_if_current("stale", {"context_version": 1, "step": "buffered"})
+        assert await memory.set_session_context_if_current("fresh", {"context_version": 4, "step": "buffered"})
+        await memory.append_transcript_turn("fresh", {"event_type": "answer_received"})
+        assert memory.status()["pending_contexts"] == 2
+
+        server.connected = True
+        await _wait_for(lambda: memory.status()["pending_contexts"] == 0 and memory.status()["pending_turns"] == 0)
+        stale = await memory.get_session_context("stale")
+        fresh = await memory.get_session_context("fresh")
+        turns = await memory.get_recent_transcript("fresh")
+        await memory.close()
+        return stale, fresh, turns
+
+    stale, fresh, turns = asyncio.run(scenario())
+    assert stale == {"context_version": 3, "step": "newer"}
+    assert fresh == {"context_version": 4, "step": "buffered"}
+    assert turns == [{"event_type": "answer_received"}]
+
+
+def test_transcript_helpers_fall_back_when_redis_fails() -> None:
+    async def scenario() -> MemoryService:
+        server = fakeredis.FakeServer()
+        memory = MemoryService(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+        server.connected = False
+        assert await memory.transcript_length("s1") == 0
+        assert await memory.append_transcript_turn("s1", {"event_type": "question_asked"}) is None
+        assert await memory.transcript_length("s1") == 1
+        assert await memory.read_transcript_head("s1", 5) == []
+        assert await memory.get_transcript_summary("s1") is None
+        await memory.set_transcript_summary("s1", {"turns_compacted": 1})
+        assert not await memory.commit_compaction("s1", 1, {"turns_compacted": 1}, compacted=0)
+        context, turns, summary = await memory.get_session_view("s1", 10)
+        assert context is None and turns == [{"event_type": "question_asked"}] and summary is None
+        return memory
+
+    memory = asyncio.run(scenario())
+    assert memory.status()["state"] == DEGRADED
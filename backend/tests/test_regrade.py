@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+import httpx
+import pytest
+
+from app.cli.replay_traffic import build_model_stub
+from app.core.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.regrade import CohortRegradeService, RegradeCheckpoint
+from app.services.session_archive import session_archive_service
+from app.services.storage import storage_service
+
+QUESTIONS = ("q_intro_1", "q_tech_1", "q_design_1", "q_wrap_1")
+ANSWER = "I would use XLOOKUP with IFERROR and a pivot table with slicers"
+
+
+async def _seed(tag: str, count: int, sessions: int = 6) -> list[str]:
+    ids = []
+    for index in range(count):
+        attempt = await storage_service.record_attempt(
+            session_id=f"{tag}-s{index % sessions}",
+            question_id=QUESTIONS[index % len(QUESTIONS)],
+            score=0.6,
+            objective=None,
+            time_ms=1000,
+            difficulty=2,
+            answer_payload={"text": f"{ANSWER} ({index})"},
+            feedback=None,
+            hints_used=0,
+        )
+        ids.append(str(attempt["_id"]))
+    return sorted(ids)
+
+
+def _cohort(run_id: str, started: datetime, **kwargs) -> RegradeCheckpoint:
+    return RegradeCheckpoint(run_id=f"{run_id}-{uuid.uuid4().hex[:8]}", start=started.isoformat(), **kwargs)
+
+
+@pytest.fixture
+def model_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "grading_max_retries", 0)
+    monkeypatch.setattr(settings, "regrade_requests_per_minute", 60_000)
+    monkeypatch.setattr(settings, "regrade_tokens_per_minute", 1e9)
+
+
+def _regrader(fail: Callable[[str], int | None]) -> tuple[CohortRegradeService, CircuitBreaker]:
+    stub = httpx.ASGITransport(app=build_model_stub())
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        status = fail(request.content.decode())
+        if status:
+            return httpx.Response(status)
+        return await stub.handle_async_request(request)
+
+    breaker = CircuitBreaker("regrade-test", max_timeout=20, min_requests=4, error_threshold=0.5, cooldown_seconds=60)
+    service = CohortRegradeService(base_url="http://stub", transport=httpx.MockTransport(handler), breaker=breaker)
+    return service, breaker
+
+
+def test_failed_attempts_are_recorded_and_skipped(model_settings: None) -> None:
+    started = datetime.utcnow() - timedelta(milliseconds=1)
+    ids = asyncio.run(_seed(uuid.uuid4().hex[:8], 12))
+    service, _ = _regrader(lambda body: 400 if "(5)" in body or "(9)" in body else None)
+
+    checkpoint = asyncio.run(service.run(_cohort("partial", started), concurrency=2, flush_size=3))
+    assert checkpoint.status == "completed"
+    assert checkpoint.scanned == 12 and checkpoint.graded == 10 and checkpoint.failed == 2
+    assert checkpoint.after_id == ids[-1]
+
+    results = asyncio.run(storage_service.list_regrade_results(checkpoint.run_id))
+    assert [result["attempt_id"] for result in results] == ids
+    failed = [result for result in results if result["status"] == "failed"]
+    assert [result["attempt_id"] for result in failed] == [ids[5], ids[9]]
+    assert all("score" not in result and result["error"] for result in failed)
+    graded = [result for result in results if result["status"] == "graded"]
+    assert all(result["original_score"] == 60.0 and 40 <= result["score"] <= 100 for result in graded)
+
+
+def test_open_breaker_halts_and_the_run_resumes(model_settings: None) -> None:
+    started = datetime.utcnow() - timedelta(milliseconds=1)
+    ids = asyncio.run(_seed(uuid.uuid4().hex[:8], 30))
+    calls = {"count": 0}
+
+    def outage(_: str) -> int | None:
+        calls["count"] += 1
+        return 503 if calls["count"] > 4 else None
+
+    service, breaker = _regrader(outage)
+    checkpoint = asyncio.run(service.run(_cohort("outage", started), concurrency=1, flush_size=5))
+    assert checkpoint.status == "interrupted" and breaker.is_open()
+    processed = checkpoint.graded + checkpoint.failed
+    assert checkpoint.graded == 4 and 0 < processed < 30
+    assert checkpoint.after_id == ids[processed - 1]
+
+    saved = asyncio.run(service.load(checkpoint.run_id))
+    assert saved is not None and saved.after_id == checkpoint.after_id and saved.status == "interrupted"
+
+    healthy, _ = _regrader(lambda _: None)
+    resumed = asyncio.run(healthy.run(saved, concurrency=4))
+    assert resumed.status == "completed" and resumed.scanned == 30
+    assert resumed.graded == 30 - checkpoint.failed
+    results = asyncio.run(storage_service.list_regrade_results(checkpoint.run_id))
+    assert [result["attempt_id"] for result in results] == ids
+
+
+def test_local_regrade_covers_archived_sessions(model_settings: None) -> None:
+    started = datetime.utcnow() - timedelta(milliseconds=1)
+    tag = uuid.uuid4().hex[:8]
+    ids = asyncio.run(_seed(tag, 36))
+
+    async def archive() -> None:
+        for session_id in (f"{tag}-s1", f"{tag}-s4"):
+            assert await session_archive_service.archive_session(session_id)
+
+    asyncio.run(archive())
+    service = CohortRegradeService()
+
+    checkpoint = asyncio.run(service.run(_cohort("local", started, grader="local"), workers=1))
+    assert checkpoint.status == "completed" and checkpoint.graded == 36
+    assert checkpoint.live_complete and checkpoint.archived_after is not None
+
+    filtered = _cohort("filtered", started, grader="local", session_ids=[f"{tag}-s0"], after_id=ids[17])
+    checkpoint = asyncio.run(service.run(filtered, workers=1))
+    assert checkpoint.graded == 3 and checkpoint.skipped == 21 and checkpoint.scanned == 24
+    results = asyncio.run(storage_service.list_regrade_results(filtered.run_id))
+    assert {result["session_id"] for result in results} == {f"{tag}-s0"}
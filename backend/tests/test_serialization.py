@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.exceptions import ResponseValidationError
+from fastapi.testclient import TestClient
+
+from app.api.serialization import dumps, loads, trusted_response
+from app.models.tools import GetNextQuestionResponse, GradeAnswerResponse
+
+
+def test_trusted_routes_filter_through_the_response_model() -> None:
+    async def endpoint() -> dict:
+        return {"score": "80", "notes": "ok", "internal_trace": {"tokens": 120}}
+
+    response = asyncio.run(trusted_response(endpoint, GradeAnswerResponse)())
+    assert loads(response.body) == {
+        "score": 80.0,
+        "objective": None,
+        "notes": "ok",
+        "auto_feedback": None,
+        "confidence": None,
+    }
+
+
+def test_trusted_routes_reject_invalid_results() -> None:
+    async def endpoint() -> dict:
+        return {"notes": "missing a score"}
+
+    with pytest.raises(ResponseValidationError) as rejected:
+        asyncio.run(trusted_response(endpoint, GradeAnswerResponse)())
+    assert rejected.value.errors()[0]["loc"] == ("score",)
+
+
+def test_model_results_are_not_validated_twice() -> None:
+    built = GradeAnswerResponse(score=55.0, objective={"graded_at": datetime(2024, 1, 2, 3, 4, 5)})
+
+    async def endpoint() -> GradeAnswerResponse:
+        return built
+
+    response = asyncio.run(trusted_response(endpoint, GradeAnswerResponse)())
+    assert response.body == dumps(built.model_dump())
+    assert loads(response.body)["objective"] == {"graded_at": "2024-01-02T03:04:05"}
+
+
+def test_tool_responses_match_their_models(client: TestClient) -> None:
+    response = client.post("/api/v1/tools/get_next_question", json={"session_id": f"ser-{uuid.uuid4().hex}"})
+    assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert set(body) == set(GetNextQuestionResponse.model_fields)
+    assert GetNextQuestionResponse.model_validate(body).model_dump() == body
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.orchestrator import orchestrator_service
+from app.services.storage import skill_states_from_session, storage_service
+
+
+@pytest.fixture
+def aggregate_layout(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "session_aggregate_layout", True)
+
+
+def _outcome(session_id: str, question: dict, skill: str, score: float) -> dict:
+    return {
+        "session_id": session_id,
+        "question_id": question["id"],
+        "score": score,
+        "time_ms": 20_000,
+        "difficulty": question["difficulty"],
+        "meta": {"skill": skill},
+    }
+
+
+def test_outcomes_update_one_versioned_session_document() -> None:
+    session_id = f"agg-{uuid.uuid4().hex}"
+
+    async def scenario() -> dict:
+        await storage_service.apply_session_outcome(
+            session_id, skill="formulas", score=0.9, difficulty=2, hints_used=1, time_ms=30_000
+        )
+        await storage_service.save_session_plan(session_id, {"plan_index": 1, "asked_questions": ["q1"]})
+        return await storage_service.apply_session_outcome(
+            session_id, skill="formulas", score=0.2, difficulty=3, hints_used=0, time_ms=10_000
+        )
+
+    session = asyncio.run(scenario())
+    assert session["version"] == 3 and session["plan"]["asked_questions"] == ["q1"]
+    assert session["aggregates"] == {"attempts": 2, "score_sum": 1.1, "time_spent_ms": 40_000, "hints_used": 1}
+    [state] = skill_states_from_session(session_id, session)
+    assert state["asked_count"] == 2 and state["correct_count"] == 1 and state["target_difficulty"] == 3
+
+
+def test_skill_names_are_validated_before_building_update_paths() -> None:
+    with pytest.raises(ValueError):
+        asyncio.run(
+            storage_service.apply_session_outcome(
+                "agg-invalid", skill="skills.$bad", score=1.0, difficulty=1, hints_used=0, time_ms=0
+            )
+        )
+
+
+def test_record_outcome_uses_the_aggregate_layout(client: TestClient, aggregate_layout: None) -> None:
+    session_id = f"agg-{uuid.uuid4().hex}"
+    question = client.post("/api/v1/tools/get_next_question", json={"session_id": session_id}).json()["question"]
+    response = client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, question, question["skill"], 0.9))
+    assert response.status_code == 200
+    assert response.json()["rating_summary"][question["skill"]] > 50
+
+    session = asyncio.run(storage_service.get_session(session_id))
+    context = asyncio.run(orchestrator_service.fetch_context(session_id))
+    assert session["aggregates"]["attempts"] == 1
+    assert session["plan"]["asked_questions"] == [question["id"]]
+    assert context["context_version"] == session["version"]
+    assert context["time_spent_ms"] == session["aggregates"]["time_spent_ms"]
+    assert len(asyncio.run(storage_service.list_attempts(session_id))) == 1
+
+    rejected = client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, question, "bad.skill", 0.5))
+    assert rejected.status_code == 400
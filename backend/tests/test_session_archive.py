@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.services.session_archive import session_archive_service
+from app.services.storage import storage_service
+
+
+def _outcome(session_id: str, question_id: str, score: float) -> dict:
+    return {
+        "session_id": session_id,
+        "question_id": question_id,
+        "score": score,
+        "time_ms": 30_000,
+        "difficulty": 2,
+        "meta": {"skill": "excel_formulas"},
+    }
+
+
+def test_archived_session_is_rehydrated_on_access(client: TestClient) -> None:
+    session_id = f"arch-{uuid.uuid4().hex}"
+    client.post("/api/v1/tools/get_next_question", json={"session_id": session_id})
+    client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, "q_intro_1", 0.9))
+    client.post("/api/v1/tools/record_outcome", json=_outcome(session_id, "q_tech_1", 0.6))
+    before = asyncio.run(storage_service.list_attempts(session_id))
+
+    assert asyncio.run(session_archive_service.archive_session(session_id))
+    assert asyncio.run(storage_service.list_attempts(session_id)) == []
+    session = asyncio.run(storage_service.get_session(session_id))
+    assert session["archive"]["counts"]["attempts"] == 2
+    assert not asyncio.run(session_archive_service.archive_session(session_id))
+
+    response = client.post("/api/v1/tools/finalize_session", json={"session_id": session_id})
+    assert response.status_code == 200
+    assert response.json()["summary"].startswith("We covered 2 questions")
+    after = asyncio.run(storage_service.list_attempts(session_id))
+    assert [attempt["_id"] for attempt in after] == [attempt["_id"] for attempt in before]
+    assert asyncio.run(storage_service.get_session(session_id)).get("archive") is None
+
+
+def test_archive_listing_skips_hot_sessions() -> None:
+    tag = uuid.uuid4().hex[:8]
+
+    async def scenario() -> list[str]:
+        for suffix in ("hot", "cold"):
+            await storage_service.record_attempt(
+                session_id=f"arch-{tag}-{suffix}",
+                question_id="q1",
+                score=0.5,
+                objective=None,
+                time_ms=1000,
+                difficulty=2,
+                answer_payload={},
+                feedback=None,
+                hints_used=0,
+            )
+        await session_archive_service.archive_session(f"arch-{tag}-cold")
+        return [str(session["_id"]) async for session in storage_service.iter_archived_sessions()]
+
+    archived = asyncio.run(scenario())
+    assert f"arch-{tag}-cold" in archived and f"arch-{tag}-hot" not in archived
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.core.config import settings
+from app.services.speculative_grading import GradeCallable, SpeculativeGrader, answer_fingerprint
+
+
+def _grading(result: dict[str, Any] | None, started: list[str], delay: float = 0.0) -> GradeCallable:
+    async def grade() -> dict[str, Any] | None:
+        started.append("grade")
+        await asyncio.sleep(delay)
+        return result
+
+    return grade
+
+
+def test_fingerprint_ignores_surrounding_whitespace() -> None:
+    assert answer_fingerprint({"text": "  use XLOOKUP "}) == answer_fingerprint({"text": "use XLOOKUP"})
+    assert answer_fingerprint({"text": "use XLOOKUP"}) != answer_fingerprint({"text": "use VLOOKUP"})
+    assert answer_fingerprint({"text": "x", "cells": {"B1": "=A1"}}) != answer_fingerprint({"text": "x"})
+    assert answer_fingerprint({"text": "   "}) is None
+
+
+def test_matching_answer_takes_the_speculative_grade() -> None:
+    async def scenario() -> tuple[dict[str, Any] | None, dict[str, Any], list[str]]:
+        grader = SpeculativeGrader()
+        started: list[str] = []
+        assert grader.speculate("s", "q", {"text": "use XLOOKUP"}, _grading({"score": 80}, started, 0.01))
+        assert grader.speculate("s", "q", {"text": "use XLOOKUP "}, _grading({"score": 0}, started))
+        result = await grader.take("s", "q", {"text": " use XLOOKUP"})
+        return result, grader.snapshot(), started
+
+    result, snapshot, started = asyncio.run(scenario())
+    assert result == {"score": 80}
+    assert started == ["grade"]
+    assert snapshot["hits"] == 1 and snapshot["awaited"] == 1 and snapshot["hit_rate"] == 1.0
+
+
+def test_changed_answer_cancels_the_speculation() -> None:
+    cancelled: list[str] = []
+
+    def drafting(name: str) -> GradeCallable:
+        async def grade() -> dict[str, Any] | None:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            return {"score": 10}
+
+        return grade
+
+    async def scenario() -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        grader = SpeculativeGrader()
+        grader.speculate("s", "q", {"text": "first draft"}, drafting("first"))
+        await asyncio.sleep(0)
+        grader.speculate("s", "q", {"text": "second draft"}, drafting("second"))
+        await asyncio.sleep(0)
+        result = await grader.take("s", "q", {"text": "final answer"})
+        await asyncio.sleep(0)
+        return result, grader.snapshot()
+
+    result, snapshot = asyncio.run(scenario())
+    assert result is None
+    assert cancelled == ["first", "second"]
+    assert snapshot["cancelled"] == 1 and snapshot["misses"] == 1 and snapshot["in_flight"] == 0
+
+
+def test_failed_speculation_falls_back() -> None:
+    async def failing() -> dict[str, Any] | None:
+        raise RuntimeError("model unavailable")
+
+    async def scenario() -> tuple[dict[str, Any] | None, dict[str, Any]]:
+        grader = SpeculativeGrader()
+        grader.speculate("s", "q", {"text": "answer"}, failing)
+        return await grader.take("s", "q", {"text": "answer"}), grader.snapshot()
+
+    result, snapshot = asyncio.run(scenario())
+    assert result is None and snapshot["errors"] == 1
+
+
+def test_skips_when_overloaded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "admission_degrade_ratio", 0.0)
+
+    async def scenario() -> tuple[bool, dict[str, Any]]:
+        grader = SpeculativeGrader()
+        started: list[str] = []
+        return grader.speculate("s", "q", {"text": "answer"}, _grading({"score": 1}, started)), grader.snapshot()
+
+    speculated, snapshot = asyncio.run(scenario())
+    assert not speculated and snapshot["skipped"] == 1
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from app.core.config import settings
+from app.services.spill_store import SpillingSessionStore
+
+
+def _attempts(session_id: str, count: int) -> list[dict]:
+    return [
+        {"_id": f"{session_id}-{i}", "session_id": session_id, "score": 0.5, "answer_payload": {"text": "x" * 200}}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[SpillingSessionStore]:
+    monkeypatch.setattr(settings, "memory_store_budget_bytes", 20_000)
+    monkeypatch.setattr(settings, "memory_store_spill_dir", str(tmp_path))
+    spill = SpillingSessionStore()
+    yield spill
+    spill.close()
+
+
+def test_spills_least_recently_used_sessions(store: SpillingSessionStore) -> None:
+    for index in range(10):
+        store.append(f"s{index}", "attempts", _attempts(f"s{index}", 20))
+    snapshot = store.snapshot()
+    assert snapshot["spilled_sessions"] > 0
+    assert snapshot["resident_bytes"] <= settings.memory_store_budget_bytes
+    assert store.is_spilled("s0") and "s9" in store and not store.is_spilled("s9")
+    assert "s0" in store and sorted(store.session_ids()) == sorted(f"s{i}" for i in range(10))
+    (spill_file,) = Path(settings.memory_store_spill_dir).iterdir()
+    assert spill_file.stat().st_size == snapshot["spill_file_bytes"]
+
+
+def test_finished_sessions_spill_first(store: SpillingSessionStore) -> None:
+    store.session("done", datetime.utcnow())["archive_eligible_at"] = datetime.utcnow()
+    store.append("done", "attempts", _attempts("done", 20))
+    store.append("live", "attempts", _attempts("live", 20))
+    store.append("newest", "attempts", _attempts("newest", 40))
+    assert store.snapshot()["spilled_sessions"] >= 1
+    assert store.is_spilled("done")
+    assert "live" in store and not store.is_spilled("live")
+    assert list(store.archivable(datetime.utcnow())) == ["done"]
+
+
+def test_rehydrates_and_peeks_without_admitting(store: SpillingSessionStore) -> None:
+    for index in range(10):
+        store.append(f"s{index}", "attempts", _attempts(f"s{index}", 20))
+    assert store.is_spilled("s0")
+
+    peeked = store.peek("s0")
+    assert peeked is not None and [record.get("_id") for record in peeked.attempts][:2] == ["s0-0", "s0-1"]
+    assert store.is_spilled("s0")
+
+    bucket = store.get("s0")
+    assert bucket is not None and len(bucket.attempts) == 20
+    assert bucket.attempts[0].to_document() == _attempts("s0", 1)[0]
+    assert "s0" in store and not store.is_spilled("s0")
+    snapshot = store.snapshot()
+    assert snapshot["rehydrated"] == 1 and snapshot["peeked"] == 1
+    assert sorted(session_id for session_id, _ in store.iter_buckets()) == sorted(f"s{i}" for i in range(10))
+
+
+def test_compacts_dead_spill_bytes(store: SpillingSessionStore) -> None:
+    for round_ in range(6):
+        for index in range(10):
+            store.append(f"s{index}", "attempts", _attempts(f"s{index}-{round_}", 2))
+    snapshot = store.snapshot()
+    assert snapshot["compactions"] >= 1
+    assert snapshot["spill_dead_bytes"] <= max(snapshot["spill_file_bytes"], settings.memory_store_budget_bytes)
+
+    for index in range(10):
+        bucket = store.peek(f"s{index}")
+        assert bucket is not None and len(bucket.attempts) == 12
+
+
+def test_discarding_the_last_spilled_session_truncates(store: SpillingSessionStore) -> None:
+    for index in range(10):
+        store.append(f"s{index}", "attempts", _attempts(f"s{index}", 20))
+    for session_id in [session_id for session_id in store.session_ids() if store.is_spilled(session_id)]:
+        assert store.discard(session_id) is not None
+    snapshot = store.snapshot()
+    assert snapshot["spilled_sessions"] == 0
+    assert snapshot["spill_file_bytes"] == 0 and snapshot["spill_dead_bytes"] == 0
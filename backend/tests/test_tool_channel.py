@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.services.session_channels import session_channel_hub
+
+
+def _receive_result(websocket, request_id: str) -> tuple[dict, list[dict]]:
+    events = []
+    while True:
+        message = websocket.receive_json()
+        if message.get("id") == request_id:
+            return message, events
+        events.append(message)
+
+
+def test_tool_calls_are_multiplexed_and_events_pushed(client: TestClient) -> None:
+    session_id = f"ws-{uuid.uuid4().hex}"
+    with client.websocket_connect(f"/api/v1/tools/ws/{session_id}") as websocket:
+        assert session_channel_hub.is_connected(session_id)
+        websocket.send_json({"id": "1", "tool": "get_next_question", "payload": {}})
+        reply, _ = _receive_result(websocket, "1")
+        assert reply["ok"] and reply["result"]["question"]["id"]
+        question = reply["result"]["question"]
+
+        outcome = {
+            "question_id": question["id"],
+            "score": 0.9,
+            "time_ms": 5000,
+            "difficulty": question["difficulty"],
+            "meta": {"skill": question["skill"]},
+        }
+        websocket.send_json({"id": "2", "tool": "record_outcome", "payload": outcome})
+        reply, events = _receive_result(websocket, "2")
+        assert reply["ok"] and reply["result"]["ok"]
+        if not events:
+            events.append(websocket.receive_json())
+        assert events[0]["event"] == "rating_updated"
+        assert question["skill"] in events[0]["data"]["rating_summary"]
+    assert not session_channel_hub.is_connected(session_id)
+
+
+def test_bad_messages_get_errors_without_closing_the_socket(client: TestClient) -> None:
+    session_id = f"ws-{uuid.uuid4().hex}"
+    with client.websocket_connect(f"/api/v1/tools/ws/{session_id}") as websocket:
+        websocket.send_text("not json")
+        assert websocket.receive_json()["error"]["status"] == 400
+        websocket.send_json({"id": "a", "tool": "drop_tables"})
+        reply = websocket.receive_json()
+        assert reply == {"id": "a", "ok": False, "error": {"status": 404, "detail": "Unknown tool: drop_tables"}}
+        websocket.send_json({"id": "b", "tool": "record_outcome", "payload": {"question_id": "q1"}})
+        reply = websocket.receive_json()
+        assert reply["id"] == "b" and reply["error"]["status"] == 422
+        websocket.send_json({"id": "c", "tool": "update_difficulty"})
+        reply, _ = _receive_result(websocket, "c")
+        assert reply["ok"] and "new_level" in reply["result"]
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.tracing import FileSpanExporter, Span, Tracer, traced, tracer
+
+
+class CollectingExporter:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, spans: list[Span]) -> None:
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def collected() -> Iterator[CollectingExporter]:
+    exporter = CollectingExporter()
+    tracer.set_exporter(exporter)
+    yield exporter
+    tracer.set_exporter(None)
+
+
+@traced("test.lookup")
+async def _lookup(session_id: str, context: dict) -> str:
+    return context["question"]["_id"]
+
+
+def test_child_spans_share_the_trace_and_inherit_attributes(collected: CollectingExporter) -> None:
+    async def scenario() -> None:
+        with tracer.span("tool.record_outcome", session_id="s1"):
+            await _lookup("s1", {"question": {"_id": "q9"}})
+            with pytest.raises(ValueError):
+                with tracer.span("failing"):
+                    raise ValueError("boom")
+        await tracer.flush()
+
+    asyncio.run(scenario())
+    spans = {span.name: span for span in collected.spans}
+    root, child, failing = spans["tool.record_outcome"], spans["test.lookup"], spans["failing"]
+    assert root.parent_id is None
+    assert child.parent_id == failing.parent_id == root.span_id
+    assert child.trace_id == failing.trace_id == root.trace_id
+    assert child.attributes == {"session_id": "s1", "question_id": "q9"}
+    assert failing.attributes == {"session_id": "s1"}
+    assert failing.status == "error" and "boom" in failing.error
+    assert root.status == "ok" and root.end_time >= child.end_time
+
+
+def test_disabled_tracer_yields_no_span() -> None:
+    disabled = Tracer()
+    with disabled.span("anything") as span:
+        assert span is None
+    assert not disabled.enabled
+
+
+def test_file_exporter_appends_json_lines(tmp_path: Path) -> None:
+    local = Tracer()
+    path = tmp_path / "traces" / "spans.jsonl"
+    local.set_exporter(FileSpanExporter(path))
+
+    async def scenario() -> None:
+        for name in ("first", "second"):
+            with local.span(name, session_id="s1"):
+                pass
+            await local.flush()
+
+    asyncio.run(scenario())
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["name"] for record in records] == ["first", "second"]
+    assert records[0]["duration_ms"] >= 0 and records[0]["attributes"] == {"session_id": "s1"}
+
+
+def test_tool_calls_produce_a_span_tree(client: TestClient, collected: CollectingExporter) -> None:
+    session_id = f"trace-{uuid.uuid4().hex}"
+    response = client.post("/api/v1/tools/get_next_question", json={"session_id": session_id})
+    assert response.status_code == 200
+    asyncio.run(tracer.flush())
+
+    spans = [span for span in collected.spans if span.attributes.get("session_id") == session_id]
+    root = next(span for span in spans if span.name == "tool.get_next_question")
+    assert root.parent_id is None and root.attributes["transport"] == "http"
+    children = [span for span in spans if span.parent_id is not None]
+    assert children and all(span.trace_id == root.trace_id for span in children)
+    assert any(span.name == "orchestrator.select_next_question" for span in children)
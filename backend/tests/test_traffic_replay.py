@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cli.replay_traffic import diff_bodies, replay
+from app.core.config import settings
+from app.services.traffic_capture import TrafficCaptureService, read_capture, traffic_capture
+
+
+@pytest.fixture
+def capture_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "traffic_capture_rate", 1.0)
+    monkeypatch.setattr(settings, "traffic_capture_dir", str(tmp_path))
+    return tmp_path
+
+
+def _run_session(client: TestClient, session_id: str) -> dict:
+    question = client.post("/api/v1/tools/get_next_question", json={"session_id": session_id}).json()["question"]
+    outcome = {
+        "session_id": session_id,
+        "question_id": question["id"],
+        "score": 0.7,
+        "time_ms": 4000,
+        "difficulty": question["difficulty"],
+        "meta": {"skill": question["skill"]},
+    }
+    assert client.post("/api/v1/tools/record_outcome", json=outcome).status_code == 200
+    return question
+
+
+def test_sampling_is_per_session_and_deterministic(monkeypatch: pytest.MonkeyPatch) -> None:
+    service = TrafficCaptureService()
+    assert not service.sampled("s1")
+    monkeypatch.setattr(settings, "traffic_capture_rate", 0.5)
+    sampled = [service.sampled(f"session-{index}") for index in range(200)]
+    assert sampled == [service.sampled(f"session-{index}") for index in range(200)]
+    assert 60 < sum(sampled) < 140
+    assert not service.sampled(None)
+
+
+def test_captured_sessions_replay_against_the_app(client: TestClient, capture_dir: Path) -> None:
+    session_id = f"cap-{uuid.uuid4().hex}"
+    question = _run_session(client, session_id)
+    asyncio.run(traffic_capture.flush())
+
+    calls = read_capture(capture_dir.glob("capture-*.jsonl"))[session_id]
+    assert [call.tool for call in calls] == ["get_next_question", "record_outcome"]
+    assert calls[0].status == 200 and calls[0].response["question"]["id"] == question["id"]
+    assert all(call.latency_ms is not None and call.transport == "http" for call in calls)
+
+    report = asyncio.run(
+        replay(
+            {session_id: calls},
+            base_url="http://replay",
+            speed=100.0,
+            run_id="rp",
+            transport=httpx.ASGITransport(app=client.app),
+        )
+    )
+    assert report["sessions"] == 1 and report["calls"] == 2
+    assert all(tool["errors"] == tool["status_mismatches"] == 0 for tool in report["tools"].values())
+    assert report["tools"]["get_next_question"]["body_mismatches"] == 0
+
+
+def test_sessions_are_derived_from_storage(client: TestClient) -> None:
+    started = datetime.utcnow() - timedelta(seconds=1)
+    session_id = f"derive-{uuid.uuid4().hex}"
+    _run_session(client, session_id)
+
+    sessions = asyncio.run(traffic_capture.derive_from_storage(start=started))
+    tools = [call.tool for call in sessions[session_id]]
+    assert tools[0] == "get_next_question" and tools[-2:] == ["grade_answer", "record_outcome"]
+    assert all(call.source == "storage" for call in sessions[session_id])
+
+
+def test_diff_bodies_reports_paths_and_ignores_volatile_fields() -> None:
+    expected = {"score": 0.5, "items": [1, 2], "report_url": "a", "nested": {"ok": True}}
+    actual = {"score": 0.5000000001, "items": [1, 3], "report_url": "b", "nested": {"ok": 1}, "extra": None}
+    assert diff_bodies(expected, actual, {"report_url"}) == [
+        "$.extra: unexpected",
+        "$.items[1]: 2 != 3",
+        "$.nested.ok: True != 1",
+    ]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.memory import MemoryService
+from app.services.orchestrator import orchestrator_service
+from app.services.transcript_compaction import fold_turns
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def _turn(index: int) -> dict:
+    return {
+        "event_type": "question_asked",
+        "payload": {"prompt": f"Question {index}. Follow-up detail that is dropped.", "question_id": f"q{index}"},
+    }
+
+
+def test_fold_turns_keeps_a_bounded_rolling_summary(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "transcript_summary_highlights", 2)
+    summary = fold_turns(None, [_turn(1), {"event_type": "answer_received", "payload": {"score": 0.5}}])
+    summary = fold_turns(summary, [_turn(2)])
+
+    assert summary["turns_compacted"] == 3
+    assert summary["event_counts"] == {"question_asked": 2, "answer_received": 1}
+    assert summary["highlights"] == ["A: (score=0.5)", "Q: Question 2. (question_id=q2)"]
+    assert summary["text"] == " ".join(summary["highlights"])
+
+
+def test_commit_compaction_trims_once_per_summary_version() -> None:
+    async def scenario() -> tuple[bool, bool, list, dict | None]:
+        memory = MemoryService(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+        for index in range(5):
+            await memory.append_transcript_turn("s1", _turn(index))
+        head = await memory.read_transcript_head("s1", 3)
+        folded = fold_turns(None, head)
+        committed = await memory.commit_compaction("s1", len(head), folded, compacted=0)
+        stale = await memory.commit_compaction("s1", len(head), folded, compacted=0)
+        return committed, stale, await memory.get_recent_transcript("s1"), await memory.get_transcript_summary("s1")
+
+    committed, stale, remaining, summary = asyncio.run(scenario())
+    assert committed and not stale
+    assert [turn["payload"]["question_id"] for turn in remaining] == ["q3", "q4"]
+    assert summary["turns_compacted"] == 3
+
+
+def test_evicted_turns_fold_into_the_context_without_redis(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "transcript_window_turns", 2)
+    session_id = f"compact-{uuid.uuid4().hex}"
+    for index in range(5):
+        response = client.post(
+            "/api/v1/tools/log_interaction",
+            json={"session_id": session_id, **_turn(index)},
+        )
+        assert response.status_code == 200
+
+    context = asyncio.run(orchestrator_service.fetch_context(session_id))
+    assert [turn["payload"]["question_id"] for turn in context["recent_transcript"]] == ["q3", "q4"]
+    assert context["transcript_summary"]["turns_compacted"] == 3
+    assert context["transcript_summary"]["highlights"][0] == "Q: Question 0. (question_id=q0)"
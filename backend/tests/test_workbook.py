@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.services.graders.formula import FormulaGrader
+from app.services.graders.workbook import CIRCULAR, DIV0, NAME, REF, WorkbookState
+
+
+def _sheet() -> WorkbookState:
+    return WorkbookState(
+        {
+            "A1": 1,
+            "A2": 2,
+            "A3": 3,
+            "B1": "=SUM(A1:A3)",
+            "B2": "=B1*2",
+            "C1": '=IF(A1>0,"pos","neg")',
+            "C2": '=SUMIF(A1:A3,">1")',
+        }
+    )
+
+
+def test_evaluates_formulas() -> None:
+    sheet = _sheet()
+    assert sheet.value("B1") == 6
+    assert sheet.value("b2") == 12
+    assert sheet.value("C1") == "pos"
+    assert sheet.value("C2") == 5
+    assert sheet.raw("B1") == "=SUM(A1:A3)"
+
+
+def test_recalculates_only_dependents() -> None:
+    sheet = _sheet()
+    assert sheet.update({"A2": 10}) == {"A2"}
+    assert sheet.last_recalculated == 4
+    assert sheet.value("B2") == 28
+    assert sheet.value("C1") == "pos"
+
+    assert sheet.update({"A2": 10}) == set()
+    assert sheet.last_recalculated == 0
+
+    sheet.update({"Z9": 5})
+    assert sheet.last_recalculated == 1
+
+
+def test_rewiring_a_formula_drops_old_dependencies() -> None:
+    sheet = _sheet()
+    sheet.update({"B1": "=A1"})
+    assert sheet.value("B2") == 2
+    sheet.update({"A3": 100})
+    assert sheet.last_recalculated == 2
+    assert sheet.value("B2") == 2
+
+
+def test_errors_propagate() -> None:
+    sheet = WorkbookState({"A1": 1, "B1": "=A1/0", "B2": "=B1+1", "C1": "=C2", "C2": "=C1", "D1": "=SUM(("})
+    assert sheet.value("B1") == DIV0
+    assert sheet.value("B2") == DIV0
+    assert sheet.value("C1") == CIRCULAR
+    assert sheet.value("D1") == NAME
+
+
+def test_ranges_outside_bounds_are_rejected() -> None:
+    sheet = WorkbookState({"A1": 1, "A2": 2}, bounds=(10, 10))
+    sheet.update({"B1": "=SUM(A1:ZZ200000)"})
+    assert sheet.value("B1") == REF
+
+
+def test_formula_grader_reuses_session_workbook() -> None:
+    meta = {"workbook": {"A1": 1, "A2": 2, "A3": 3}, "answer_cells": ["B1"], "reference": {"B1": "=SUM(A1:A3)"}}
+    grader = FormulaGrader()
+
+    async def grade(cells: dict) -> dict:
+        payload = {"session_id": "s", "question_id": "q", "question": meta, "answer_payload": {"cells": cells}}
+        return await grader.grade(payload)
+
+    async def scenario() -> list[dict]:
+        return [
+            await grade({"B1": "=SUM(A1:A2)"}),
+            await grade({"B1": "=SUM(A1:A3)"}),
+            await grade({"B1": 6}),
+            await grade({"A1": 100, "B1": "=SUM(A1:A3)"}),
+        ]
+
+    wrong, right, typed, tampered = asyncio.run(scenario())
+    assert wrong["score"] == 0 and wrong["objective"]["checks"][0]["actual"] == 3
+    assert right["score"] == 100 and right["objective"]["recalculated"] == 1
+    assert typed["score"] == 0
+    assert tampered["score"] == 100 and tampered["objective"]["checks"][0]["actual"] == 6
+
+
+def test_formula_grader_compares_formula_text() -> None:
+    payload = {
+        "session_id": "s",
+        "question_id": "q",
+        "question": {"expected": "=XLOOKUP(A2, Prices[Code],Prices[Price])"},
+        "answer_payload": {"text": "=xlookup(A2,Prices[Code], Prices[Price])"},
+    }
+    assert asyncio.run(FormulaGrader().grade(payload))["score"] == 100
@@ -1,7 +1,9 @@
 import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import { nanoid } from "nanoid/non-secure";
 
+import { readGradeStream } from "../lib/gradeStream";
 import { OpenAIRealtimeClient, type RealtimeEvent } from "../lib/realtimeClient";
+import { ToolChannel, type ToolChannelEvent } from "../lib/toolChannel";
 
 export type ChatRole = "agent" | "candidate" | "system";
 
@@ -42,6 +44,7 @@ interface UseRealtimeInterviewResult {
 }
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL ?? "http://localhost:8000";
+const TOOL_CHANNEL_URL = BACKEND_URL.replace(/^http/, "ws");
 
 export function useRealtimeInterview(): UseRealtimeInterviewResult {
   const [sessionId] = useState(() => crypto.randomUUID());
@@ -57,6 +60,7 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
 
   const audioRef = useRef<HTMLAudioElement | null>(null);
   const realtimeClientRef = useRef<OpenAIRealtimeClient | null>(null);
+  const toolChannelRef = useRef<ToolChannel | null>(null);
   const lastAnswerRef = useRef<string>("");
 
   const appendMessage = useCallback((partial: Omit<ChatMessage, "id" | "createdAt"> & Partial<Pick<ChatMessage, "id" | "createdAt">>) => {
@@ -71,6 +75,18 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
     ]);
   }, []);
 
+  const upsertMessage = useCallback((id: string, role: ChatRole, content: string) => {
+    setMessages((prev) => {
+      const index = prev.findIndex((message) => message.id === id);
+      if (index === -1) {
+        return [...prev, { id, role, content, createdAt: new Date() }];
+      }
+      const next = [...prev];
+      next[index] = { ...next[index], content };
+      return next;
+    });
+  }, []);
+
   const handleRealtimeEvent = useCallback(
     (event: RealtimeEvent) => {
       const isTextDelta =
@@ -85,17 +101,46 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
     [appendMessage]
   );
 
-  const fetchNextQuestion = useCallback(async () => {
-    try {
-      const response = await fetch(`${BACKEND_URL}/api/v1/tools/get_next_question`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ session_id: sessionId }),
-      });
+  const callTool = useCallback(
+    async <T,>(tool: string, payload: Record<string, unknown> = {}): Promise<T> => {
+      const idempotencyKey = nanoid();
+      const channel = toolChannelRef.current;
+      if (channel?.isOpen) {
+        try {
+          return await channel.call<T>(tool, payload, idempotencyKey);
+        } catch (error) {
+          if (channel.isOpen) throw error;
+        }
+      }
+      const request = () =>
+        fetch(`${BACKEND_URL}/api/v1/tools/${tool}`, {
+          method: "POST",
+          headers: { "Content-Type": "application/json", "Idempotency-Key": idempotencyKey },
+          body: JSON.stringify({ session_id: sessionId, ...payload }),
+        });
+      let response = await request().catch(request);
+      if (response.status === 503) {
+        const retryAfter = Number(response.headers.get("Retry-After") ?? "1");
+        await new Promise((resolve) => setTimeout(resolve, Math.min(retryAfter, 10) * 1000));
+        response = await request();
+      }
       if (!response.ok) {
-        throw new Error(`Failed to fetch next question: ${response.status}`);
+        throw new Error(`Tool ${tool} failed: ${response.status}`);
       }
-      const data = await response.json();
+      return response.json();
+    },
+    [sessionId]
+  );
+
+  const handleToolChannelEvent = useCallback((event: ToolChannelEvent) => {
+    if (event.event === "rating_updated" && event.data.rating_summary) {
+      setRatingSummary(event.data.rating_summary as Record<string, number>);
+    }
+  }, []);
+
+  const fetchNextQuestion = useCallback(async () => {
+    try {
+      const data = await callTool<any>("get_next_question");
       setRatingSummary(data.rating_summary ?? {});
 
       if (data.completed && !data.question) {
@@ -121,7 +166,7 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
     } catch (err) {
       setError(err instanceof Error ? err.message : String(err));
     }
-  }, [appendMessage, sessionId]);
+  }, [appendMessage, callTool]);
 
   const startSession = useCallback(async () => {
     setIsConnecting(true);
@@ -158,6 +203,16 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
       realtimeClientRef.current = realtimeClient;
       await realtimeClient.connect(clientSecret);
 
+      const toolChannel = new ToolChannel(`${TOOL_CHANNEL_URL}/api/v1/tools/ws/${sessionId}`, {
+        onEvent: handleToolChannelEvent,
+      });
+      try {
+        await toolChannel.connect();
+        toolChannelRef.current = toolChannel;
+      } catch (err) {
+        console.warn("Tool channel unavailable; falling back to HTTP", err);
+      }
+
       appendMessage({
         role: "system",
         content: "Realtime session established. The interviewer is greeting you now.",
@@ -170,11 +225,13 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
     } finally {
       setIsConnecting(false);
     }
-  }, [appendMessage, fetchNextQuestion, handleRealtimeEvent]);
+  }, [appendMessage, fetchNextQuestion, handleRealtimeEvent, handleToolChannelEvent, sessionId]);
 
   const disconnectSession = useCallback(() => {
     realtimeClientRef.current?.close();
     realtimeClientRef.current = null;
+    toolChannelRef.current?.close();
+    toolChannelRef.current = null;
     setIsRealtimeConnected(false);
     setCurrentQuestion(null);
     setIsComplete(false);
@@ -194,7 +251,7 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
 
       if (content.trim()) {
         try {
-          const gradeResponse = await fetch(`${BACKEND_URL}/api/v1/tools/grade_answer`, {
+          const gradeResponse = await fetch(`${BACKEND_URL}/api/v1/tools/grade_answer/stream`, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
@@ -208,13 +265,18 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
             }),
           });
 
-          if (gradeResponse.ok) {
-            const gradeData = await gradeResponse.json();
-            gradeScore = Number(gradeData.score ?? gradeScore);
-            objective = gradeData.objective;
-            autoFeedback = gradeData.auto_feedback ?? gradeData.notes;
-            if (autoFeedback) {
-              appendMessage({ role: "agent", content: autoFeedback });
+          if (gradeResponse.ok && gradeResponse.body) {
+            const feedbackId = nanoid();
+            const gradeData = await readGradeStream(gradeResponse.body, {
+              onPartial: (text) => upsertMessage(feedbackId, "agent", text),
+            });
+            if (gradeData) {
+              gradeScore = Number(gradeData.score ?? gradeScore);
+              objective = gradeData.objective ?? undefined;
+              autoFeedback = gradeData.auto_feedback ?? gradeData.notes ?? undefined;
+              if (autoFeedback) {
+                upsertMessage(feedbackId, "agent", autoFeedback);
+              }
             }
           }
         } catch (err) {
@@ -225,33 +287,24 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
       const normalizedScore = Math.min(1, Math.max(0, gradeScore > 1 ? gradeScore / 100 : gradeScore));
 
       try {
-        const response = await fetch(`${BACKEND_URL}/api/v1/tools/record_outcome`, {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({
-            session_id: sessionId,
-            question_id: question.id,
-            score: normalizedScore,
-            time_ms: 60000,
-            difficulty: question.difficulty,
-            meta: {
-              skill: question.skill,
-              answer_payload: { text: content },
-              strengths: objective && (objective as any).strengths,
-              improvements: objective && (objective as any).improvements,
-            },
-          }),
+        const outcome = await callTool<any>("record_outcome", {
+          question_id: question.id,
+          score: normalizedScore,
+          time_ms: 60000,
+          difficulty: question.difficulty,
+          meta: {
+            skill: question.skill,
+            answer_payload: { text: content },
+            strengths: objective && (objective as any).strengths,
+            improvements: objective && (objective as any).improvements,
+          },
         });
-
-        if (response.ok) {
-          const outcome = await response.json();
-          setRatingSummary(outcome.rating_summary ?? {});
-        }
+        setRatingSummary(outcome.rating_summary ?? {});
       } catch (err) {
         console.error("Failed to update rating", err);
       }
     },
-    [sessionId, appendMessage]
+    [sessionId, upsertMessage, callTool]
   );
 
   const sendCandidateMessage = useCallback(
@@ -279,21 +332,14 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
   useEffect(() => {
     return () => {
       realtimeClientRef.current?.close();
+      toolChannelRef.current?.close();
     };
   }, []);
 
   const requestFeedback = useCallback(async () => {
     setIsFeedbackLoading(true);
     try {
-      const response = await fetch(`${BACKEND_URL}/api/v1/tools/finalize_session`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ session_id: sessionId }),
-      });
-      if (!response.ok) {
-        throw new Error(`Failed to fetch feedback: ${response.status}`);
-      }
-      const data = await response.json();
+      const data = await callTool<any>("finalize_session");
       setFeedback(data.summary);
       appendMessage({
         role: "agent",
@@ -304,7 +350,7 @@ export function useRealtimeInterview(): UseRealtimeInterviewResult {
     } finally {
       setIsFeedbackLoading(false);
     }
-  }, [appendMessage, sessionId]);
+  }, [appendMessage, callTool]);
 
   const memoizedCurrentQuestion = useMemo(() => currentQuestion, [currentQuestion]);
 
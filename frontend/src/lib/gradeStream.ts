@@ -0,0 +1,64 @@
+export interface GradeResult {
+  score: number;
+  objective?: Record<string, unknown> | null;
+  notes?: string | null;
+  auto_feedback?: string | null;
+  confidence?: number | null;
+}
+
+interface GradeStreamHandlers {
+  onPartial: (text: string) => void;
+}
+
+export async function readGradeStream(
+  body: ReadableStream<Uint8Array>,
+  { onPartial }: GradeStreamHandlers
+): Promise<GradeResult | null> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let summary = "";
+  const strengths: string[] = [];
+  let grade: GradeResult | null = null;
+
+  const render = () => {
+    const parts: string[] = [];
+    if (strengths.length) parts.push(`Strengths: ${strengths.join("; ")}`);
+    if (summary) parts.push(summary);
+    onPartial(parts.join("\n"));
+  };
+
+  const handleEvent = (raw: string) => {
+    let event = "message";
+    const dataLines: string[] = [];
+    for (const line of raw.split("\n")) {
+      if (line.startsWith("event:")) event = line.slice(6).trim();
+      else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+    }
+    if (!dataLines.length) return;
+    const data = JSON.parse(dataLines.join("\n"));
+    if (event === "summary") {
+      summary += data.delta ?? "";
+      render();
+    } else if (event === "strength") {
+      strengths.push(String(data.text ?? ""));
+      render();
+    } else if (event === "grade") {
+      grade = data as GradeResult;
+    }
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      handleEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+  if (buffer.trim()) handleEvent(buffer);
+  return grade;
+}
@@ -0,0 +1,78 @@
+import { nanoid } from "nanoid/non-secure";
+
+export interface ToolChannelEvent {
+  event: string;
+  data: Record<string, unknown>;
+}
+
+interface PendingCall {
+  resolve: (value: any) => void;
+  reject: (reason: Error) => void;
+}
+
+interface ToolChannelOptions {
+  onEvent?: (event: ToolChannelEvent) => void;
+}
+
+export class ToolChannel {
+  private socket: WebSocket | null = null;
+  private pending = new Map<string, PendingCall>();
+
+  constructor(private readonly url: string, private readonly options: ToolChannelOptions = {}) {}
+
+  get isOpen(): boolean {
+    return this.socket?.readyState === WebSocket.OPEN;
+  }
+
+  connect(): Promise<void> {
+    return new Promise((resolve, reject) => {
+      const socket = new WebSocket(this.url);
+      this.socket = socket;
+      socket.onopen = () => resolve();
+      socket.onerror = () => reject(new Error("Tool channel connection failed"));
+      socket.onclose = () => {
+        this.pending.forEach(({ reject: rejectCall }) => rejectCall(new Error("Tool channel closed")));
+        this.pending.clear();
+        this.socket = null;
+      };
+      socket.onmessage = (message) => this.handleMessage(message.data);
+    });
+  }
+
+  call<T>(tool: string, payload: Record<string, unknown> = {}, idempotencyKey?: string): Promise<T> {
+    if (!this.socket || !this.isOpen) {
+      return Promise.reject(new Error("Tool channel is not connected"));
+    }
+    const id = nanoid();
+    return new Promise<T>((resolve, reject) => {
+      this.pending.set(id, { resolve, reject });
+      this.socket?.send(JSON.stringify({ id, tool, payload, idempotency_key: idempotencyKey }));
+    });
+  }
+
+  close() {
+    this.socket?.close();
+    this.socket = null;
+  }
+
+  private handleMessage(raw: string) {
+    let message: any;
+    try {
+      message = JSON.parse(raw);
+    } catch {
+      return;
+    }
+    if (message.event) {
+      this.options.onEvent?.(message as ToolChannelEvent);
+      return;
+    }
+    const call = this.pending.get(message.id);
+    if (!call) return;
+    this.pending.delete(message.id);
+    if (message.ok) {
+      call.resolve(message.result);
+    } else {
+      call.reject(new Error(`Tool call failed: ${message.error?.status ?? "unknown"}`));
+    }
+  }
+}